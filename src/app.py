@@ -9,8 +9,19 @@ Main entry point for the application
 import os
 import sys
 import logging
+
+# Add the parent directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+# Startup timing (no-op unless --profile-startup is given)
+from src.startup_profiler import profiler
+
+profiler.start_phase("import:qt")
 from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
+profiler.end_phase("import:qt")
 
 
 def setup_logging():
@@ -41,15 +52,12 @@ def main():
         # Create QApplication instance
         QApplication.setAttribute(Qt.AA_EnableHighDpiScaling)
         QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps)
-        app = QApplication(sys.argv)
+        with profiler.phase("qt_app"):
+            app = QApplication(sys.argv)
 
         # Import main module
-        # Add the parent directory to Python path
-        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        if project_root not in sys.path:
-            sys.path.append(project_root)
-
-        from src.main import LoginWindow, MainWindow, Database, APP_NAME
+        with profiler.phase("import:main"):
+            from src.main import LoginWindow, MainWindow, Database, APP_NAME
 
         # Set application properties
         app.setApplicationName(APP_NAME)
@@ -57,11 +65,13 @@ def main():
 
         # Initialize database
         logger.info("Initializing database...")
-        db = Database()
+        with profiler.phase("database"):
+            db = Database()
 
         # Create and show login window
         logger.info("Creating login window...")
-        login_window = LoginWindow(db)
+        with profiler.phase("login_window"):
+            login_window = LoginWindow(db)
         login_window.resize(750, 500)  # Set smaller default size
         login_window.center_on_screen()  # Center the window
         login_window.setWindowState(Qt.WindowActive)
@@ -70,19 +80,26 @@ def main():
         login_window.activateWindow()
 
         # Start event loop and wait for login result
-        if login_window.exec() == 1:
+        profiler.start_phase("login (interactive)")
+        login_result = login_window.exec()
+        profiler.end_phase("login (interactive)")
+        if login_result == 1:
             logger.info("Login successful")
             user_data = login_window.get_user_data()
 
             # Create and show main window
             logger.info("Creating main window...")
-            main_window = MainWindow(user_data)
-            main_window.resize(950, 700)  # Set smaller default size
-            main_window.center_on_screen()  # Center the window
-            main_window.setWindowState(Qt.WindowActive)
-            main_window.show()
-            main_window.raise_()
-            main_window.activateWindow()
+            with profiler.phase("main_window"):
+                main_window = MainWindow(user_data, db)
+                main_window.resize(950, 700)  # Set smaller default size
+                main_window.center_on_screen()  # Center the window
+                main_window.setWindowState(Qt.WindowActive)
+                main_window.show()
+                main_window.raise_()
+                main_window.activateWindow()
+
+            # The trace ends once the event loop has built the first page
+            QTimer.singleShot(0, profiler.finish)
 
             # Start the main event loop
             return app.exec()
@@ -0,0 +1,401 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Background database backups for MAHER ZARAI MARKAZ.
+
+Backups use the SQLite online backup API (see Database.backup_database) and
+run on a QThread, so the UI and checkout stay responsive while pages are
+copied. Progress is reported through Qt signals.
+
+Scheduled backups go to an incremental store: a consistent snapshot is taken,
+split into database pages, and only pages that changed since the previous
+backup are written (gzip-compressed). Each chain starts from a periodic full
+backup; a manifest records the chain so any point can be restored by
+replaying it.
+"""
+
+import os
+import gzip
+import json
+import struct
+import sqlite3
+import hashlib
+import logging
+import datetime
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+# Set up logging
+logger = logging.getLogger('backup')
+
+# Default folder for backups made from the application
+BACKUP_DIR = "backups"
+
+# Incremental store layout and policy
+INCREMENTAL_DIR = "incremental"
+MANIFEST_FILE = "manifest.json"
+PAGE_HASHES_FILE = "page_hashes.bin"
+FULL_BACKUP_INTERVAL_DAYS = 7
+MAX_CHAIN_LENGTH = 30
+
+# Page file format: magic, page size, page count, then (page number, page) records
+PAGE_FILE_MAGIC = b"MZPG1"
+PAGE_FILE_HEADER = struct.Struct(">5sII")
+PAGE_NUMBER = struct.Struct(">I")
+PAGE_HASH_SIZE = 16
+
+# Scheduler: how long to wait while a sale is open, and for how long at most
+BACKUP_DEFER_MINUTES = 2
+BACKUP_MAX_DEFER_MINUTES = 60
+
+
+def backup_file_path(prefix="backup", backup_dir=None):
+    """Timestamped backup file path inside backup_dir"""
+    backup_dir = backup_dir or os.path.join(os.getcwd(), BACKUP_DIR)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(backup_dir, f"{prefix}_{timestamp}.db")
+
+
+def _page_hash(page):
+    """Short digest used to detect changed pages"""
+    return hashlib.blake2b(page, digest_size=PAGE_HASH_SIZE).digest()
+
+
+class IncrementalBackupStore:
+    """Chained page-level backups with a manifest and retention pruning"""
+
+    def __init__(self, store_dir=None):
+        self.store_dir = store_dir or os.path.join(os.getcwd(), BACKUP_DIR, INCREMENTAL_DIR)
+        self.manifest_path = os.path.join(self.store_dir, MANIFEST_FILE)
+        self.hashes_path = os.path.join(self.store_dir, PAGE_HASHES_FILE)
+
+    def load_manifest(self):
+        """Return the manifest, or an empty one"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"backups": [], "hashes_for": None}
+
+    def save_manifest(self, manifest):
+        """Write the manifest atomically"""
+        os.makedirs(self.store_dir, exist_ok=True)
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+    def list_backups(self):
+        """All restorable backups, oldest first"""
+        return list(self.load_manifest()["backups"])
+
+    def _load_page_hashes(self, manifest, page_size):
+        """Page hashes of the newest backup, or None if a full backup is needed"""
+        if not manifest["backups"] or manifest.get("hashes_for") != manifest["backups"][-1]["id"]:
+            return None
+        head = manifest["backups"][-1]
+        if head["page_size"] != page_size:
+            return None
+        try:
+            with open(self.hashes_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        return [data[i:i + PAGE_HASH_SIZE] for i in range(0, len(data), PAGE_HASH_SIZE)]
+
+    def _needs_full(self, manifest, now):
+        """Start a new chain after the full-backup interval or chain length"""
+        if not manifest["backups"]:
+            return True
+        head = manifest["backups"][-1]
+        base = next(b for b in manifest["backups"] if b["id"] == head["base"])
+        base_time = datetime.datetime.fromisoformat(base["created_at"])
+        chain_length = sum(1 for b in manifest["backups"] if b["base"] == head["base"])
+        return (
+            now - base_time >= datetime.timedelta(days=FULL_BACKUP_INTERVAL_DAYS)
+            or chain_length >= MAX_CHAIN_LENGTH
+        )
+
+    def create_backup(self, db, progress=None):
+        """
+        Snapshot the database and store the pages changed since the last
+        backup. progress is called as progress(done, total) across the
+        snapshot and page-scan phases. Returns the manifest entry.
+        """
+        os.makedirs(self.store_dir, exist_ok=True)
+        now = datetime.datetime.now()
+        backup_id = now.strftime("%Y%m%d_%H%M%S")
+        snapshot_path = os.path.join(self.store_dir, f"snapshot_{backup_id}.tmp")
+
+        def snapshot_progress(copied, total):
+            if progress:
+                progress(copied, total * 2)
+
+        try:
+            if not db.backup_database(snapshot_path, progress=snapshot_progress):
+                raise RuntimeError("Could not take a database snapshot.")
+
+            connection = sqlite3.connect(snapshot_path)
+            try:
+                page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+            finally:
+                connection.close()
+            page_count = os.path.getsize(snapshot_path) // page_size
+
+            manifest = self.load_manifest()
+            previous_hashes = None
+            if not self._needs_full(manifest, now):
+                previous_hashes = self._load_page_hashes(manifest, page_size)
+            full = previous_hashes is None
+
+            file_name = f"{backup_id}.{'full' if full else 'incr'}.gz"
+            page_file = os.path.join(self.store_dir, file_name)
+            hashes = []
+            changed_pages = 0
+            with open(snapshot_path, 'rb') as source, gzip.open(page_file + ".part", 'wb') as out:
+                out.write(PAGE_FILE_HEADER.pack(PAGE_FILE_MAGIC, page_size, page_count))
+                for page_number in range(page_count):
+                    page = source.read(page_size)
+                    digest = _page_hash(page)
+                    hashes.append(digest)
+                    if full or page_number >= len(previous_hashes) or previous_hashes[page_number] != digest:
+                        out.write(PAGE_NUMBER.pack(page_number))
+                        out.write(page)
+                        changed_pages += 1
+                    if progress and (page_number % 256 == 0 or page_number == page_count - 1):
+                        progress(page_count + page_number + 1, page_count * 2)
+            os.replace(page_file + ".part", page_file)
+
+            head = manifest["backups"][-1] if manifest["backups"] else None
+            entry = {
+                "id": backup_id,
+                "type": "full" if full else "incremental",
+                "file": file_name,
+                "parent": None if full else head["id"],
+                "base": backup_id if full else head["base"],
+                "created_at": now.isoformat(timespec="seconds"),
+                "page_size": page_size,
+                "page_count": page_count,
+                "changed_pages": changed_pages,
+                "size": os.path.getsize(page_file),
+            }
+
+            temp_hashes = self.hashes_path + ".tmp"
+            with open(temp_hashes, 'wb') as f:
+                f.write(b"".join(hashes))
+            os.replace(temp_hashes, self.hashes_path)
+
+            manifest["backups"].append(entry)
+            manifest["hashes_for"] = backup_id
+            self.save_manifest(manifest)
+
+            logger.info(
+                f"{entry['type'].capitalize()} backup {backup_id}: "
+                f"{changed_pages}/{page_count} pages, {entry['size']} bytes"
+            )
+            return entry
+        finally:
+            if os.path.exists(snapshot_path):
+                os.remove(snapshot_path)
+
+    def restore(self, backup_id, target_path):
+        """Rebuild the database as of backup_id into target_path by replaying its chain"""
+        manifest = self.load_manifest()
+        entries = {b["id"]: b for b in manifest["backups"]}
+        if backup_id not in entries:
+            raise KeyError(backup_id)
+
+        chain = []
+        entry = entries[backup_id]
+        while entry is not None:
+            chain.append(entry)
+            entry = entries.get(entry["parent"]) if entry["parent"] else None
+        chain.reverse()
+        if chain[0]["type"] != "full":
+            raise RuntimeError(f"Backup chain for {backup_id} is missing its full backup.")
+
+        temp_path = target_path + ".part"
+        with open(temp_path, 'wb') as target:
+            for link in chain:
+                with gzip.open(os.path.join(self.store_dir, link["file"]), 'rb') as f:
+                    magic, page_size, _ = PAGE_FILE_HEADER.unpack(f.read(PAGE_FILE_HEADER.size))
+                    if magic != PAGE_FILE_MAGIC:
+                        raise RuntimeError(f"{link['file']} is not a backup page file.")
+                    while True:
+                        number = f.read(PAGE_NUMBER.size)
+                        if not number:
+                            break
+                        (page_number,) = PAGE_NUMBER.unpack(number)
+                        target.seek(page_number * page_size)
+                        target.write(f.read(page_size))
+            final = chain[-1]
+            target.truncate(final["page_count"] * final["page_size"])
+        os.replace(temp_path, target_path)
+        logger.info(f"Rebuilt backup {backup_id} from {len(chain)} file(s) into {target_path}")
+        return target_path
+
+    def prune(self, retention_days):
+        """
+        Delete backup chains whose newest backup is older than retention_days.
+        The current chain is always kept, since new backups build on it.
+        Returns the number of backups removed.
+        """
+        manifest = self.load_manifest()
+        if not manifest["backups"]:
+            return 0
+
+        cutoff = datetime.datetime.now() - datetime.timedelta(days=retention_days)
+        current_base = manifest["backups"][-1]["base"]
+        newest_by_chain = {}
+        for entry in manifest["backups"]:
+            created = datetime.datetime.fromisoformat(entry["created_at"])
+            newest_by_chain[entry["base"]] = max(created, newest_by_chain.get(entry["base"], created))
+
+        expired = {
+            base for base, newest in newest_by_chain.items()
+            if base != current_base and newest < cutoff
+        }
+        if not expired:
+            return 0
+
+        kept = []
+        removed = 0
+        for entry in manifest["backups"]:
+            if entry["base"] in expired:
+                try:
+                    os.remove(os.path.join(self.store_dir, entry["file"]))
+                except OSError as e:
+                    logger.error(f"Could not remove old backup {entry['file']}: {e}")
+                removed += 1
+            else:
+                kept.append(entry)
+        manifest["backups"] = kept
+        self.save_manifest(manifest)
+        logger.info(f"Pruned {removed} backups older than {retention_days} days")
+        return removed
+
+
+class BackupWorker(QObject):
+    """Run an online backup on a worker thread"""
+
+    # Define signals
+    progress = pyqtSignal(int, int)  # pages copied, total pages
+    finished = pyqtSignal(str)  # backup path
+    failed = pyqtSignal(str)
+
+    def __init__(self, db, backup_path=None, retention_days=None,
+                 activity_retention_days=None):
+        """
+        With a backup_path, write a plain copy of the database there.
+        Without one, add a backup to the incremental store, prune it to
+        retention_days and archive activity log rows older than
+        activity_retention_days (they are in the backup just taken).
+        """
+        super().__init__()
+        self.db = db
+        self.backup_path = backup_path
+        self.retention_days = retention_days
+        self.activity_retention_days = activity_retention_days
+
+    def run(self):
+        """Run the backup (connected to QThread.started)"""
+        try:
+            if self.backup_path is None:
+                store = IncrementalBackupStore()
+                entry = store.create_backup(self.db, progress=self.progress.emit)
+                if self.retention_days:
+                    store.prune(self.retention_days)
+                if self.activity_retention_days:
+                    self.db.archive_activity(self.activity_retention_days)
+                self.finished.emit(os.path.join(store.store_dir, entry["file"]))
+                return
+
+            result = self.db.backup_database(self.backup_path, progress=self.progress.emit)
+            if result:
+                self.finished.emit(result)
+            else:
+                self.failed.emit("The backup could not be written. See the log for details.")
+        except Exception as e:
+            logger.error(f"Backup failed: {e}")
+            self.failed.emit(str(e))
+
+
+def next_backup_time(backup_time, now=None):
+    """Next datetime at backup_time ("HH:MM"), today if still ahead, else tomorrow"""
+    now = now or datetime.datetime.now()
+    hour, minute = map(int, backup_time.split(":"))
+    scheduled = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if scheduled <= now:
+        scheduled += datetime.timedelta(days=1)
+    return scheduled
+
+
+class BackupScheduler(QObject):
+    """
+    Daily auto-backup timer driven by the auto_backup_enabled and
+    auto_backup_time settings (read from a SettingsStore). When the backup is due while busy() reports a
+    sale in progress, it is retried every few minutes, up to an hour, so it
+    never lands in the middle of billing.
+    """
+
+    # Define signals
+    due = pyqtSignal()  # time to start the backup
+    scheduled = pyqtSignal(object)  # next run as a datetime, or None if disabled
+
+    def __init__(self, settings, busy=None, parent=None):
+        super().__init__(parent)
+        self.settings = settings
+        self.busy = busy
+        self.next_run = None
+        self.deferred_minutes = 0
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.on_timeout)
+
+    def reschedule(self):
+        """Read the settings and arm the timer for the next backup"""
+        self.timer.stop()
+        self.deferred_minutes = 0
+
+        if not self.settings.get_bool("auto_backup_enabled", True):
+            self.next_run = None
+            logger.info("Auto backup disabled")
+            self.scheduled.emit(None)
+            return
+
+        backup_time = self.settings.get("auto_backup_time", "21:00")
+        try:
+            self.next_run = next_backup_time(backup_time)
+        except ValueError:
+            logger.error(f"Invalid auto backup time '{backup_time}', using 21:00")
+            self.next_run = next_backup_time("21:00")
+
+        self._start_timer(self.next_run)
+        logger.info(f"Auto backup scheduled for {self.next_run}")
+        self.scheduled.emit(self.next_run)
+
+    def _start_timer(self, when):
+        """Fire the timer at the given datetime"""
+        seconds = max((when - datetime.datetime.now()).total_seconds(), 0)
+        self.timer.start(int(seconds * 1000))
+
+    def on_timeout(self):
+        """Run the backup now, or defer it while a sale is in progress"""
+        if (
+            self.busy is not None
+            and self.busy()
+            and self.deferred_minutes < BACKUP_MAX_DEFER_MINUTES
+        ):
+            self.deferred_minutes += BACKUP_DEFER_MINUTES
+            retry = datetime.datetime.now() + datetime.timedelta(minutes=BACKUP_DEFER_MINUTES)
+            logger.info(f"Sale in progress, auto backup deferred to {retry}")
+            self._start_timer(retry)
+            return
+
+        self.due.emit()
+        self.reschedule()
+
+    def stop(self):
+        """Stop scheduling backups"""
+        self.timer.stop()
@@ -9,13 +9,16 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdi
     QMessageBox, QHeaderView, QDoubleSpinBox, QGroupBox,
     QFormLayout, QRadioButton, QButtonGroup, QSpinBox,
     QSplitter, QFrame, QDialog, QDialogButtonBox, QListWidget,
-    QListWidgetItem, QAbstractItemView, QShortcut)
+    QListWidgetItem, QAbstractItemView, QShortcut, QApplication)
 from PyQt5.QtCore import Qt, QTimer, QEvent
 from PyQt5.QtGui import QFont, QIcon, QColor, QPixmap, QKeySequence
 
 # Import custom modules
 from quantity_dialog import QuantityDialog
 from style import get_table_font
+from page_loader import PageLoader
+from sale_cart import SaleCart
+from product_lookup import ProductLookup, ScanDetector, SCAN_MAX_KEY_INTERVAL_MS
 
 # Helper function to clean price strings
 def clean_price_string(price_str):
@@ -54,22 +57,71 @@ logger = logging.getLogger('billing')
 class BillingTab(QWidget):
     """Billing tab for the main application"""
 
-    def __init__(self, db, user_data, receipt_generator):
+    def __init__(self, db, user_data, receipt_generator, defer_load=False):
         super().__init__()
         self.db = db
         self.user_data = user_data
         self.receipt_generator = receipt_generator
 
-        # Initialize sale data
-        self.current_sale_items = []
+        # Initialize sale data; the table follows the cart row by row
+        self.cart = SaleCart(self)
         self.selected_customer_id = 1  # Default to walk-in customer
 
+        # Background loading of the customer and category lists
+        self.loader = PageLoader(db, self)
+        self.loader.loaded.connect(self.on_data_loaded)
+
+        # Barcode scans resolve against an in-memory map, refreshed in the
+        # background whenever the page is shown
+        self.product_lookup = ProductLookup()
+        self.scan_detector = ScanDetector()
+        self.scan_loader = PageLoader(db, self)
+        self.scan_loader.loaded.connect(self.product_lookup.rebuild)
+        db.subscribe(self.on_db_change)
+
         # Set up UI
         self.setup_ui()
 
-        # Load data
-        self.load_customers()
-        self.load_product_categories()
+        self.cart.row_inserted.connect(self.insert_sale_row)
+        self.cart.row_updated.connect(self.update_sale_row)
+        self.cart.row_removed.connect(self.sale_items_table.removeRow)
+        self.cart.cleared.connect(lambda: self.sale_items_table.setRowCount(0))
+        self.cart.subtotal_changed.connect(self.update_totals)
+
+        # Load data (the main window defers this to a worker thread)
+        if not defer_load:
+            self.load_customers()
+            self.load_product_categories()
+            self.product_lookup.rebuild(self.db.get_scan_products())
+
+    @property
+    def current_sale_items(self):
+        """Line items of the current sale"""
+        return self.cart.items
+
+    def load_data(self):
+        """Fetch customers and categories on a worker thread"""
+        self.loader.load(lambda db: (db.get_all_customers(), db.get_product_categories()))
+
+    def refresh_scan_map(self):
+        """Reload the barcode/SKU map on a worker thread"""
+        self.scan_loader.load(lambda db: db.get_scan_products())
+
+    def on_db_change(self, event, data):
+        """Keep the scan map's stock in step between refreshes"""
+        if event == "stock":
+            self.product_lookup.set_stock(data['product_id'], data['new_quantity'])
+
+    def showEvent(self, event):
+        """Pick up product, price and stock changes made on other pages"""
+        super().showEvent(event)
+        self.refresh_scan_map()
+
+    def on_data_loaded(self, data):
+        """Fill the combo boxes from a background load"""
+        customers, categories = data
+        self.fill_customers(customers)
+        self.fill_product_categories(categories)
 
     def setup_ui(self):
         """Set up the user interface"""
@@ -179,7 +231,13 @@ class BillingTab(QWidget):
         self.search_input.setPlaceholderText("Search products by name or ID...")
         self.search_input.setMinimumHeight(40)
         self.search_input.setFont(QFont("Arial", 14))
-        self.search_input.textChanged.connect(self.search_products)
+        # Search once keys stop arriving at scanner speed, so a scanned code
+        # does not run a query per character
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(2 * SCAN_MAX_KEY_INTERVAL_MS)
+        self.search_timer.timeout.connect(self.search_products)
+        self.search_input.textChanged.connect(lambda: self.search_timer.start())
 
         search_input_layout.addWidget(search_icon_label)
         search_input_layout.addWidget(self.search_input)
@@ -325,6 +383,16 @@ class BillingTab(QWidget):
             QTableWidget::item:hover{
                 background-color: rgba(251, 192, 45, 0.1);
             }
+            QPushButton#removeItemButton{
+                background-color: #D32F2F;
+                color: white;
+                font-weight: bold;
+                font-size: 16px;
+                border-radius: 5px;
+            }
+            QPushButton#removeItemButton:hover{
+                background-color: #F44336;
+            }
             """)
         current_sale_layout.addWidget(self.sale_items_table)
         
@@ -500,14 +568,22 @@ class BillingTab(QWidget):
         self.search_input.setFocus()
         self.search_input.selectAll()
 
+    def on_user_changed(self):
+        """Start a fresh sale for the cashier who just logged in"""
+        self.sale_cashier_label.setText(self.user_data['username'])
+        self.clear_sale()
+
     def update_time(self):
         """Update the time display"""
         self.sale_date_label.setText(datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
 
     def load_customers(self):
         """Load customers into the combo box"""
+        self.fill_customers(self.db.get_all_customers())
+
+    def fill_customers(self, customers):
+        """Replace the customer combo box items"""
         self.customer_combo.clear()
-        customers = self.db.get_all_customers()
         if not customers:
             return
         for customer in customers:
@@ -515,10 +591,13 @@ class BillingTab(QWidget):
 
     def load_product_categories(self):
         """Load product categories into the combo box"""
+        self.fill_product_categories(self.db.get_product_categories())
+
+    def fill_product_categories(self, categories):
+        """Replace the category combo box items"""
         self.category_combo.clear()
         self.category_combo.addItem("All Categories")
 
-        categories = self.db.get_product_categories()
         if not categories:
             return
 
@@ -528,13 +607,27 @@ class BillingTab(QWidget):
     def eventFilter(self, obj, event):
         """Event filter to handle search results dropdown"""
         if obj == self.search_input:
-            if event.type() == QEvent.FocusOut:
+            if event.type() == QEvent.ShortcutOverride:
+                # A scanner's Enter goes to the input, not the add-product shortcut
+                if (event.key() in (Qt.Key_Return, Qt.Key_Enter)
+                        and self.scan_detector.is_scan(self.search_input.text())):
+                    event.accept()
+                    return True
+            elif event.type() == QEvent.FocusOut:
                 # Hide search results when focus is lost, unless clicked on search results
                 if not self.search_results.underMouse():
                     self.search_results.hide()
             elif event.type() == QEvent.KeyPress:
-                # Handle keyboard navigation in search results
+                # Time character keys to recognise scanner input
                 key = event.key()
+                if event.text() and event.text().isprintable():
+                    self.scan_detector.key_pressed()
+                elif (key in (Qt.Key_Return, Qt.Key_Enter)
+                        and self.scan_detector.is_scan(self.search_input.text())):
+                    self.add_scanned_product(self.search_input.text())
+                    return True
+
+                # Handle keyboard navigation in search results
                 if key == Qt.Key_Down and self.search_results.isVisible():
                     self.search_results.setFocus()
                     if self.search_results.count() > 0:
@@ -559,28 +652,26 @@ class BillingTab(QWidget):
         self.products_table.setRowCount(0)
         self.search_results.clear()
 
-        if category == "All Categories":
-            category_filter = ""
-        else:
-            category_filter = f"AND category = '{category}'"
-
         # Perform search
         if search_text:
             # Use more flexible search with LIKE
-            query = f"""
+            query = """
             SELECT id, name, category, selling_price, stock_quantity, min_stock_level
             FROM products
             WHERE (name LIKE ? OR id LIKE ?)
-            {category_filter}
-            ORDER BY name
             """
             search_pattern = f"%{search_text}%"
-            products = self.db.execute_query(query, (search_pattern, search_pattern))
+            params = [search_pattern, search_pattern]
+            if category != "All Categories":
+                query += " AND category = ?"
+                params.append(category)
+            query += " ORDER BY name"
+            products = self.db.execute_query(query, params, fetch="all")
 
             # Check if products is valid and not a boolean
             if products is False or not isinstance(products, list):
                 products = []
-                print("Database query failed or returned invalid results")
+                logger.error("Product search failed or returned invalid results")
 
             # Populate search results dropdown
             if products:
@@ -607,15 +698,15 @@ class BillingTab(QWidget):
             self.search_results.hide()
             if category == "All Categories":
                 query = "SELECT id, name, category, selling_price, stock_quantity, min_stock_level FROM products ORDER BY name"
-                products = self.db.execute_query(query)
+                products = self.db.execute_query(query, fetch="all")
             else:
                 query = "SELECT id, name, category, selling_price, stock_quantity, min_stock_level FROM products WHERE category = ? ORDER BY name"
-                products = self.db.execute_query(query, (category,))
+                products = self.db.execute_query(query, (category,), fetch="all")
 
             # Check if products is valid and not a boolean
             if products is False or not isinstance(products, list):
                 products = []
-                print("Database query failed or returned invalid results")
+                logger.error("Product list query failed or returned invalid results")
 
             # Populate products table
             for product in products:
@@ -737,113 +828,106 @@ class BillingTab(QWidget):
             if quantity <= 0:
                 return
 
-            # Check if product already in sale
-            for i, item in enumerate(self.current_sale_items):
-                if item['product_id'] == product_id:
-                    # Update quantity
-                    new_quantity = item['quantity'] + quantity
-                    if new_quantity > product_stock:
-                        QMessageBox.warning(
-                            self,
-                            "Insufficient Stock",
-                            f"Cannot add {quantity} more units. Only {product_stock} in stock."
-                        )
-                        return
-
-                    item['quantity'] = new_quantity
-                    item['total'] = round(item['price'] * new_quantity, 2)
-
-                    # Update table
-                    self.update_sale_items_table()
-                    self.update_totals()
-
-                    # Highlight the updated row
-                    self.sale_items_table.selectRow(i)
-
-                    # Show success message
-                    if self.parent() and hasattr(self.parent(), 'show_toast'):
-                        self.parent().show_toast(f"Added {quantity} more {product_name}", notification_type="success")
-                    return
-
-            # Add new item to sale
-            item = {
-                'product_id': product_id,
-                'name': product_name,
-                'price': product_price,
-                'quantity': quantity,
-                'total': round(product_price * quantity, 2)
-            }
-
-            self.current_sale_items.append(item)
+            # Check the merged quantity against stock
+            in_cart = self.cart.quantity_of(product_id)
+            if in_cart and in_cart + quantity > product_stock:
+                QMessageBox.warning(
+                    self,
+                    "Insufficient Stock",
+                    f"Cannot add {quantity} more units. Only {product_stock} in stock."
+                )
+                return
 
-            # Update table
-            self.update_sale_items_table()
-            self.update_totals()
+            # Add to the sale (merges into an existing line)
+            row = self.cart.add(product_id, product_name, product_price, quantity)
 
-            # Highlight the new row
-            self.sale_items_table.selectRow(len(self.current_sale_items) - 1)
+            # Highlight the new or updated row
+            self.sale_items_table.selectRow(row)
 
             # Show success message
             if self.parent() and hasattr(self.parent(), 'show_toast'):
-                self.parent().show_toast(f"Added {product_name} to sale", notification_type="success")
+                if in_cart:
+                    self.parent().show_toast(f"Added {quantity} more {product_name}", notification_type="success")
+                else:
+                    self.parent().show_toast(f"Added {product_name} to sale", notification_type="success")
+
+    def add_scanned_product(self, code):
+        """Add one unit of a scanned product, with no query and no dialog"""
+        self.search_timer.stop()
+        self.scan_detector.reset()
+        self.search_results.hide()
+        self.search_input.blockSignals(True)
+        self.search_input.clear()
+        self.search_input.blockSignals(False)
 
-    def update_sale_items_table(self):
-        """Update the sale items table with current items"""
-        self.sale_items_table.setRowCount(0)
-        self.sale_items_table.setFont(get_table_font())
+        product = self.product_lookup.find(code)
+        if product is None:
+            QApplication.beep()
+            self.notify(f"No product with barcode {code.strip()}", "warning")
+            return
 
-        # Set row height
-        self.sale_items_table.verticalHeader().setDefaultSectionSize(40)
+        if self.cart.quantity_of(product['id']) + 1 > product['stock']:
+            QApplication.beep()
+            self.notify(f"'{product['name']}' is out of stock", "warning")
+            return
 
-        for row, item in enumerate(self.current_sale_items):
-            self.sale_items_table.insertRow(row)
-
-            # Name cell
-            name_item = QTableWidgetItem(item['name'])
-            name_item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-            self.sale_items_table.setItem(row, 0, name_item)
-
-            # Price cell
-            price_item = QTableWidgetItem(f"Rs. {item['price']:.2f}")
-            price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.sale_items_table.setItem(row, 1, price_item)
-
-            # Quantity cell
-            quantity_item = QTableWidgetItem(str(item['quantity']))
-            quantity_item.setTextAlignment(Qt.AlignCenter | Qt.AlignVCenter)
-            self.sale_items_table.setItem(row, 2, quantity_item)
-
-            # Total cell
-            total_item = QTableWidgetItem(f"Rs. {item['total']:.2f}")
-            total_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            total_item.setForeground(QColor(0, 100, 0))  # Dark green color
-            self.sale_items_table.setItem(row, 3, total_item)
-
-            # Create a remove button
-            remove_button = QPushButton("×")
-            remove_button.setFixedWidth(40)
-            remove_button.setFixedHeight(30)
-            remove_button.setStyleSheet("""
-                QPushButton{
-                    background-color: #D32F2F;
-                    color: white;
-                    font-weight: bold;
-                    font-size: 16px;
-                    border-radius: 5px;
-                }
-                QPushButton:hover{
-                    background-color: #F44336;
-                }
-            """)
-            remove_button.clicked.connect(lambda _, r=row: self.remove_item(r))
-            self.sale_items_table.setCellWidget(row, 4, remove_button)
+        row = self.cart.add(product['id'], product['name'], product['price'], 1)
+        self.sale_items_table.selectRow(row)
+
+    def notify(self, message, notification_type="info"):
+        """Show a toast on the main window, if there is one"""
+        window = self.window()
+        if hasattr(window, 'show_toast'):
+            window.show_toast(message, notification_type=notification_type)
+
+    def insert_sale_row(self, row):
+        """Add the table row for a new cart line"""
+        self.sale_items_table.insertRow(row)
+
+        # Name cell
+        name_item = QTableWidgetItem()
+        name_item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
+        self.sale_items_table.setItem(row, 0, name_item)
+
+        # Price cell
+        price_item = QTableWidgetItem()
+        price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        self.sale_items_table.setItem(row, 1, price_item)
+
+        # Quantity cell
+        quantity_item = QTableWidgetItem()
+        quantity_item.setTextAlignment(Qt.AlignCenter | Qt.AlignVCenter)
+        self.sale_items_table.setItem(row, 2, quantity_item)
+
+        # Total cell
+        total_item = QTableWidgetItem()
+        total_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        total_item.setForeground(QColor(0, 100, 0))  # Dark green color
+        self.sale_items_table.setItem(row, 3, total_item)
+
+        # Create a remove button (styled by the table's stylesheet); it looks
+        # up its row when clicked since rows shift as lines are removed
+        remove_button = QPushButton("×")
+        remove_button.setObjectName("removeItemButton")
+        remove_button.setFixedWidth(40)
+        remove_button.setFixedHeight(30)
+        remove_button.clicked.connect(lambda _, b=remove_button: self.remove_item(
+            self.sale_items_table.indexAt(b.pos()).row()))
+        self.sale_items_table.setCellWidget(row, 4, remove_button)
+
+        self.update_sale_row(row)
+
+    def update_sale_row(self, row):
+        """Refresh the cells of one cart line"""
+        item = self.cart[row]
+        self.sale_items_table.item(row, 0).setText(item['name'])
+        self.sale_items_table.item(row, 1).setText(f"Rs. {item['price']:.2f}")
+        self.sale_items_table.item(row, 2).setText(str(item['quantity']))
+        self.sale_items_table.item(row, 3).setText(f"Rs. {item['total']:.2f}")
 
     def remove_item(self, row):
         """Remove an item from the sale by row index"""
-        if 0 <= row < len(self.current_sale_items):
-            del self.current_sale_items[row]
-            self.update_sale_items_table()
-            self.update_totals()
+        self.cart.remove(row)
 
     def remove_selected_item(self):
         """Remove the selected item from the sale"""
@@ -867,8 +951,8 @@ class BillingTab(QWidget):
 
     def update_totals(self):
         """Update sale totals"""
-        # Calculate subtotal
-        subtotal = sum(item['total'] for item in self.current_sale_items)
+        # Running subtotal kept by the cart
+        subtotal = self.cart.subtotal
 
         # Get discount and tax
         discount = self.discount_input.value()
@@ -891,8 +975,7 @@ class BillingTab(QWidget):
     def update_change(self):
         """Update the change amount"""
         if self.cash_radio.isChecked() or self.partial_udhaar_radio.isChecked():
-            # Calculate total directly from items for accuracy
-            subtotal = sum(item['total'] for item in self.current_sale_items)
+            subtotal = self.cart.subtotal
             discount = self.discount_input.value()
             tax = self.tax_input.value()
             total = subtotal - discount + tax
@@ -997,7 +1080,7 @@ class BillingTab(QWidget):
             return
 
         customer_id = self.selected_customer_id
-        subtotal = sum(item['total'] for item in self.current_sale_items)
+        subtotal = self.cart.subtotal
         discount = self.discount_input.value()
         tax = self.tax_input.value()
         total = subtotal - discount + tax
@@ -1044,18 +1127,27 @@ class BillingTab(QWidget):
         if confirm != QMessageBox.Yes:
             return
 
-        sale_items = [{
-            'product_id': item['product_id'],
-            'quantity': item['quantity'],
-            'unit_price': item['price'],
-            'total_price': item['total']
-        } for item in self.current_sale_items]
+        sale_data = {
+            'customer_id': customer_id,
+            'user_id': self.user_data['id'],
+            'sale_date': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'subtotal': subtotal,
+            'discount': discount,
+            'tax': tax,
+            'total': total,
+            'payment_method': payment_method,
+            'amount_paid': cash_amount,
+            'udhaar_amount': udhaar_amount,
+            'items': [{
+                'product_id': item['product_id'],
+                'quantity': item['quantity'],
+                'price': item['price'],
+                'total': item['total']
+            } for item in self.current_sale_items]
+        }
 
         try:
-            sale_id = self.db.create_sale(
-                customer_id, sale_items, subtotal, discount, tax, total,
-                payment_method, cash_amount, udhaar_amount, self.user_data['id']
-            )
+            sale_id = self.db.create_sale(sale_data)
 
             if not sale_id:
                 QMessageBox.critical(self, "Error", "Failed to complete sale.")
@@ -1098,8 +1190,7 @@ class BillingTab(QWidget):
 
     def clear_sale(self):
         """Clear the current sale"""
-        self.current_sale_items = []
-        self.update_sale_items_table()
+        self.cart.clear()
 
         walk_in_index = self.customer_combo.findData(1)
         if walk_in_index != -1:
@@ -171,6 +171,8 @@ def run_pyinstaller(app_name, icon_path):
         "sqlite3",
         "bcrypt",
         "pandas",
+        "openpyxl",
+        "pyarrow",
         "reportlab",
         "PyQt5",
         "PyQt5.QtCore",
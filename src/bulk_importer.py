@@ -0,0 +1,396 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Streaming bulk import for MAHER ZARAI MARKAZ.
+
+Large product, customer and supplier lists are read in fixed-size chunks
+(openpyxl read-only mode for .xlsx, chunked pandas.read_csv for .csv) and each
+chunk is committed on its own. A checkpoint file records how many source rows
+have been committed, so an interrupted import resumes where it stopped. The
+import can run on a QThread and reports progress through Qt signals.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+import datetime
+import pandas as pd
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from src.import_products import COLUMN_MAPPING, _to_sql_rows, import_products_dataframe
+
+# Set up logging
+logger = logging.getLogger('bulk_import')
+
+# Source rows read and committed per chunk
+IMPORT_CHUNK_SIZE = 5000
+
+# Where resumable import checkpoints are kept
+CHECKPOINT_DIR = os.path.join("data", "import_checkpoints")
+
+# Default column-mapping profiles: source header -> database field
+IMPORT_PROFILES = {
+    "products": {
+        "columns": dict(COLUMN_MAPPING),
+        "fields": [
+            "id", "name", "category", "description", "purchase_price",
+            "selling_price", "stock_quantity", "min_stock_level",
+            "supplier_id", "date_added",
+        ],
+        "required": ["name", "selling_price"],
+    },
+    "customers": {
+        "columns": {
+            "Customer_ID": "id",
+            "Customer_Name": "name",
+            "Phone": "phone",
+            "Address": "address",
+            "Opening_Balance": "balance",
+        },
+        "fields": ["id", "name", "phone", "address", "balance"],
+        "required": ["name"],
+    },
+    "suppliers": {
+        "columns": {
+            "Supplier_ID": "id",
+            "Supplier_Name": "name",
+            "Contact_Person": "contact_person",
+            "Phone": "phone",
+            "Email": "email",
+            "Address": "address",
+        },
+        "fields": ["id", "name", "contact_person", "phone", "email", "address"],
+        "required": ["name"],
+    },
+}
+
+
+def load_mapping_profile(entity, profile_path=None):
+    """
+    Return the column-mapping profile for an entity. A JSON profile file of the
+    form {"columns": {"Source Header": "field", ...}} extends the defaults.
+    """
+    if entity not in IMPORT_PROFILES:
+        raise ValueError(f"Unknown import type: {entity}")
+
+    base = IMPORT_PROFILES[entity]
+    profile = {
+        "columns": dict(base["columns"]),
+        "fields": list(base["fields"]),
+        "required": list(base["required"]),
+    }
+    if profile_path:
+        with open(profile_path, 'r', encoding='utf-8') as f:
+            custom = json.load(f)
+        for source, field in custom.get("columns", {}).items():
+            if field not in profile["fields"]:
+                raise ValueError(f"Profile maps '{source}' to unknown field '{field}'")
+            profile["columns"][source] = field
+    return profile
+
+
+def resolve_headers(headers, profile):
+    """Map source headers to database fields; unmapped headers become None"""
+    resolved = []
+    for header in headers:
+        name = str(header).strip() if header is not None else ""
+        if name in profile["columns"]:
+            resolved.append(profile["columns"][name])
+        elif name.lower().replace(' ', '_') in profile["fields"]:
+            resolved.append(name.lower().replace(' ', '_'))
+        else:
+            resolved.append(None)
+
+    missing = [field for field in profile["required"] if field not in resolved]
+    if missing:
+        raise KeyError(", ".join(missing))
+    return resolved
+
+
+def _frame_from_rows(rows, headers):
+    """Build a chunk DataFrame holding only the mapped columns"""
+    keep = [i for i, field in enumerate(headers) if field is not None]
+    data = [[row[i] if i < len(row) else None for i in keep] for row in rows]
+    return pd.DataFrame(data, columns=[headers[i] for i in keep])
+
+
+def iter_xlsx_chunks(path, profile, chunk_size=IMPORT_CHUNK_SIZE, skip_rows=0):
+    """Yield (rows_consumed, DataFrame) chunks from the first sheet of a workbook"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        header_row = next(sheet.iter_rows(max_row=1, values_only=True), None)
+        if header_row is None:
+            return
+        headers = resolve_headers(header_row, profile)
+
+        rows = []
+        consumed = 0
+        for row in sheet.iter_rows(min_row=2 + skip_rows, values_only=True):
+            consumed += 1
+            if any(value is not None for value in row):
+                rows.append(row)
+            if consumed == chunk_size:
+                yield consumed, _frame_from_rows(rows, headers)
+                rows = []
+                consumed = 0
+        if consumed:
+            yield consumed, _frame_from_rows(rows, headers)
+    finally:
+        workbook.close()
+
+
+def iter_csv_chunks(path, profile, chunk_size=IMPORT_CHUNK_SIZE, skip_rows=0):
+    """Yield (rows_consumed, DataFrame) chunks from a CSV file"""
+    reader = pd.read_csv(
+        path,
+        chunksize=chunk_size,
+        dtype=str,
+        skiprows=range(1, skip_rows + 1),
+        skip_blank_lines=False,
+        encoding='utf-8-sig',
+    )
+    headers = None
+    for chunk in reader:
+        if headers is None:
+            headers = resolve_headers(chunk.columns, profile)
+        consumed = len(chunk)
+        chunk = chunk.dropna(how='all')
+        yield consumed, _frame_from_rows(chunk.itertuples(index=False, name=None), headers)
+
+
+def count_source_rows(path):
+    """Best-effort count of data rows, used only for progress reporting"""
+    if path.lower().endswith('.csv'):
+        with open(path, 'rb') as f:
+            return max(sum(1 for _ in f) - 1, 0)
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True)
+    try:
+        return max((workbook.worksheets[0].max_row or 1) - 1, 0)
+    finally:
+        workbook.close()
+
+
+def _prepare_contacts(df, profile):
+    """Clean a customer/supplier chunk. Returns (valid_df, invalid_count)"""
+    for field in profile["fields"]:
+        if field not in df.columns:
+            df[field] = pd.NA
+    df = df[profile["fields"]].copy()
+
+    text_fields = [f for f in profile["fields"] if f not in ("id", "balance")]
+    for field in text_fields:
+        df[field] = df[field].astype("string").str.strip()
+    df.loc[df["name"] == "", "name"] = pd.NA
+
+    df["id"] = pd.to_numeric(df["id"], errors="coerce")
+    invalid = df["name"].isna() | (
+        df["id"].notna() & ((df["id"] % 1 != 0) | (df["id"] <= 0))
+    )
+    df = df[~invalid].copy()
+    df["id"] = df["id"].round().astype("Int64")
+    if "balance" in df.columns:
+        df["balance"] = pd.to_numeric(df["balance"], errors="coerce").fillna(0.0)
+    return df, int(invalid.sum())
+
+
+def import_contacts_dataframe(df, db, entity, profile):
+    """Insert or update (matched on id) one chunk of customers or suppliers"""
+    prepared, invalid_count = _prepare_contacts(df, profile)
+
+    with_id = prepared["id"].notna()
+    duplicates = with_id & prepared.duplicated(subset="id", keep="last")
+    prepared = prepared[~duplicates]
+    with_id = prepared["id"].notna()
+
+    existing_ids = set()
+    if with_id.any():
+        rows = db.execute_query(
+            f"SELECT id FROM {entity} WHERE id BETWEEN ? AND ?",
+            (int(prepared["id"].min()), int(prepared["id"].max())),
+            fetch="all",
+        )
+        existing_ids = {row["id"] for row in rows}
+    exists = with_id & prepared["id"].isin(existing_ids)
+
+    new_rows = prepared[~exists].copy()
+    new_rows["created_at"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    update_fields = [f for f in profile["fields"] if f not in ("id", "balance")]
+
+    insert_rows = _to_sql_rows(new_rows, profile["fields"] + ["created_at"])
+    update_rows = _to_sql_rows(prepared[exists], update_fields + ["id"])
+
+    if entity == "customers":
+        saved = db.bulk_import_customers(insert_rows, update_rows)
+    else:
+        saved = db.bulk_import_suppliers(insert_rows, update_rows)
+    if not saved:
+        raise RuntimeError(f"Bulk {entity} import failed; chunk was not saved.")
+
+    return {
+        "inserted": len(insert_rows),
+        "updated": len(update_rows),
+        "skipped": int(duplicates.sum()),
+        "invalid": invalid_count,
+    }
+
+
+class StreamingImporter:
+    """Chunked, resumable import of one source file into one table"""
+
+    def __init__(self, db, path, entity, profile_path=None,
+                 chunk_size=IMPORT_CHUNK_SIZE, mode="upsert"):
+        self.db = db
+        self.path = path
+        self.entity = entity
+        self.profile = load_mapping_profile(entity, profile_path)
+        self.chunk_size = chunk_size
+        self.mode = mode
+
+    def checkpoint_path(self):
+        """Checkpoint file tied to this source file, its size and mtime"""
+        stat = os.stat(self.path)
+        key = f"{os.path.abspath(self.path)}|{stat.st_size}|{stat.st_mtime_ns}|{self.entity}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(CHECKPOINT_DIR, f"{self.entity}-{digest}.json")
+
+    @staticmethod
+    def new_checkpoint():
+        """Checkpoint for an import that has not started"""
+        return {
+            "rows_done": 0,
+            "counts": {"inserted": 0, "updated": 0, "skipped": 0, "invalid": 0},
+        }
+
+    def load_checkpoint(self):
+        """Return the saved checkpoint, or a fresh one"""
+        try:
+            with open(self.checkpoint_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return self.new_checkpoint()
+
+    def save_checkpoint(self, checkpoint):
+        """Write the checkpoint atomically"""
+        path = self.checkpoint_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(temp_path, path)
+
+    def clear_checkpoint(self):
+        """Remove the checkpoint once the import has completed"""
+        try:
+            os.remove(self.checkpoint_path())
+        except OSError:
+            pass
+
+    def import_chunk(self, df):
+        """Import one chunk and return its counts"""
+        if self.entity == "products":
+            return import_products_dataframe(df, self.db, mode=self.mode)
+        return import_contacts_dataframe(df, self.db, self.entity, self.profile)
+
+    def run(self, progress_callback=None, should_stop=None, resume=True):
+        """
+        Import the file chunk by chunk. Returns (counts, completed); completed is
+        False when should_stop() asked the import to stop early.
+        """
+        checkpoint = self.load_checkpoint() if resume else self.new_checkpoint()
+        rows_done = checkpoint["rows_done"]
+        counts = checkpoint["counts"]
+        if rows_done:
+            logger.info(f"Resuming import of {self.path} after {rows_done} rows")
+
+        total = count_source_rows(self.path)
+        if progress_callback:
+            progress_callback(min(rows_done, total), total)
+
+        if self.path.lower().endswith('.csv'):
+            chunks = iter_csv_chunks(self.path, self.profile, self.chunk_size, rows_done)
+        else:
+            chunks = iter_xlsx_chunks(self.path, self.profile, self.chunk_size, rows_done)
+
+        for consumed, df in chunks:
+            if should_stop and should_stop():
+                return counts, False
+
+            chunk_counts = self.import_chunk(df)
+            for key, value in chunk_counts.items():
+                counts[key] += value
+            rows_done += consumed
+            self.save_checkpoint({"rows_done": rows_done, "counts": counts})
+
+            if progress_callback:
+                progress_callback(min(rows_done, total), total)
+
+        self.clear_checkpoint()
+        logger.info(f"Imported {self.entity} from {self.path}: {counts}")
+        return counts, True
+
+
+class BulkImportWorker(QObject):
+    """Run a StreamingImporter on a worker thread"""
+
+    # Define signals
+    progress = pyqtSignal(int, int)  # rows processed, total rows
+    finished = pyqtSignal(dict)  # import counts
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, db, path, entity, profile_path=None,
+                 chunk_size=IMPORT_CHUNK_SIZE, mode="upsert"):
+        super().__init__()
+        self.db = db
+        self.path = path
+        self.entity = entity
+        self.profile_path = profile_path
+        self.chunk_size = chunk_size
+        self.mode = mode
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """
+        Request cancellation; the import stops after the current chunk.
+        Thread-safe: connect with Qt.DirectConnection, since the worker's
+        own thread is busy in run() and would only see a queued call after.
+        """
+        self._cancel_event.set()
+
+    def run(self):
+        """Run the import (connected to QThread.started)"""
+        db = None
+        try:
+            # SQLite connections belong to the thread that opened them
+            db = self.db.writer()
+            importer = StreamingImporter(
+                db, self.path, self.entity, self.profile_path,
+                self.chunk_size, self.mode,
+            )
+            counts, completed = importer.run(
+                progress_callback=self.progress.emit,
+                should_stop=self._cancel_event.is_set,
+            )
+            if completed:
+                self.finished.emit(counts)
+            else:
+                logger.info(f"Import of {self.path} paused; it will resume from the checkpoint")
+                self.cancelled.emit()
+        except KeyError as e:
+            logger.error(f"Import file is missing required columns: {e}")
+            self.failed.emit(f"Missing required columns: {e}")
+        except Exception as e:
+            logger.error(f"Bulk import failed: {e}")
+            self.failed.emit(str(e))
+        finally:
+            if db is not None:
+                db.close()
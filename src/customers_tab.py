@@ -9,7 +9,8 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdi
                              QHeaderView, QDoubleSpinBox, QGroupBox, QFormLayout, 
                              QTabWidget, QTextEdit, QDialog, QDialogButtonBox, QSplitter)
 from PyQt5.QtCore import Qt
-from src.style import MAIN_STYLESHEET
+from PyQt5.QtGui import QColor
+from src.page_loader import PageLoader
 
 class CustomersTab(QWidget):
     """
@@ -17,16 +18,20 @@ class CustomersTab(QWidget):
     for 'All Customers' and 'Udhaar Accounts'.
     """
     
-    def __init__(self, db, user_data):
+    def __init__(self, db, user_data, defer_load=False):
         super().__init__()
         self.db = db
         self.user_data = user_data
         self.current_customer_id = None
 
-        self.setStyleSheet(MAIN_STYLESHEET)
+        # Last loaded customers; searching filters this list
+        self.customers = []
+        self.loader = PageLoader(db, self)
+        self.loader.loaded.connect(self.on_data_loaded)
+
         self.setup_ui()
-        self.load_all_customers()
-        self.load_udhaar_customers()
+        if not defer_load:
+            self.refresh_data()
     
     def setup_ui(self):
         """Sets up the main tab widget for the customer section."""
@@ -134,13 +139,22 @@ class CustomersTab(QWidget):
 
     def refresh_data(self):
         """Reloads data for the currently visible tab."""
+        self.load_data()
+
+    def load_data(self):
+        """Fetches customers on a worker thread."""
+        self.loader.load(lambda db: db.get_all_customers())
+
+    def on_data_loaded(self, customers):
+        """Fills both tables from a background load."""
+        self.customers = customers or []
         self.load_all_customers()
         self.load_udhaar_customers()
 
     def load_all_customers(self):
         """Loads and displays all customers in the main table."""
         search_term = self.customer_search_input.text()
-        customers = self.db.get_all_customers() # Assuming db method fetches all
+        customers = self.customers
         if customers:
             filtered_customers = [c for c in customers if c['id'] != 1 and (search_term.lower() in c['name'].lower() or search_term in c.get('phone', ''))]
             self.customers_table.setRowCount(len(filtered_customers))
@@ -156,7 +170,7 @@ class CustomersTab(QWidget):
 
     def load_udhaar_customers(self):
         """Loads customers with outstanding balances into the Udhaar tab table."""
-        customers = self.db.get_all_customers() # Reusing the method
+        customers = self.customers
         udhaar_customers = [c for c in customers if c.get('balance', 0.0) > 0]
         self.udhaar_table.setRowCount(len(udhaar_customers))
         for i, customer in enumerate(udhaar_customers):
@@ -227,7 +241,6 @@ class CustomersTab(QWidget):
         """Shows a dialog to record a payment for a customer's udhaar."""
         dialog = QDialog(self)
         dialog.setWindowTitle(f"Record Payment for {customer['name']}")
-        dialog.setStyleSheet(MAIN_STYLESHEET)
         layout = QFormLayout(dialog)
         
         layout.addRow(QLabel(f"Current Balance:"), QLabel(f"<b style='color:red;'>Rs. {customer['balance']:.2f}</b>"))
@@ -259,7 +272,6 @@ class CustomerDialog(QDialog):
         self.db = db
         self.customer_data = customer_data
         self.setWindowTitle("Add New Customer" if customer_data is None else "Edit Customer")
-        self.setStyleSheet(MAIN_STYLESHEET)
         self.setMinimumWidth(400)
 
         layout = QFormLayout(self)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Dashboard figures for MAHER ZARAI MARKAZ.
+
+DashboardStats loads today's sales, customer count, low-stock count and
+total udhaar with Database.get_dashboard_stats, then keeps them current from
+the database's change events (sales, udhaar payments and stock changes).
+A display that refreshes every few seconds is served from memory; the
+database is read again only when the TTL runs out, the day changes or an
+event the counters cannot follow (e.g. an import or restore) arrives.
+
+Run `python src/dashboard_stats.py --benchmark` to compare the old
+per-figure queries, the combined query and the cache.
+"""
+
+import os
+import sys
+import time
+import datetime
+import logging
+
+# Set up logging
+logger = logging.getLogger('dashboard_stats')
+
+DASHBOARD_CACHE_TTL = 300  # seconds between full reloads
+DASHBOARD_REFRESH_MS = 5000  # how often the UI redraws the figures
+
+
+class DashboardStats:
+    """Cached dashboard figures, updated in place by database change events"""
+
+    def __init__(self, db, ttl=DASHBOARD_CACHE_TTL):
+        self.db = db
+        self.ttl = ttl
+        self._stats = None
+        self._day = None
+        self._loaded_at = 0.0
+        db.subscribe(self.on_change)
+
+    def get(self):
+        """The dashboard figures, from memory unless they are stale"""
+        today = datetime.date.today().strftime("%Y-%m-%d")
+        if (self._stats is None or self._day != today
+                or time.monotonic() - self._loaded_at > self.ttl):
+            self._stats = dict(self.db.get_dashboard_stats())
+            self._day = today
+            self._loaded_at = time.monotonic()
+        return dict(self._stats)
+
+    def invalidate(self):
+        """Reload from the database on the next get()"""
+        self._stats = None
+
+    def on_change(self, event, data):
+        """Apply a database change event to the cached counters"""
+        stats = self._stats
+        if stats is None:
+            return
+
+        if event == "sale":
+            if data["sale_day"] == self._day:
+                stats["today_sales"] += data["total"]
+            stats["total_udhaar"] += data["udhaar_amount"]
+        elif event == "payment":
+            stats["total_udhaar"] -= data["amount"]
+        elif event == "stock":
+            was_low = data["old_quantity"] <= data["old_min_stock_level"]
+            is_low = data["new_quantity"] <= data["min_stock_level"]
+            stats["low_stock_items"] += int(is_low) - int(was_low)
+        else:
+            self.invalidate()
+
+    def close(self):
+        self.db.unsubscribe(self.on_change)
+
+
+def benchmark_dashboard_stats(products=5000, sales=100000, rounds=200):
+    """Time the old four queries, the combined query and cached reads."""
+    import random
+    import tempfile
+    from src.database import Database
+
+    with tempfile.TemporaryDirectory() as folder:
+        db = Database(os.path.join(folder, "bench.db"))
+        start_day = datetime.date.today() - datetime.timedelta(days=365)
+        with db as cursor:
+            cursor.executemany(
+                "INSERT INTO products (name, category, selling_price, stock_quantity, min_stock_level) VALUES (?, 'Bench', 100, ?, 10)",
+                [(f"Product {i}", random.randint(0, 100)) for i in range(products)],
+            )
+            cursor.executemany(
+                "INSERT INTO customers (name, balance) VALUES (?, ?)",
+                [(f"Customer {i}", random.random() * 1000) for i in range(500)],
+            )
+            cursor.executemany(
+                "INSERT INTO sales (customer_id, user_id, sale_date, total) VALUES (1, 1, ?, ?)",
+                [
+                    ((start_day + datetime.timedelta(days=i * 366 // sales)).strftime("%Y-%m-%d 12:00:00"),
+                     random.random() * 5000)
+                    for i in range(sales)
+                ],
+            )
+            db._rebuild_sales_rollups(cursor)
+
+        today = datetime.date.today().strftime("%Y-%m-%d")
+
+        def legacy():
+            db.execute_query(f"SELECT SUM(total) as total FROM sales WHERE sale_date LIKE '{today}%'", fetch="one")
+            db.execute_query("SELECT COUNT(id) as count FROM customers WHERE id != 1", fetch="one")
+            db.execute_query("SELECT COUNT(id) as count FROM products WHERE stock_quantity <= min_stock_level", fetch="one")
+            db.execute_query("SELECT SUM(balance) as total FROM customers", fetch="one")
+
+        stats = DashboardStats(db)
+
+        def timed(func):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                func()
+            return (time.perf_counter() - start) / rounds * 1000
+
+        results = {
+            "legacy_queries_ms": timed(legacy),
+            "combined_query_ms": timed(db.get_dashboard_stats),
+            "cached_get_ms": timed(stats.get),
+        }
+        stats.close()
+        db.close()
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        for name, value in benchmark_dashboard_stats().items():
+            print(f"{name}: {value:.3f} ms")
+    else:
+        print("Usage: python src/dashboard_stats.py --benchmark")
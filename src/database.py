@@ -4,8 +4,16 @@ import os
 import sqlite3
 import datetime
 import bcrypt
-import logging
+import json
 import shutil
+import logging
+import csv
+import gzip
+import time
+import atexit
+import weakref
+import threading
+from urllib.request import pathname2url
 
 # Configure logging to a file in a 'data' directory
 log_dir = "data"
@@ -20,6 +28,142 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Online backup pacing: pages copied per step and the pause between steps
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_PAUSE = 0.005
+
+# Activity log batching: flush after this many seconds or buffered rows
+ACTIVITY_FLUSH_INTERVAL = 2.0
+ACTIVITY_FLUSH_SIZE = 100
+ACTIVITY_INSERT = "INSERT INTO user_activity (user_id, action, description, timestamp) VALUES (?, ?, ?, ?)"
+ACTIVITY_ARCHIVE_DIR = os.path.join("data", "activity_archive")
+
+# bcrypt work factor; the bcrypt_rounds setting is clamped to this range
+BCRYPT_DEFAULT_ROUNDS = 12
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 16
+
+# Tables a backup must contain before it may replace the live database
+RESTORE_REQUIRED_TABLES = {"users", "products", "customers", "sales", "sale_items", "settings"}
+
+# Stock ledger: every stock change is appended as a movement, and the stock
+# of every product is snapshotted once a day so historical stock is a
+# snapshot read plus the movements since. Daily snapshots older than the
+# retention are pruned except month-ends, which are kept for valuation.
+STOCK_MOVEMENT_INSERT = (
+    "INSERT INTO stock_movements (product_id, moved_at, quantity_change, reason, reference_id) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+STOCK_SNAPSHOT_RETENTION_DAYS = 90
+
+# Analytics snapshot layout: fact tables are appended by sale id, dimension
+# tables are small and change in place, so they are rewritten on every export.
+ANALYTICS_STATE_FILE = "_snapshot_state.json"
+ANALYTICS_BATCH_SIZE = 20000
+# Bumped when the snapshot file layout or a table schema changes
+ANALYTICS_SNAPSHOT_VERSION = 2
+ANALYTICS_FACT_QUERIES = {
+    "sales": (
+        "SELECT id, customer_id, user_id, CAST(sale_date AS TEXT) AS sale_date, "
+        "subtotal, discount, tax, total, payment_method, amount_paid, udhaar_amount, "
+        "status, substr(sale_date, 1, 7) AS sale_month "
+        "FROM sales WHERE id > ? AND id <= ? AND id > ? ORDER BY id LIMIT ?"
+    ),
+    "sale_items": (
+        "SELECT si.id, si.sale_id, si.product_id, CAST(si.quantity AS INTEGER) AS quantity, "
+        "si.unit_price, si.total_price, si.unit_cost, substr(s.sale_date, 1, 7) AS sale_month "
+        "FROM sale_items si JOIN sales s ON s.id = si.sale_id "
+        "WHERE si.sale_id > ? AND si.sale_id <= ? AND si.id > ? ORDER BY si.id LIMIT ?"
+    ),
+}
+ANALYTICS_DIMENSION_QUERIES = {
+    "products": (
+        "SELECT id, name, category, description, purchase_price, selling_price, "
+        "CAST(stock_quantity AS INTEGER) AS stock_quantity, "
+        "CAST(min_stock_level AS INTEGER) AS min_stock_level, supplier_id, "
+        "CAST(date_added AS TEXT) AS date_added "
+        "FROM products WHERE id > ? ORDER BY id LIMIT ?"
+    ),
+    "customers": (
+        "SELECT id, name, CAST(phone AS TEXT) AS phone, address, balance, created_at "
+        "FROM customers WHERE id > ? ORDER BY id LIMIT ?"
+    ),
+}
+
+
+class ActivityLogWriter:
+    """
+    Buffers activity log rows in memory and writes them in batches with
+    executemany on a background thread, using its own connection. The buffer
+    is flushed every ACTIVITY_FLUSH_INTERVAL seconds, as soon as it holds
+    ACTIVITY_FLUSH_SIZE rows, and on close (also registered with atexit).
+    """
+
+    def __init__(self, db_path, interval=ACTIVITY_FLUSH_INTERVAL, batch_size=ACTIVITY_FLUSH_SIZE):
+        self.db_path = db_path
+        self.interval = interval
+        self.batch_size = batch_size
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="activity-log-writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, row):
+        """Queue a (user_id, action, description, timestamp) row."""
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def _take(self):
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        return rows
+
+    def _run(self):
+        connection = sqlite3.connect(self.db_path, timeout=10)
+        connection.execute("PRAGMA foreign_keys = ON")
+        try:
+            while not self._stopping:
+                self._wake.wait(self.interval)
+                self._wake.clear()
+                self._write(connection, self._take())
+            self._write(connection, self._take())
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _write(connection, rows):
+        """Write a batch; if it fails, retry row by row so one bad row is all we lose."""
+        if not rows:
+            return
+        try:
+            with connection:
+                connection.executemany(ACTIVITY_INSERT, rows)
+        except sqlite3.Error as e:
+            logger.warning(f"Activity log batch failed ({e}); writing rows one by one")
+            for row in rows:
+                try:
+                    with connection:
+                        connection.execute(ACTIVITY_INSERT, row)
+                except sqlite3.Error as row_error:
+                    logger.error(f"Dropped activity log entry '{row[1]}': {row_error}")
+
+    def close(self):
+        """Flush everything that is buffered and stop the writer thread."""
+        if self._stopping:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._thread.join(timeout=10)
+        atexit.unregister(self.close)
+
 
 class Database:
     """
@@ -27,6 +171,9 @@ class Database:
     This class manages all database interactions in a safe, transactional manner.
     """
 
+    # Every open Database, so a restore can reconnect all of them
+    _instances = weakref.WeakSet()
+
     def __init__(self, db_path=None):
         """Initialize the database path."""
         if db_path is None:
@@ -35,8 +182,12 @@ class Database:
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         self.db_path = db_path
         self.connection = None
+        self.activity_writer = None
+        self._user_cache = {}
+        self._listeners = []
         self._connect()
-        self.initialize_db()
+        self.initialized = self.initialize_db()
+        Database._instances.add(self)
 
     def _connect(self):
         """Establish a database connection."""
@@ -49,6 +200,15 @@ class Database:
             logger.error(f"Database connection error: {e}")
             raise
 
+    def close(self):
+        """Flush the activity log and close the database connection."""
+        if self.activity_writer is not None:
+            self.activity_writer.close()
+            self.activity_writer = None
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
     def __enter__(self):
         """Enter the context manager, establishing a connection."""
         self._connect()
@@ -100,6 +260,84 @@ class Database:
                 self.connection.rollback()
             return [] if fetch == "all" else None
 
+    def _open_reader(self):
+        """Open a separate connection for long reads, e.g. from a worker thread."""
+        connection = sqlite3.connect(self.db_path, timeout=10)
+        connection.execute("PRAGMA query_only = ON")
+        return connection
+
+    def _detached(self, connection):
+        """
+        A Database on the given connection. It skips initialize_db and isn't
+        registered in _instances, so restore_from_backup leaves it alone.
+        """
+        detached = Database.__new__(Database)
+        detached.db_path = self.db_path
+        detached.activity_writer = None
+        detached._user_cache = {}
+        detached._listeners = []
+        detached.initialized = True
+        detached.connection = connection
+        detached.connection.row_factory = sqlite3.Row
+        return detached
+
+    def reader(self):
+        """
+        A read-only Database on its own connection, so the usual get_*
+        methods can run on a worker thread. Close it when done.
+        """
+        return self._detached(self._open_reader())
+
+    def writer(self):
+        """
+        A Database on its own read-write connection, so bulk writes can run
+        on a worker thread. Call it on that thread and close it when done.
+        """
+        connection = sqlite3.connect(self.db_path, timeout=10)
+        connection.execute("PRAGMA foreign_keys = ON")
+        return self._detached(connection)
+
+    def stream_query(self, query, params=None, batch_size=500):
+        """
+        Run a SELECT on a dedicated connection and yield (columns, rows) batches
+        using fetchmany, so large result sets never sit in memory at once.
+        Safe to iterate from a worker thread.
+        """
+        connection = self._open_reader()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(query, params or ())
+            columns = [column[0] for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield columns, rows
+        finally:
+            connection.close()
+
+    def query_columns(self, query, params=None):
+        """Column names a SELECT returns, without running it, on a dedicated connection."""
+        connection = self._open_reader()
+        try:
+            cursor = connection.execute(
+                f"SELECT * FROM ({query}) LIMIT 0", params or ()
+            )
+            return [column[0] for column in cursor.description]
+        finally:
+            connection.close()
+
+    def count_query_rows(self, query, params=None):
+        """Count the rows a SELECT would return, on a dedicated connection."""
+        connection = self._open_reader()
+        try:
+            row = connection.execute(
+                f"SELECT COUNT(*) FROM ({query})", params or ()
+            ).fetchone()
+            return row[0] if row else 0
+        finally:
+            connection.close()
+
     def initialize_db(self):
         """Create all necessary tables and seed default data if they don't exist."""
         try:
@@ -111,7 +349,7 @@ class Database:
                     "CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, name TEXT, username TEXT UNIQUE, email TEXT, password_hash TEXT, role TEXT, created_at TEXT)"
                 )
                 cursor.execute(
-                    "CREATE TABLE IF NOT EXISTS products (id INTEGER PRIMARY KEY, name TEXT, category TEXT, description TEXT, purchase_price REAL, selling_price REAL, stock_quantity INTEGER, min_stock_level INTEGER, supplier_id INTEGER, date_added DATE, FOREIGN KEY (supplier_id) REFERENCES suppliers(id))"
+                    "CREATE TABLE IF NOT EXISTS products (id INTEGER PRIMARY KEY, name TEXT, category TEXT, description TEXT, purchase_price REAL, selling_price REAL, stock_quantity INTEGER, min_stock_level INTEGER, supplier_id INTEGER, date_added DATE, barcode TEXT, FOREIGN KEY (supplier_id) REFERENCES suppliers(id))"
                 )
                 cursor.execute(
                     "CREATE TABLE IF NOT EXISTS customers (id INTEGER PRIMARY KEY, name TEXT, phone TEXT, address TEXT, balance REAL DEFAULT 0.0, created_at TEXT)"
@@ -123,7 +361,7 @@ class Database:
                     "CREATE TABLE IF NOT EXISTS sales (id INTEGER PRIMARY KEY, customer_id INTEGER, user_id INTEGER, sale_date TEXT, subtotal REAL, discount REAL, tax REAL, total REAL, payment_method TEXT, amount_paid REAL, udhaar_amount REAL, status TEXT, FOREIGN KEY (customer_id) REFERENCES customers(id), FOREIGN KEY (user_id) REFERENCES users(id))"
                 )
                 cursor.execute(
-                    "CREATE TABLE IF NOT EXISTS sale_items (id INTEGER PRIMARY KEY, sale_id INTEGER, product_id INTEGER, quantity INTEGER, unit_price REAL, total_price REAL, FOREIGN KEY (sale_id) REFERENCES sales(id) ON DELETE CASCADE, FOREIGN KEY (product_id) REFERENCES products(id))"
+                    "CREATE TABLE IF NOT EXISTS sale_items (id INTEGER PRIMARY KEY, sale_id INTEGER, product_id INTEGER, quantity INTEGER, unit_price REAL, total_price REAL, unit_cost REAL, FOREIGN KEY (sale_id) REFERENCES sales(id) ON DELETE CASCADE, FOREIGN KEY (product_id) REFERENCES products(id))"
                 )
                 cursor.execute(
                     "CREATE TABLE IF NOT EXISTS udhaar_payments (id INTEGER PRIMARY KEY, customer_id INTEGER, amount REAL, payment_date TEXT, recorded_by INTEGER, notes TEXT, FOREIGN KEY (customer_id) REFERENCES customers(id), FOREIGN KEY (recorded_by) REFERENCES users(id))"
@@ -134,6 +372,86 @@ class Database:
                 cursor.execute(
                     "CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)"
                 )
+                # Sales rollups, maintained by create_sale: totals per day, and
+                # revenue (line totals) and cost of goods per day and per month
+                # by product and by customer for profit reports
+                cursor.execute(
+                    "CREATE TABLE IF NOT EXISTS daily_sales (sale_day TEXT PRIMARY KEY, sale_count INTEGER DEFAULT 0, total REAL DEFAULT 0.0, revenue REAL DEFAULT 0.0, discount REAL DEFAULT 0.0, cost REAL DEFAULT 0.0)"
+                )
+                for period in ("daily", "monthly"):
+                    key = "sale_day" if period == "daily" else "sale_month"
+                    cursor.execute(
+                        f"CREATE TABLE IF NOT EXISTS {period}_product_sales ({key} TEXT, product_id INTEGER, quantity INTEGER DEFAULT 0, revenue REAL DEFAULT 0.0, cost REAL DEFAULT 0.0, PRIMARY KEY ({key}, product_id)) WITHOUT ROWID"
+                    )
+                    cursor.execute(
+                        f"CREATE TABLE IF NOT EXISTS {period}_customer_sales ({key} TEXT, customer_id INTEGER, sale_count INTEGER DEFAULT 0, revenue REAL DEFAULT 0.0, discount REAL DEFAULT 0.0, cost REAL DEFAULT 0.0, PRIMARY KEY ({key}, customer_id)) WITHOUT ROWID"
+                    )
+                cursor.execute(
+                    "CREATE TABLE IF NOT EXISTS purchase_orders (id INTEGER PRIMARY KEY, supplier_id INTEGER, created_by INTEGER, order_date TEXT, status TEXT DEFAULT 'Open', received_date TEXT, notes TEXT, FOREIGN KEY (supplier_id) REFERENCES suppliers(id), FOREIGN KEY (created_by) REFERENCES users(id))"
+                )
+                cursor.execute(
+                    "CREATE TABLE IF NOT EXISTS purchase_order_items (id INTEGER PRIMARY KEY, order_id INTEGER, product_id INTEGER, quantity INTEGER, received_quantity INTEGER DEFAULT 0, unit_cost REAL, FOREIGN KEY (order_id) REFERENCES purchase_orders(id) ON DELETE CASCADE, FOREIGN KEY (product_id) REFERENCES products(id))"
+                )
+                # Append-only stock ledger and end-of-day stock snapshots
+                cursor.execute(
+                    "CREATE TABLE IF NOT EXISTS stock_movements (id INTEGER PRIMARY KEY, product_id INTEGER, moved_at TEXT, quantity_change INTEGER, reason TEXT, reference_id INTEGER)"
+                )
+                cursor.execute(
+                    "CREATE TABLE IF NOT EXISTS stock_snapshots (snapshot_day TEXT, product_id INTEGER, quantity INTEGER, unit_cost REAL, PRIMARY KEY (snapshot_day, product_id))"
+                )
+                cursor.execute(
+                    "CREATE TABLE IF NOT EXISTS product_fingerprints (product_id INTEGER PRIMARY KEY, row_hash TEXT, synced_at TEXT, FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE)"
+                )
+
+                # Columns added after the first release
+                self._ensure_column(cursor, "products", "barcode", "TEXT")
+                if self._ensure_column(cursor, "sale_items", "unit_cost", "REAL"):
+                    # Earlier lines are costed at the current purchase price,
+                    # the best estimate left
+                    cursor.execute(
+                        "UPDATE sale_items SET unit_cost = (SELECT purchase_price FROM products WHERE products.id = sale_items.product_id)"
+                    )
+                profit_columns_added = False
+                for column in ("revenue", "discount", "cost"):
+                    if self._ensure_column(cursor, "daily_sales", column, "REAL DEFAULT 0.0"):
+                        profit_columns_added = True
+
+                # Indexes for date-range reports and exports
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_sales_sale_date ON sales(sale_date)"
+                )
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_sale_items_sale_id ON sale_items(sale_id)"
+                )
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_user_activity_timestamp ON user_activity(timestamp)"
+                )
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_purchase_order_items_order_id ON purchase_order_items(order_id)"
+                )
+                # Point-in-time stock: movements in a date range, per product
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_stock_movements_moved_at ON stock_movements(moved_at, product_id, quantity_change)"
+                )
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_stock_movements_product ON stock_movements(product_id)"
+                )
+                # Barcode lookups; NULLs are allowed for unlabelled products
+                cursor.execute(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS idx_products_barcode ON products(barcode)"
+                )
+                # Low-stock counts: WHERE stock_quantity - min_stock_level <= 0
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_products_stock_gap ON products(stock_quantity - min_stock_level)"
+                )
+
+                # Databases from before the rollups (or their profit columns) existed
+                if profit_columns_added or cursor.execute("SELECT 1 FROM daily_sales LIMIT 1").fetchone() is None:
+                    self._rebuild_sales_rollups(cursor)
+
+                # Databases from before the ledger existed
+                if cursor.execute("SELECT 1 FROM stock_movements LIMIT 1").fetchone() is None:
+                    self._rebuild_stock_movements(cursor)
 
                 # Seed Default Data
                 current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -143,9 +461,7 @@ class Database:
                     )
                     is None
                 ):
-                    admin_pass = bcrypt.hashpw(
-                        "admin".encode("utf-8"), bcrypt.gensalt()
-                    ).decode("utf-8")
+                    admin_pass = self.hash_password("admin")
                     self.execute_query(
                         "INSERT INTO users (name, username, password_hash, role, created_at) VALUES (?, ?, ?, ?, ?)",
                         ("Administrator", "admin", admin_pass, "Admin", current_time),
@@ -163,6 +479,11 @@ class Database:
                 default_settings = {
                     "shop_name": "MAHER ZARAI MARKAZ",
                     "theme": "light_green",
+                    "auto_backup_enabled": "true",
+                    "auto_backup_time": "21:00",
+                    "backup_retention_days": "30",
+                    "activity_retention_days": "365",
+                    "bcrypt_rounds": str(BCRYPT_DEFAULT_ROUNDS),
                 }
                 for key, value in default_settings.items():
                     self.execute_query(
@@ -176,25 +497,170 @@ class Database:
             logger.error(f"Database initialization failed: {e}")
             return False
 
+    @staticmethod
+    def _record_opening_stock(cursor, moved_at):
+        """Ledger an opening movement for products with stock but no movements yet."""
+        cursor.execute(
+            "INSERT INTO stock_movements (product_id, moved_at, quantity_change, reason) SELECT p.id, ?, p.stock_quantity, 'opening' FROM products p WHERE COALESCE(p.stock_quantity, 0) != 0 AND NOT EXISTS (SELECT 1 FROM stock_movements m WHERE m.product_id = p.id)",
+            (moved_at,),
+        )
+
+    @staticmethod
+    def _rebuild_stock_movements(cursor):
+        """
+        Start the ledger from history: a movement for every sale line, and an
+        opening balance on each product's date_added that makes the ledger
+        add up to today's stock. Adjustments made before the ledger existed
+        are folded into the opening balance.
+        """
+        cursor.execute(
+            "INSERT INTO stock_movements (product_id, moved_at, quantity_change, reason, reference_id) SELECT si.product_id, s.sale_date, -si.quantity, 'sale', s.id FROM sale_items si JOIN sales s ON si.sale_id = s.id"
+        )
+        cursor.execute(
+            "INSERT INTO stock_movements (product_id, moved_at, quantity_change, reason) SELECT p.id, COALESCE(p.date_added, ''), COALESCE(p.stock_quantity, 0) - COALESCE(m.total, 0), 'opening' FROM products p LEFT JOIN (SELECT product_id, SUM(quantity_change) AS total FROM stock_movements GROUP BY product_id) m ON m.product_id = p.id WHERE COALESCE(p.stock_quantity, 0) - COALESCE(m.total, 0) != 0"
+        )
+
+    @staticmethod
+    def _rebuild_sales_rollups(cursor):
+        """Recompute the daily, product and customer sales rollups from the sales tables."""
+        lines = "(SELECT sale_id, SUM(total_price) AS revenue, SUM(quantity * COALESCE(unit_cost, 0)) AS cost FROM sale_items GROUP BY sale_id)"
+        cursor.execute("DELETE FROM daily_sales")
+        cursor.execute(
+            f"INSERT INTO daily_sales (sale_day, sale_count, total, revenue, discount, cost) SELECT substr(s.sale_date, 1, 10), COUNT(*), COALESCE(SUM(s.total), 0), COALESCE(SUM(l.revenue), 0), COALESCE(SUM(s.discount), 0), COALESCE(SUM(l.cost), 0) FROM sales s LEFT JOIN {lines} l ON l.sale_id = s.id GROUP BY substr(s.sale_date, 1, 10)"
+        )
+        cursor.execute("DELETE FROM daily_customer_sales")
+        cursor.execute(
+            f"INSERT INTO daily_customer_sales (sale_day, customer_id, sale_count, revenue, discount, cost) SELECT substr(s.sale_date, 1, 10), s.customer_id, COUNT(*), COALESCE(SUM(l.revenue), 0), COALESCE(SUM(s.discount), 0), COALESCE(SUM(l.cost), 0) FROM sales s LEFT JOIN {lines} l ON l.sale_id = s.id GROUP BY substr(s.sale_date, 1, 10), s.customer_id"
+        )
+        cursor.execute("DELETE FROM daily_product_sales")
+        cursor.execute(
+            "INSERT INTO daily_product_sales (sale_day, product_id, quantity, revenue, cost) SELECT substr(s.sale_date, 1, 10), si.product_id, SUM(si.quantity), COALESCE(SUM(si.total_price), 0), COALESCE(SUM(si.quantity * COALESCE(si.unit_cost, 0)), 0) FROM sale_items si JOIN sales s ON si.sale_id = s.id GROUP BY substr(s.sale_date, 1, 10), si.product_id"
+        )
+        cursor.execute("DELETE FROM monthly_product_sales")
+        cursor.execute(
+            "INSERT INTO monthly_product_sales (sale_month, product_id, quantity, revenue, cost) SELECT substr(sale_day, 1, 7), product_id, SUM(quantity), SUM(revenue), SUM(cost) FROM daily_product_sales GROUP BY substr(sale_day, 1, 7), product_id"
+        )
+        cursor.execute("DELETE FROM monthly_customer_sales")
+        cursor.execute(
+            "INSERT INTO monthly_customer_sales (sale_month, customer_id, sale_count, revenue, discount, cost) SELECT substr(sale_day, 1, 7), customer_id, SUM(sale_count), SUM(revenue), SUM(discount), SUM(cost) FROM daily_customer_sales GROUP BY substr(sale_day, 1, 7), customer_id"
+        )
+
+    @staticmethod
+    def _ensure_column(cursor, table, column, definition):
+        """Add a column that databases created by older versions lack. Returns True if added."""
+        columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            logger.info(f"Added column {table}.{column}")
+            return True
+        return False
+
+    # --- Change Events ---
+    def subscribe(self, callback):
+        """
+        Call callback(event, data) after each committed change:
+        "sale" (sale_day, total, udhaar_amount), "payment" (customer_id,
+        amount), "stock" (product_id, name, category, old_quantity,
+        new_quantity, old_min_stock_level, min_stock_level), "products" and
+        "customers" (changes the other events do not describe) and "reset"
+        (database restored).
+        """
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def publish(self, event, **data):
+        """Tell subscribers about a committed change, e.g. one made by another connection."""
+        for callback in list(self._listeners):
+            try:
+                callback(event, data)
+            except Exception as e:
+                logger.error(f"Change listener failed for '{event}': {e}")
+
     # --- User Management ---
+    @staticmethod
+    def hash_password(password, rounds=BCRYPT_DEFAULT_ROUNDS):
+        """Hash a password with bcrypt at the given work factor."""
+        return bcrypt.hashpw(
+            password.encode("utf-8"), bcrypt.gensalt(rounds)
+        ).decode("utf-8")
+
+    @staticmethod
+    def hash_rounds(password_hash):
+        """Work factor stored in a bcrypt hash ("$2b$12$..."), or None."""
+        try:
+            return int(password_hash.split("$")[2])
+        except (AttributeError, IndexError, ValueError):
+            return None
+
+    @staticmethod
+    def check_password(password, password_hash, rounds=None):
+        """
+        Check a password against its bcrypt hash. Returns (ok, new_hash);
+        new_hash is a rehash at `rounds` when the stored work factor differs.
+        Uses no connection, so it can run on a worker thread.
+        """
+        try:
+            ok = bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+        except ValueError:
+            return False, None
+
+        new_hash = None
+        if ok and rounds is not None and Database.hash_rounds(password_hash) != rounds:
+            new_hash = Database.hash_password(password, rounds)
+        return ok, new_hash
+
+    def password_rounds(self):
+        """Configured bcrypt work factor (the bcrypt_rounds setting)."""
+        try:
+            rounds = int(self.get_setting("bcrypt_rounds") or BCRYPT_DEFAULT_ROUNDS)
+        except ValueError:
+            rounds = BCRYPT_DEFAULT_ROUNDS
+        return max(BCRYPT_MIN_ROUNDS, min(BCRYPT_MAX_ROUNDS, rounds))
+
+    def get_user_by_username(self, username):
+        """User record by username, cached until the users table changes."""
+        user = self._user_cache.get(username)
+        if user is None:
+            user = self.execute_query(
+                "SELECT * FROM users WHERE username = ?", (username,), fetch="one"
+            )
+            if user is None:
+                return None
+            self._user_cache[username] = user
+        return dict(user)
+
+    def complete_login(self, user, new_hash=None):
+        """Record a successful login, storing an upgraded password hash if given."""
+        if new_hash:
+            self.execute_query(
+                "UPDATE users SET password_hash = ? WHERE id = ?", (new_hash, user["id"])
+            )
+            self._user_cache.clear()
+            user["password_hash"] = new_hash
+            logger.info(f"Password hash for '{user['username']}' upgraded to the configured cost.")
+        self.log_activity(user["id"], "Login", f"User '{user['username']}' logged in.")
+
     def verify_user(self, username, password):
-        user = self.execute_query(
-            "SELECT * FROM users WHERE username = ?", (username,), fetch="one"
+        user = self.get_user_by_username(username)
+        if user is None:
+            return None
+        ok, new_hash = self.check_password(
+            password, user["password_hash"], self.password_rounds()
         )
-        if user and bcrypt.checkpw(
-            password.encode("utf-8"), user["password_hash"].encode("utf-8")
-        ):
-            self.log_activity(user["id"], "Login", f"User '{username}' logged in.")
-            return user
-        return None
+        if not ok:
+            return None
+        self.complete_login(user, new_hash)
+        return user
 
     def get_all_users(self):
         return self.execute_query("SELECT * FROM users", fetch="all")
 
     def add_user(self, name, username, password, role):
-        hashed_pass = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode(
-            "utf-8"
-        )
+        hashed_pass = self.hash_password(password, self.password_rounds())
+        self._user_cache.clear()
         return self.execute_query(
             "INSERT INTO users (name, username, password_hash, role, created_at) VALUES (?, ?, ?, ?, ?)",
             (
@@ -207,69 +673,235 @@ class Database:
         )
 
     def update_user(self, user_id, name, username, role):
+        self._user_cache.clear()
         return self.execute_query(
             "UPDATE users SET name = ?, username = ?, role = ? WHERE id = ?",
             (name, username, role, user_id),
         )
 
     def delete_user(self, user_id):
+        self._user_cache.clear()
         return self.execute_query("DELETE FROM users WHERE id = ?", (user_id,))
 
     def update_password(self, user_id, new_password):
-        hashed_pass = bcrypt.hashpw(
-            new_password.encode("utf-8"), bcrypt.gensalt()
-        ).decode("utf-8")
+        hashed_pass = self.hash_password(new_password, self.password_rounds())
+        self._user_cache.clear()
         return self.execute_query(
             "UPDATE users SET password_hash = ? WHERE id = ?", (hashed_pass, user_id)
         )
 
     # --- Product Management ---
     def add_product(self, data):
-        return self.execute_query(
-            "INSERT INTO products (name, category, purchase_price, selling_price, stock_quantity, min_stock_level, supplier_id, date_added) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-            (
-                data["name"],
-                data["category"],
-                data["purchase_price"],
-                data["selling_price"],
-                data["stock_quantity"],
-                data["min_stock_level"],
-                data.get("supplier_id"),
-                data.get("date_added", datetime.datetime.now().strftime("%Y-%m-%d")),
-            ),
+        try:
+            with self as cursor:
+                cursor.execute(
+                    "INSERT INTO products (name, category, purchase_price, selling_price, stock_quantity, min_stock_level, supplier_id, date_added, barcode) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        data["name"],
+                        data["category"],
+                        data["purchase_price"],
+                        data["selling_price"],
+                        data["stock_quantity"],
+                        data["min_stock_level"],
+                        data.get("supplier_id"),
+                        data.get("date_added", datetime.datetime.now().strftime("%Y-%m-%d")),
+                        data.get("barcode") or None,
+                    ),
+                )
+                result = cursor.lastrowid
+                if data["stock_quantity"]:
+                    cursor.execute(
+                        STOCK_MOVEMENT_INSERT,
+                        (
+                            result,
+                            datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                            data["stock_quantity"],
+                            "opening",
+                            None,
+                        ),
+                    )
+        except sqlite3.Error as e:
+            logger.error(f"Failed to add product: {e}")
+            return None
+        self.publish("products")
+        return result
+
+    def bulk_import_products(self, insert_rows, update_rows):
+        """
+        Insert and update many products in a single transaction with executemany.
+        insert_rows are (id, name, category, description, purchase_price,
+        selling_price, stock_quantity, min_stock_level, supplier_id, date_added)
+        tuples, where a None id lets SQLite assign one. update_rows are
+        (name, category, description, purchase_price, selling_price,
+        stock_quantity, min_stock_level, supplier_id, id) tuples.
+        """
+        moved_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            with self as cursor:
+                cursor.executemany(
+                    "INSERT INTO products (id, name, category, description, purchase_price, selling_price, stock_quantity, min_stock_level, supplier_id, date_added) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    insert_rows,
+                )
+                # Ledger the difference before the new stock overwrites it
+                cursor.executemany(
+                    "INSERT INTO stock_movements (product_id, moved_at, quantity_change, reason) SELECT id, ?, ? - COALESCE(stock_quantity, 0), 'import' FROM products WHERE id = ? AND COALESCE(stock_quantity, 0) != ?",
+                    [(moved_at, row[5] or 0, row[8], row[5] or 0) for row in update_rows],
+                )
+                cursor.executemany(
+                    "UPDATE products SET name=?, category=?, description=?, purchase_price=?, selling_price=?, stock_quantity=?, min_stock_level=?, supplier_id=? WHERE id=?",
+                    update_rows,
+                )
+                self._record_opening_stock(cursor, moved_at)
+            self.publish("products")
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Bulk product import failed: {e}")
+            return False
+
+    def get_product_fingerprints(self, first_id, last_id):
+        """Return {product_id: row_hash} for price-list sync within an id range."""
+        rows = self.execute_query(
+            "SELECT product_id, row_hash FROM product_fingerprints WHERE product_id BETWEEN ? AND ?",
+            (first_id, last_id),
+            fetch="all",
         )
+        return {row["product_id"]: row["row_hash"] for row in rows}
+
+    def apply_price_sync(self, update_rows, fingerprint_rows):
+        """
+        Apply a price-list sync in one transaction. update_rows are
+        (purchase_price, selling_price, stock_quantity, id) tuples where None
+        keeps the current value; fingerprint_rows are (product_id, row_hash,
+        synced_at) tuples.
+        """
+        moved_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            with self as cursor:
+                cursor.executemany(
+                    "INSERT INTO stock_movements (product_id, moved_at, quantity_change, reason) SELECT id, ?, ? - COALESCE(stock_quantity, 0), 'price sync' FROM products WHERE id = ? AND COALESCE(stock_quantity, 0) != ?",
+                    [
+                        (moved_at, row[2], row[3], row[2])
+                        for row in update_rows
+                        if row[2] is not None
+                    ],
+                )
+                cursor.executemany(
+                    "UPDATE products SET purchase_price=COALESCE(?, purchase_price), selling_price=COALESCE(?, selling_price), stock_quantity=COALESCE(?, stock_quantity) WHERE id=?",
+                    update_rows,
+                )
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO product_fingerprints (product_id, row_hash, synced_at) VALUES (?, ?, ?)",
+                    fingerprint_rows,
+                )
+            self.publish("products")
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Price list sync failed: {e}")
+            return False
 
-    def get_all_products(self):
+    def update_product(self, product_id, data):
         try:
-            products = self.execute_query(
-                "SELECT p.*, s.name as supplier_name FROM products p LEFT JOIN suppliers s ON p.supplier_id = s.id ORDER BY p.name",
-                fetch="all",
+            with self as cursor:
+                old = cursor.execute(
+                    "SELECT * FROM products WHERE id = ?", (product_id,)
+                ).fetchone()
+                cursor.execute(
+                    "UPDATE products SET name=?, category=?, purchase_price=?, selling_price=?, stock_quantity=?, min_stock_level=?, supplier_id=?, barcode=? WHERE id=?",
+                    (
+                        data["name"],
+                        data["category"],
+                        data["purchase_price"],
+                        data["selling_price"],
+                        data["stock_quantity"],
+                        data["min_stock_level"],
+                        data.get("supplier_id"),
+                        data.get("barcode") or None,
+                        product_id,
+                    ),
+                )
+                moved = (data["stock_quantity"] or 0) - ((old["stock_quantity"] or 0) if old else 0)
+                if old is not None and moved:
+                    cursor.execute(
+                        STOCK_MOVEMENT_INSERT,
+                        (
+                            product_id,
+                            datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                            moved,
+                            "edit",
+                            None,
+                        ),
+                    )
+        except sqlite3.Error as e:
+            logger.error(f"Failed to update product: {e}")
+            return None
+        if old is not None:
+            change = self._stock_change(
+                product_id, old, data["stock_quantity"], data["min_stock_level"]
             )
-            if products is None:
-                logger.warning("No products found in the database.")
-                return []
-            return products
+            change["name"] = data["name"]
+            change["category"] = data["category"]
+            self.publish("stock", **change)
+        return True
+
+    def adjust_stock(self, product_id, change, reason="adjustment"):
+        """Add change (may be negative) to a product's stock. Returns True on success."""
+        try:
+            with self as cursor:
+                product = cursor.execute(
+                    "SELECT name, category, stock_quantity, min_stock_level FROM products WHERE id = ?",
+                    (product_id,),
+                ).fetchone()
+                if product is None:
+                    return False
+                cursor.execute(
+                    "UPDATE products SET stock_quantity = stock_quantity + ? WHERE id = ?",
+                    (change, product_id),
+                )
+                cursor.execute(
+                    STOCK_MOVEMENT_INSERT,
+                    (
+                        product_id,
+                        datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        change,
+                        reason or "adjustment",
+                        None,
+                    ),
+                )
+            self.publish(
+                "stock",
+                **self._stock_change(product_id, product, (product["stock_quantity"] or 0) + change),
+            )
+            return True
         except sqlite3.Error as e:
-            logger.error(f"Error getting products: {e}")
-            return []
+            logger.error(f"Failed to adjust stock: {e}")
+            return False
 
-    def update_product(self, product_id, data):
+    @staticmethod
+    def _stock_change(product_id, old, new_quantity, new_min_stock_level=None):
+        """Data for a "stock" event from the product row before the change."""
+        old_min = old["min_stock_level"] or 0
+        return {
+            "product_id": product_id,
+            "name": old["name"],
+            "category": old["category"],
+            "old_quantity": old["stock_quantity"] or 0,
+            "new_quantity": new_quantity,
+            "old_min_stock_level": old_min,
+            "min_stock_level": old_min if new_min_stock_level is None else new_min_stock_level,
+        }
+
+    def get_low_stock_products(self):
+        """Products at or below their minimum stock level (uses the stock-gap index)."""
         return self.execute_query(
-            "UPDATE products SET name=?, category=?, purchase_price=?, selling_price=?, stock_quantity=?, min_stock_level=?, supplier_id=? WHERE id=?",
-            (
-                data["name"],
-                data["category"],
-                data["purchase_price"],
-                data["selling_price"],
-                data["stock_quantity"],
-                data["min_stock_level"],
-                data.get("supplier_id"),
-                product_id,
-            ),
+            "SELECT id, name, category, stock_quantity, min_stock_level FROM products WHERE stock_quantity - min_stock_level <= 0",
+            fetch="all",
         )
 
     def delete_product(self, product_id):
-        return self.execute_query("DELETE FROM products WHERE id=?", (product_id,))
+        result = self.execute_query("DELETE FROM products WHERE id=?", (product_id,))
+        if result:
+            self.publish("products")
+        return result
 
     def get_product_categories(self):
         return self.execute_query(
@@ -281,9 +913,16 @@ class Database:
             "SELECT * FROM products WHERE id = ?", (product_id,), fetch="one"
         )
 
+    def get_scan_products(self):
+        """Fields the billing scan map needs, for every product."""
+        return self.execute_query(
+            "SELECT id, name, selling_price, stock_quantity, barcode FROM products",
+            fetch="all",
+        )
+
     # --- Customer Management ---
     def add_customer(self, name, phone, address):
-        return self.execute_query(
+        result = self.execute_query(
             "INSERT INTO customers (name, phone, address, created_at) VALUES (?, ?, ?, ?)",
             (
                 name,
@@ -292,6 +931,9 @@ class Database:
                 datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             ),
         )
+        if result:
+            self.publish("customers")
+        return result
 
     def get_all_customers(self):
         return self.execute_query("SELECT * FROM customers ORDER BY name", fetch="all")
@@ -303,7 +945,33 @@ class Database:
         )
 
     def delete_customer(self, customer_id):
-        return self.execute_query("DELETE FROM customers WHERE id=?", (customer_id,))
+        result = self.execute_query("DELETE FROM customers WHERE id=?", (customer_id,))
+        if result:
+            self.publish("customers")
+        return result
+
+    def bulk_import_customers(self, insert_rows, update_rows):
+        """
+        Insert and update many customers in a single transaction.
+        insert_rows are (id, name, phone, address, balance, created_at) tuples;
+        update_rows are (name, phone, address, id) tuples. Balances of existing
+        customers are left alone since they are driven by sales and payments.
+        """
+        try:
+            with self as cursor:
+                cursor.executemany(
+                    "INSERT INTO customers (id, name, phone, address, balance, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    insert_rows,
+                )
+                cursor.executemany(
+                    "UPDATE customers SET name=?, phone=?, address=? WHERE id=?",
+                    update_rows,
+                )
+            self.publish("customers")
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Bulk customer import failed: {e}")
+            return False
 
     # --- Supplier Management ---
     def add_supplier(self, name, contact, phone, email, address):
@@ -331,6 +999,304 @@ class Database:
     def delete_supplier(self, supplier_id):
         return self.execute_query("DELETE FROM suppliers WHERE id=?", (supplier_id,))
 
+    def bulk_import_suppliers(self, insert_rows, update_rows):
+        """
+        Insert and update many suppliers in a single transaction.
+        insert_rows are (id, name, contact_person, phone, email, address,
+        created_at) tuples; update_rows are (name, contact_person, phone,
+        email, address, id) tuples.
+        """
+        try:
+            with self as cursor:
+                cursor.executemany(
+                    "INSERT INTO suppliers (id, name, contact_person, phone, email, address, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    insert_rows,
+                )
+                cursor.executemany(
+                    "UPDATE suppliers SET name=?, contact_person=?, phone=?, email=?, address=? WHERE id=?",
+                    update_rows,
+                )
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Bulk supplier import failed: {e}")
+            return False
+
+    # --- Purchase Orders ---
+    def create_purchase_order(self, supplier_id, items, user_id, notes=""):
+        """
+        Create an open purchase order. items are dicts with product_id,
+        quantity and unit_cost. Returns the order id, or None on failure.
+        """
+        try:
+            with self as cursor:
+                cursor.execute(
+                    "INSERT INTO purchase_orders (supplier_id, created_by, order_date, status, notes) VALUES (?, ?, ?, 'Open', ?)",
+                    (
+                        supplier_id,
+                        user_id,
+                        datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        notes,
+                    ),
+                )
+                order_id = cursor.lastrowid
+                cursor.executemany(
+                    "INSERT INTO purchase_order_items (order_id, product_id, quantity, unit_cost) VALUES (?, ?, ?, ?)",
+                    [
+                        (order_id, item["product_id"], item["quantity"], item.get("unit_cost") or 0.0)
+                        for item in items
+                    ],
+                )
+            return order_id
+        except sqlite3.Error as e:
+            logger.error(f"Failed to create purchase order: {e}")
+            return None
+
+    def get_purchase_orders(self, supplier_id=None):
+        """Purchase orders, newest first, with their line count and value."""
+        query = """
+            SELECT po.*, s.name AS supplier_name,
+                   COUNT(poi.id) AS item_count,
+                   COALESCE(SUM(poi.quantity * poi.unit_cost), 0) AS total
+            FROM purchase_orders po
+            LEFT JOIN suppliers s ON po.supplier_id = s.id
+            LEFT JOIN purchase_order_items poi ON poi.order_id = po.id
+        """
+        params = ()
+        if supplier_id is not None:
+            query += " WHERE po.supplier_id = ?"
+            params = (supplier_id,)
+        query += " GROUP BY po.id ORDER BY po.order_date DESC, po.id DESC"
+        return self.execute_query(query, params, fetch="all")
+
+    def get_purchase_order_items(self, order_id):
+        """Lines of a purchase order with the product's name, stock and cost."""
+        return self.execute_query(
+            """
+            SELECT poi.*, p.name AS product_name, p.stock_quantity, p.purchase_price
+            FROM purchase_order_items poi
+            JOIN products p ON poi.product_id = p.id
+            WHERE poi.order_id = ?
+            ORDER BY p.name
+            """,
+            (order_id,),
+            fetch="all",
+        )
+
+    def cancel_purchase_order(self, order_id):
+        return self.execute_query(
+            "UPDATE purchase_orders SET status = 'Cancelled' WHERE id = ? AND status = 'Open'",
+            (order_id,),
+        )
+
+    def receive_goods(self, lines, update_cost=True, order_id=None):
+        """
+        Book a delivery into stock in one transaction.
+
+        lines are (product_id, quantity, unit_cost) tuples; a product may
+        appear more than once. With update_cost, purchase_price becomes the
+        weighted average of the stock on hand and the delivery. With
+        order_id, the lines are also recorded against that purchase order,
+        which is marked Received once every line is complete (Partial until
+        then). Returns the number of products updated, or None on failure.
+        """
+        received = {}  # product_id -> [quantity, cost of the quantity]
+        for product_id, quantity, unit_cost in lines:
+            if quantity <= 0:
+                continue
+            line = received.setdefault(product_id, [0, 0.0])
+            line[0] += quantity
+            line[1] += quantity * (unit_cost or 0.0)
+        if not received:
+            return 0
+
+        try:
+            with self as cursor:
+                ids = list(received)
+                products = {}
+                # Stay under SQLite's limit on bound parameters
+                for start in range(0, len(ids), 500):
+                    chunk = ids[start:start + 500]
+                    for row in cursor.execute(
+                        f"SELECT id, name, category, stock_quantity, min_stock_level, purchase_price FROM products WHERE id IN ({', '.join('?' * len(chunk))})",
+                        chunk,
+                    ):
+                        products[row["id"]] = row
+
+                update_rows = []
+                stock_changes = []
+                for product_id, (quantity, cost) in received.items():
+                    product = products.get(product_id)
+                    if product is None:
+                        continue
+                    on_hand = max(product["stock_quantity"] or 0, 0)
+                    price = product["purchase_price"]
+                    if update_cost and cost > 0:
+                        price = round(((price or 0.0) * on_hand + cost) / (on_hand + quantity), 2)
+                    update_rows.append((quantity, price, product_id))
+                    stock_changes.append(
+                        self._stock_change(product_id, product, (product["stock_quantity"] or 0) + quantity)
+                    )
+                cursor.executemany(
+                    "UPDATE products SET stock_quantity = stock_quantity + ?, purchase_price = ? WHERE id = ?",
+                    update_rows,
+                )
+                moved_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                cursor.executemany(
+                    STOCK_MOVEMENT_INSERT,
+                    [
+                        (product_id, moved_at, quantity, "purchase", order_id)
+                        for quantity, _, product_id in update_rows
+                    ],
+                )
+
+                if order_id is not None:
+                    cursor.executemany(
+                        "UPDATE purchase_order_items SET received_quantity = received_quantity + ? WHERE order_id = ? AND product_id = ?",
+                        [(quantity, order_id, product_id) for product_id, (quantity, _) in received.items()],
+                    )
+                    cursor.execute(
+                        """
+                        UPDATE purchase_orders
+                        SET status = CASE WHEN EXISTS (
+                                SELECT 1 FROM purchase_order_items
+                                WHERE order_id = purchase_orders.id AND received_quantity < quantity
+                            ) THEN 'Partial' ELSE 'Received' END,
+                            received_date = ?
+                        WHERE id = ?
+                        """,
+                        (datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), order_id),
+                    )
+            for change in stock_changes:
+                self.publish("stock", **change)
+            return len(update_rows)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to receive goods: {e}")
+            return None
+
+    # --- Stock History ---
+    def take_stock_snapshot(self, day=None):
+        """
+        Snapshot every product's stock at the end of day (YYYY-MM-DD,
+        default yesterday): the live stock less the movements since.
+        Returns True on success.
+        """
+        if day is None:
+            day = (datetime.date.today() - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+        next_day = self._next_day(day)
+        try:
+            with self as cursor:
+                cursor.execute(
+                    """
+                    INSERT OR REPLACE INTO stock_snapshots (snapshot_day, product_id, quantity, unit_cost)
+                    SELECT ?, p.id, COALESCE(p.stock_quantity, 0) - COALESCE(m.delta, 0), p.purchase_price
+                    FROM products p
+                    LEFT JOIN (
+                        SELECT product_id, SUM(quantity_change) AS delta
+                        FROM stock_movements WHERE moved_at >= ?
+                        GROUP BY product_id
+                    ) m ON m.product_id = p.id
+                    """,
+                    (day, next_day),
+                )
+            logger.info(f"Stock snapshot taken for {day}")
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Failed to take stock snapshot: {e}")
+            return False
+
+    def ensure_stock_snapshot(self):
+        """Snapshot yesterday's closing stock if not done yet, and prune old snapshots."""
+        yesterday = (datetime.date.today() - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+        if self.execute_query(
+            "SELECT 1 AS found FROM stock_snapshots WHERE snapshot_day = ? LIMIT 1",
+            (yesterday,),
+            fetch="one",
+        ):
+            return True
+        if not self.take_stock_snapshot(yesterday):
+            return False
+
+        # Keep month-end snapshots (day after is the 1st) beyond the retention
+        cutoff = (datetime.date.today() - datetime.timedelta(days=STOCK_SNAPSHOT_RETENTION_DAYS)).strftime("%Y-%m-%d")
+        return self.execute_query(
+            "DELETE FROM stock_snapshots WHERE snapshot_day < ? AND strftime('%d', snapshot_day, '+1 day') != '01'",
+            (cutoff,),
+        )
+
+    @staticmethod
+    def _next_day(day):
+        return (datetime.datetime.strptime(day, "%Y-%m-%d") + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+
+    def get_stock_on(self, day):
+        """
+        Every product's stock and unit cost at the end of day (YYYY-MM-DD).
+
+        Starts from whichever is nearest to day - the snapshot on or before
+        it, the first snapshot after it, or the live stock - and applies only
+        the movements in between. Unit costs come from the snapshot, or the
+        current purchase price when reading back from the live stock.
+        """
+        today = datetime.date.today()
+        target = datetime.datetime.strptime(day, "%Y-%m-%d").date()
+        bounds = self.execute_query(
+            "SELECT (SELECT MAX(snapshot_day) FROM stock_snapshots WHERE snapshot_day <= ?) AS before_day, (SELECT MIN(snapshot_day) FROM stock_snapshots WHERE snapshot_day > ?) AS after_day",
+            (day, day),
+            fetch="one",
+        ) or {}
+
+        # (distance in days, base snapshot day or None for live stock)
+        candidates = [(abs((today - target).days), None)]
+        for snapshot_day in (bounds.get("before_day"), bounds.get("after_day")):
+            if snapshot_day:
+                distance = abs((datetime.datetime.strptime(snapshot_day, "%Y-%m-%d").date() - target).days)
+                candidates.append((distance, snapshot_day))
+        _, base = min(candidates, key=lambda c: c[0])
+
+        end = self._next_day(day)
+        if base is None:
+            # Live stock less everything moved after day
+            quantity, cost, sign = "COALESCE(p.stock_quantity, 0)", "p.purchase_price", "-"
+            start, stop = end, "9999-12-31"
+        elif base <= day:
+            # Snapshot plus what moved after it up to day
+            quantity, cost, sign = "COALESCE(s.quantity, 0)", "COALESCE(s.unit_cost, p.purchase_price)", "+"
+            start, stop = self._next_day(base), end
+        else:
+            # Later snapshot less what moved between day and it
+            quantity, cost, sign = "COALESCE(s.quantity, 0)", "COALESCE(s.unit_cost, p.purchase_price)", "-"
+            start, stop = end, self._next_day(base)
+
+        return self.execute_query(
+            f"""
+            SELECT p.id, p.name, p.category,
+                   {quantity} {sign} COALESCE(m.delta, 0) AS quantity,
+                   {cost} AS unit_cost
+            FROM products p
+            LEFT JOIN stock_snapshots s ON s.product_id = p.id AND s.snapshot_day = ?
+            LEFT JOIN (
+                SELECT product_id, SUM(quantity_change) AS delta
+                FROM stock_movements WHERE moved_at >= ? AND moved_at < ?
+                GROUP BY product_id
+            ) m ON m.product_id = p.id
+            ORDER BY p.category, p.name
+            """,
+            (base or "", start, stop),
+            fetch="all",
+        )
+
+    def get_stock_movements(self, product_id, start_date=None, end_date=None):
+        """Ledger entries of a product, oldest first, within optional dates."""
+        query = "SELECT * FROM stock_movements WHERE product_id = ?"
+        params = [product_id]
+        if start_date:
+            query += " AND moved_at >= ?"
+            params.append(start_date)
+        if end_date:
+            query += " AND moved_at < ?"
+            params.append(self._next_day(end_date[:10]))
+        query += " ORDER BY moved_at, id"
+        return self.execute_query(query, tuple(params), fetch="all")
+
     # --- Sales & Transactions ---
     def create_sale(self, sale_data):
         try:
@@ -351,31 +1317,78 @@ class Database:
                     ),
                 )
                 sale_id = cursor.lastrowid
+                sale_day = sale_data["sale_date"][:10]
+                stock_changes = []
+                revenue = cost = 0.0
                 for item in sale_data["items"]:
+                    product = cursor.execute(
+                        "SELECT name, category, stock_quantity, min_stock_level, purchase_price FROM products WHERE id = ?",
+                        (item["product_id"],),
+                    ).fetchone()
+                    # Cost of goods is fixed at the purchase price when sold
+                    unit_cost = (product["purchase_price"] or 0.0) if product is not None else 0.0
+                    line_cost = unit_cost * item["quantity"]
+                    revenue += item["total"]
+                    cost += line_cost
                     cursor.execute(
-                        "INSERT INTO sale_items (sale_id, product_id, quantity, unit_price, total_price) VALUES (?, ?, ?, ?, ?)",
+                        "INSERT INTO sale_items (sale_id, product_id, quantity, unit_price, total_price, unit_cost) VALUES (?, ?, ?, ?, ?, ?)",
                         (
                             sale_id,
                             item["product_id"],
                             item["quantity"],
                             item["price"],
                             item["total"],
+                            unit_cost,
                         ),
                     )
+                    for period, column, key in (("daily", "sale_day", sale_day), ("monthly", "sale_month", sale_day[:7])):
+                        cursor.execute(
+                            f"INSERT INTO {period}_product_sales ({column}, product_id, quantity, revenue, cost) VALUES (?, ?, ?, ?, ?) ON CONFLICT({column}, product_id) DO UPDATE SET quantity = quantity + excluded.quantity, revenue = revenue + excluded.revenue, cost = cost + excluded.cost",
+                            (key, item["product_id"], item["quantity"], item["total"], line_cost),
+                        )
                     cursor.execute(
                         "UPDATE products SET stock_quantity = stock_quantity - ? WHERE id = ?",
                         (item["quantity"], item["product_id"]),
                     )
+                    cursor.execute(
+                        STOCK_MOVEMENT_INSERT,
+                        (item["product_id"], sale_data["sale_date"], -item["quantity"], "sale", sale_id),
+                    )
+                    if product is not None:
+                        stock_changes.append(
+                            self._stock_change(
+                                item["product_id"], product,
+                                (product["stock_quantity"] or 0) - item["quantity"],
+                            )
+                        )
                 if sale_data.get("udhaar_amount", 0) > 0:
                     cursor.execute(
                         "UPDATE customers SET balance = balance + ? WHERE id = ?",
                         (sale_data["udhaar_amount"], sale_data["customer_id"]),
                     )
-                self.log_activity(
-                    sale_data["user_id"],
-                    "Create Sale",
-                    f"Sale ID {sale_id}, Total: {sale_data['total']:.2f}",
+                discount = sale_data.get("discount") or 0.0
+                cursor.execute(
+                    "INSERT INTO daily_sales (sale_day, sale_count, total, revenue, discount, cost) VALUES (?, 1, ?, ?, ?, ?) ON CONFLICT(sale_day) DO UPDATE SET sale_count = sale_count + 1, total = total + excluded.total, revenue = revenue + excluded.revenue, discount = discount + excluded.discount, cost = cost + excluded.cost",
+                    (sale_day, sale_data["total"], revenue, discount, cost),
                 )
+                for period, column, key in (("daily", "sale_day", sale_day), ("monthly", "sale_month", sale_day[:7])):
+                    cursor.execute(
+                        f"INSERT INTO {period}_customer_sales ({column}, customer_id, sale_count, revenue, discount, cost) VALUES (?, ?, 1, ?, ?, ?) ON CONFLICT({column}, customer_id) DO UPDATE SET sale_count = sale_count + 1, revenue = revenue + excluded.revenue, discount = discount + excluded.discount, cost = cost + excluded.cost",
+                        (key, sale_data["customer_id"], revenue, discount, cost),
+                    )
+            self.publish(
+                "sale",
+                sale_day=sale_day,
+                total=sale_data["total"],
+                udhaar_amount=sale_data.get("udhaar_amount", 0),
+            )
+            for change in stock_changes:
+                self.publish("stock", **change)
+            self.log_activity(
+                sale_data["user_id"],
+                "Create Sale",
+                f"Sale ID {sale_id}, Total: {sale_data['total']:.2f}",
+            )
             return sale_id
         except sqlite3.Error as e:
             logger.error(f"Failed to create sale: {e}")
@@ -394,6 +1407,19 @@ class Database:
         )
         return {"sale": sale, "items": items}
 
+    def get_sale(self, sale_id):
+        """A sale with its items, in the shape ReceiptGenerator expects."""
+        details = self.get_sale_details(sale_id)
+        sale = details["sale"]
+        if sale is None:
+            return None
+        sale["date"], _, sale["time"] = (sale.get("sale_date") or "").partition(" ")
+        sale["cash_amount"] = sale.get("amount_paid") or 0
+        if sale.get("payment_method") == "Cash":
+            sale["change"] = max(sale["cash_amount"] - (sale.get("total") or 0), 0)
+        sale["items"] = details["items"] or []
+        return sale
+
     # --- Udhaar Management ---
     def add_udhaar_payment(self, customer_id, amount, recorded_by, notes):
         try:
@@ -417,6 +1443,7 @@ class Database:
                 "Udhaar Payment",
                 f"Received {amount} from customer ID {customer_id}",
             )
+            self.publish("payment", customer_id=customer_id, amount=amount)
             return True
         except sqlite3.Error as e:
             logger.error(f"Failed to add udhaar payment: {e}")
@@ -610,6 +1637,125 @@ class Database:
             logger.error(f"Error getting top selling products: {e}")
             return []
 
+    @staticmethod
+    def _rollup_spans(start_date, end_date):
+        """
+        Split an inclusive day range into whole months, read from the monthly
+        rollups, and the days left over at either end, read from the daily
+        ones. Returns (first_month, last_month, [(first_day, last_day)] * 2);
+        the month range is empty when first_month > last_month.
+        """
+        start = datetime.datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.datetime.strptime(end_date, "%Y-%m-%d").date()
+        # First month that starts inside the range, and the month after the last one that ends inside it
+        first = start if start.day == 1 else (start.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+        after = (end + datetime.timedelta(days=1)).replace(day=1)
+        if first >= after:
+            return "9999-12", "0000-01", [(start_date, end_date), ("", "")]
+        day = datetime.timedelta(days=1)
+        head = (start_date, (first - day).strftime("%Y-%m-%d")) if start < first else ("", "")
+        tail = (after.strftime("%Y-%m-%d"), end_date) if after <= end else ("", "")
+        return first.strftime("%Y-%m"), (after - day).strftime("%Y-%m"), [head, tail]
+
+    def get_profit_report(self, start_date, end_date, group_by="day"):
+        """
+        Revenue, cost of goods, gross profit and margin (%) between two days
+        (YYYY-MM-DD, inclusive), grouped by "day", "product", "category" or
+        "customer". Read from the sales rollups only: whole months from the
+        monthly ones and the odd days at either end from the daily ones.
+        Revenue is the sum of line totals; day and customer profit also take
+        off sale discounts, which cannot be split across products. Rows are
+        largest profit first (by date for days), each with a label and
+        quantity (units or sales).
+        """
+        first_month, last_month, (head, tail) = self._rollup_spans(start_date, end_date)
+        span_params = (first_month, last_month) + head + tail
+        products = """
+            SELECT product_id, quantity, revenue, cost FROM monthly_product_sales WHERE sale_month BETWEEN ? AND ?
+            UNION ALL
+            SELECT product_id, quantity, revenue, cost FROM daily_product_sales
+            WHERE sale_day BETWEEN ? AND ? OR sale_day BETWEEN ? AND ?
+        """
+        queries = {
+            "day": ("""
+                SELECT sale_day AS label, sale_count AS quantity, revenue, discount, cost
+                FROM daily_sales
+                WHERE sale_day BETWEEN ? AND ?
+            """, (start_date, end_date)),
+            "product": (f"""
+                SELECT COALESCE(p.name, 'Product #' || r.product_id) AS label, SUM(r.quantity) AS quantity,
+                       SUM(r.revenue) AS revenue, 0.0 AS discount, SUM(r.cost) AS cost
+                FROM ({products}) r
+                LEFT JOIN products p ON p.id = r.product_id
+                GROUP BY r.product_id
+            """, span_params),
+            "category": (f"""
+                SELECT COALESCE(p.category, 'Uncategorized') AS label, SUM(r.quantity) AS quantity,
+                       SUM(r.revenue) AS revenue, 0.0 AS discount, SUM(r.cost) AS cost
+                FROM ({products}) r
+                LEFT JOIN products p ON p.id = r.product_id
+                GROUP BY COALESCE(p.category, 'Uncategorized')
+            """, span_params),
+            "customer": ("""
+                SELECT COALESCE(c.name, 'Customer #' || r.customer_id) AS label, SUM(r.sale_count) AS quantity,
+                       SUM(r.revenue) AS revenue, SUM(r.discount) AS discount, SUM(r.cost) AS cost
+                FROM (
+                    SELECT customer_id, sale_count, revenue, discount, cost FROM monthly_customer_sales WHERE sale_month BETWEEN ? AND ?
+                    UNION ALL
+                    SELECT customer_id, sale_count, revenue, discount, cost FROM daily_customer_sales
+                    WHERE sale_day BETWEEN ? AND ? OR sale_day BETWEEN ? AND ?
+                ) r
+                LEFT JOIN customers c ON c.id = r.customer_id
+                GROUP BY r.customer_id
+            """, span_params),
+        }
+        if group_by not in queries:
+            raise ValueError(f"Unknown profit grouping: {group_by}")
+
+        query, params = queries[group_by]
+        rows = self.execute_query(query, params, fetch="all")
+        for row in rows:
+            row["profit"] = round(row["revenue"] - row["discount"] - row["cost"], 2)
+            row["margin"] = row["profit"] / row["revenue"] * 100 if row["revenue"] else 0.0
+        if group_by == "day":
+            rows.sort(key=lambda r: r["label"])
+        else:
+            rows.sort(key=lambda r: r["profit"], reverse=True)
+        return rows
+
+    def get_reorder_data(self, window_days=30):
+        """
+        Inputs for reorder suggestions: every product with its supplier, and
+        units sold per product per day over the last window_days days as
+        (product_id, days_ago, quantity) tuples, days_ago 0 being today.
+        """
+        today = datetime.date.today()
+        start = today - datetime.timedelta(days=window_days - 1)
+        products = self.execute_query(
+            """
+            SELECT p.id, p.name, p.category, p.supplier_id, s.name AS supplier_name,
+                   p.stock_quantity, p.min_stock_level, p.purchase_price
+            FROM products p
+            LEFT JOIN suppliers s ON p.supplier_id = s.id
+            """,
+            fetch="all",
+        )
+        rows = self.execute_query(
+            """
+            SELECT si.product_id,
+                   CAST(julianday(?) - julianday(substr(s.sale_date, 1, 10)) AS INTEGER) AS days_ago,
+                   SUM(si.quantity) AS quantity
+            FROM sales s
+            JOIN sale_items si ON si.sale_id = s.id
+            WHERE s.sale_date >= ?
+            GROUP BY si.product_id, days_ago
+            """,
+            (today.strftime("%Y-%m-%d"), start.strftime("%Y-%m-%d")),
+            fetch="all",
+        )
+        sales = [(r["product_id"], r["days_ago"], r["quantity"] or 0) for r in rows]
+        return products, sales
+
     def get_monthly_sales_summary(self, year, month):
         """Get monthly sales summary."""
         try:
@@ -729,47 +1875,107 @@ class Database:
             return []
 
     def get_dashboard_stats(self):
+        """
+        Today's sales, customer count, low-stock count and total udhaar in one
+        query. Today's sales come from the daily_sales rollup and the
+        low-stock count from the stock-gap index, so neither scans a table.
+        """
         today = datetime.date.today().strftime("%Y-%m-%d")
-        stats = {}
-        stats["today_sales"] = (
-            self.execute_query(
-                f"SELECT SUM(total) as total FROM sales WHERE sale_date LIKE '{today}%'",
-                fetch="one",
-            )["total"]
-            or 0
-        )
-        stats["total_customers"] = (
-            self.execute_query(
-                "SELECT COUNT(id) as count FROM customers WHERE id != 1", fetch="one"
-            )["count"]
-            or 0
-        )
-        stats["low_stock_items"] = (
-            self.execute_query(
-                "SELECT COUNT(id) as count FROM products WHERE stock_quantity <= min_stock_level",
-                fetch="one",
-            )["count"]
-            or 0
-        )
-        stats["total_udhaar"] = (
-            self.execute_query(
-                "SELECT SUM(balance) as total FROM customers", fetch="one"
-            )["total"]
-            or 0
+        row = self.execute_query(
+            """
+            SELECT
+                COALESCE((SELECT total FROM daily_sales WHERE sale_day = ?), 0) AS today_sales,
+                (SELECT COUNT(*) FROM customers WHERE id != 1) AS total_customers,
+                (SELECT COUNT(*) FROM products WHERE stock_quantity - min_stock_level <= 0) AS low_stock_items,
+                (SELECT COALESCE(SUM(balance), 0) FROM customers) AS total_udhaar
+            """,
+            (today,),
+            fetch="one",
         )
-        return stats
+        if row is None:
+            return {"today_sales": 0, "total_customers": 0, "low_stock_items": 0, "total_udhaar": 0}
+        return row
 
     # --- Activity Log ---
     def log_activity(self, user_id, action, description=""):
-        return self.execute_query(
-            "INSERT INTO user_activity (user_id, action, description, timestamp) VALUES (?, ?, ?, ?)",
+        """
+        Queue an activity log entry; it is written in the background with the
+        next batch. A user_id of 0 (system) is stored as NULL.
+        """
+        if self.activity_writer is None:
+            self.activity_writer = ActivityLogWriter(self.db_path)
+        self.activity_writer.add(
             (
-                user_id,
+                user_id or None,
                 action,
                 description,
                 datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            ),
+            )
         )
+        return True
+
+    def archive_activity(self, retention_days, archive_dir=ACTIVITY_ARCHIVE_DIR):
+        """
+        Move activity log rows older than retention_days into gzip CSV files,
+        one per month (activity_YYYY-MM.csv.gz, appended to on later runs), and
+        delete them from the table. Uses its own connection, so it can run on a
+        worker thread. Returns the number of rows archived.
+        """
+        cutoff = (
+            datetime.datetime.now() - datetime.timedelta(days=retention_days)
+        ).strftime("%Y-%m-%d %H:%M:%S")
+        connection = sqlite3.connect(self.db_path, timeout=10)
+        files = {}
+        archived = 0
+        try:
+            last_id = connection.execute(
+                "SELECT MAX(id) FROM user_activity WHERE timestamp < ?", (cutoff,)
+            ).fetchone()[0]
+            if last_id is None:
+                return 0
+
+            os.makedirs(archive_dir, exist_ok=True)
+            cursor = connection.execute(
+                "SELECT id, user_id, action, description, timestamp FROM user_activity "
+                "WHERE timestamp < ? AND id <= ? ORDER BY id",
+                (cutoff, last_id),
+            )
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                for row in rows:
+                    month = (row[4] or "unknown")[:7]
+                    if month not in files:
+                        path = os.path.join(archive_dir, f"activity_{month}.csv.gz")
+                        is_new = not os.path.exists(path)
+                        handle = gzip.open(path, "at", newline="", encoding="utf-8")
+                        writer = csv.writer(handle)
+                        if is_new:
+                            writer.writerow(["id", "user_id", "action", "description", "timestamp"])
+                        files[month] = (handle, writer)
+                    files[month][1].writerow(row)
+                archived += len(rows)
+
+            for handle, _ in files.values():
+                handle.close()
+            files = {}
+
+            # Only delete once every archived row is safely on disk
+            with connection:
+                connection.execute(
+                    "DELETE FROM user_activity WHERE timestamp < ? AND id <= ?",
+                    (cutoff, last_id),
+                )
+            logger.info(f"Archived {archived} activity log rows older than {cutoff}")
+            return archived
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"Activity log archival failed: {e}")
+            return 0
+        finally:
+            for handle, _ in files.values():
+                handle.close()
+            connection.close()
 
     # --- Settings ---
     def get_setting(self, key, default=None):
@@ -778,6 +1984,24 @@ class Database:
         )
         return result["value"] if result else default
 
+    def get_all_settings(self):
+        """Return the whole settings table as a dict."""
+        rows = self.execute_query("SELECT key, value FROM settings", fetch="all")
+        return {row["key"]: row["value"] for row in rows}
+
+    def update_settings(self, values):
+        """Write several settings in a single transaction."""
+        try:
+            with self as cursor:
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                    list(values.items()),
+                )
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Failed to update settings: {e}")
+            return False
+
     def update_setting(self, key, value):
         self.log_activity(
             0, "Setting Change", f"Setting '{key}' changed."
@@ -787,26 +2011,389 @@ class Database:
         )
 
     # --- Backup & Restore ---
-    def create_backup(self, backup_dir="data/backups"):
+    def create_backup(self, backup_dir="data/backups", progress=None):
         os.makedirs(backup_dir, exist_ok=True)
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_path = os.path.join(backup_dir, f"backup_{timestamp}.db")
+        return self.backup_database(backup_path, progress)
+
+    def backup_database(self, backup_path, progress=None,
+                        pages=BACKUP_PAGES_PER_STEP, pause=BACKUP_STEP_PAUSE):
+        """
+        Copy the live database to backup_path with the SQLite online backup API.
+        Pages are copied in small steps with a short pause between them, so other
+        connections can keep writing while the backup runs. progress, if given,
+        is called as progress(pages_copied, total_pages). Uses its own
+        connections, so it is safe to call from a worker thread.
+        Returns backup_path, or None on failure.
+        """
+        backup_dir = os.path.dirname(backup_path)
+        if backup_dir:
+            os.makedirs(backup_dir, exist_ok=True)
+        temp_path = backup_path + ".part"
+
+        def on_step(status, remaining, total):
+            if progress:
+                progress(total - remaining, total)
+            if remaining and pause:
+                time.sleep(pause)
+
+        source = None
+        target = None
         try:
-            shutil.copy2(self.db_path, backup_path)
+            source = sqlite3.connect(self.db_path, timeout=10)
+            target = sqlite3.connect(temp_path)
+            source.backup(target, pages=pages, progress=on_step)
+            target.close()
+            target = None
+            os.replace(temp_path, backup_path)
             logger.info(f"Database backup created: {backup_path}")
             return backup_path
-        except Exception as e:
+        except (sqlite3.Error, OSError) as e:
             logger.error(f"Failed to create backup: {e}")
+            if target is not None:
+                target.close()
+                target = None
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
             return None
+        finally:
+            if target is not None:
+                target.close()
+            if source is not None:
+                source.close()
+
+    @staticmethod
+    def verify_backup(backup_path):
+        """
+        Check that a backup is a healthy copy of this application's database.
+        Runs PRAGMA quick_check on a read-only connection and makes sure the
+        core tables exist. Returns (ok, message).
+        """
+        if not os.path.exists(backup_path):
+            return False, f"Backup file not found: {backup_path}"
+        connection = None
+        try:
+            uri = f"file:{pathname2url(os.path.abspath(backup_path))}?mode=ro"
+            connection = sqlite3.connect(uri, uri=True)
+            results = [row[0] for row in connection.execute("PRAGMA quick_check")]
+            if results != ["ok"]:
+                return False, f"Backup failed the integrity check: {'; '.join(results[:5])}"
+            tables = {
+                row[0]
+                for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            }
+            missing = RESTORE_REQUIRED_TABLES - tables
+            if missing:
+                return False, f"Backup is missing tables: {', '.join(sorted(missing))}"
+            return True, "ok"
+        except sqlite3.Error as e:
+            return False, f"Backup could not be read: {e}"
+        finally:
+            if connection is not None:
+                connection.close()
 
     def restore_from_backup(self, backup_path):
-        if not os.path.exists(backup_path):
-            logger.error(f"Backup file not found: {backup_path}")
+        """
+        Replace the live database with a verified backup, without restarting.
+        The backup is checked, copied with the backup API into a temp file next
+        to the database, and renamed into place. Every open Database on the
+        same file is closed for the rename and reconnected afterwards.
+        Returns True on success; on failure the live database is untouched.
+        """
+        ok, message = self.verify_backup(backup_path)
+        if not ok:
+            logger.error(message)
+            return False
+
+        temp_path = self.db_path + ".restore"
+        source = None
+        target = None
+        try:
+            source = sqlite3.connect(backup_path, timeout=10)
+            target = sqlite3.connect(temp_path)
+            source.backup(target)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to restore backup: {e}")
+            if target is not None:
+                target.close()
+                target = None
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
             return False
+        finally:
+            if target is not None:
+                target.close()
+            if source is not None:
+                source.close()
+
+        same_file = [
+            db for db in list(Database._instances)
+            if os.path.abspath(db.db_path) == os.path.abspath(self.db_path)
+        ]
+        same_file.append(self)
+        for db in same_file:
+            db.close()
+
         try:
-            shutil.copy2(backup_path, self.db_path)
+            for suffix in ("-journal", "-wal", "-shm"):
+                if os.path.exists(self.db_path + suffix):
+                    os.remove(self.db_path + suffix)
+            os.replace(temp_path, self.db_path)
             logger.info(f"Database restored from: {backup_path}")
             return True
-        except Exception as e:
+        except OSError as e:
             logger.error(f"Failed to restore backup: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
             return False
+        finally:
+            # Reopen every connection; older backups get any newer tables
+            for db in same_file:
+                db._user_cache.clear()
+                db._connect()
+            self.initialize_db()
+            for db in same_file:
+                db.publish("reset")
+
+    # --- Analytics Snapshot ---
+    @staticmethod
+    def _analytics_schemas():
+        """Arrow schemas for the analytics snapshot tables."""
+        import pyarrow as pa
+
+        return {
+            "sales": pa.schema(
+                [
+                    ("id", pa.int64()),
+                    ("customer_id", pa.int64()),
+                    ("user_id", pa.int64()),
+                    ("sale_date", pa.string()),
+                    ("subtotal", pa.float64()),
+                    ("discount", pa.float64()),
+                    ("tax", pa.float64()),
+                    ("total", pa.float64()),
+                    ("payment_method", pa.string()),
+                    ("amount_paid", pa.float64()),
+                    ("udhaar_amount", pa.float64()),
+                    ("status", pa.string()),
+                    ("sale_month", pa.string()),
+                ]
+            ),
+            "sale_items": pa.schema(
+                [
+                    ("id", pa.int64()),
+                    ("sale_id", pa.int64()),
+                    ("product_id", pa.int64()),
+                    ("quantity", pa.int64()),
+                    ("unit_price", pa.float64()),
+                    ("total_price", pa.float64()),
+                    ("unit_cost", pa.float64()),
+                    ("sale_month", pa.string()),
+                ]
+            ),
+            "products": pa.schema(
+                [
+                    ("id", pa.int64()),
+                    ("name", pa.string()),
+                    ("category", pa.string()),
+                    ("description", pa.string()),
+                    ("purchase_price", pa.float64()),
+                    ("selling_price", pa.float64()),
+                    ("stock_quantity", pa.int64()),
+                    ("min_stock_level", pa.int64()),
+                    ("supplier_id", pa.int64()),
+                    ("date_added", pa.string()),
+                ]
+            ),
+            "customers": pa.schema(
+                [
+                    ("id", pa.int64()),
+                    ("name", pa.string()),
+                    ("phone", pa.string()),
+                    ("address", pa.string()),
+                    ("balance", pa.float64()),
+                    ("created_at", pa.string()),
+                ]
+            ),
+        }
+
+    @staticmethod
+    def _keyset_batches(connection, query, bounds, start_key, batch_size):
+        """
+        Yield (columns, rows) pages of a query keyed on its first column.
+        Every page is a separate short statement, so no read lock is held
+        between pages and checkout writes can commit in the gaps.
+        """
+        last_key = start_key
+        while True:
+            cursor = connection.execute(query, (*bounds, last_key, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            yield [column[0] for column in cursor.description], rows
+            last_key = rows[-1][0]
+            if len(rows) < batch_size:
+                break
+
+    def _write_fact_block(self, connection, root, query, bounds, start_key, name, schema):
+        """
+        Write one block of a fact table as a part file called `name` in each of
+        its sale_month partitions under `root`, replacing the block's files from
+        an earlier export. start_key of None means the block has no rows.
+        Returns the number of rows written.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # The month is in the partition folder name, not in the files
+        file_schema = schema.remove(schema.get_field_index("sale_month"))
+        temp_name = f".{name}.tmp"  # hidden from dataset readers
+        writers = {}
+        count = 0
+        try:
+            batches = () if start_key is None else self._keyset_batches(
+                connection, query, bounds, start_key, ANALYTICS_BATCH_SIZE
+            )
+            for columns, rows in batches:
+                months = {}
+                for row in rows:
+                    record = dict(zip(columns, row))
+                    months.setdefault(record.pop("sale_month"), []).append(record)
+                for month, records in months.items():
+                    if month not in writers:
+                        folder = os.path.join(root, f"sale_month={month}")
+                        os.makedirs(folder, exist_ok=True)
+                        writers[month] = pq.ParquetWriter(
+                            os.path.join(folder, temp_name), file_schema
+                        )
+                    writers[month].write_table(
+                        pa.Table.from_pylist(records, schema=file_schema)
+                    )
+                count += len(rows)
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        # Swap the new files in, and drop the block's files from months it no longer has
+        folders = os.listdir(root) if os.path.isdir(root) else []
+        for folder in folders:
+            if not folder.startswith("sale_month="):
+                continue
+            target = os.path.join(root, folder, name)
+            if folder[len("sale_month="):] in writers:
+                os.replace(os.path.join(root, folder, temp_name), target)
+            elif os.path.exists(target):
+                os.remove(target)
+        return count
+
+    def export_analytics_snapshot(self, path, since=None):
+        """
+        Export sales history into a Parquet dataset under `path` for offline analysis.
+
+        sales and sale_items are exported incrementally, partitioned by sale_month,
+        for sales above the high-water mark kept in the snapshot state file (or
+        above the sale id `since`, when given). Part files cover fixed blocks of
+        ANALYTICS_BATCH_SIZE sale ids and are replaced whenever their block is
+        exported again, so re-exporting sales never duplicates rows. products and
+        customers are rewritten in full. Returns a dict of exported row counts,
+        or None on failure.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            logger.error(f"Analytics snapshot requires pyarrow: {e}")
+            return None
+
+        os.makedirs(path, exist_ok=True)
+        state_path = os.path.join(path, ANALYTICS_STATE_FILE)
+        state = {}
+        if os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+
+        if state.get("version") != ANALYTICS_SNAPSHOT_VERSION:
+            # Files from an older layout or schema (or from a first export that
+            # never finished) can't be read alongside new ones: start over
+            for table in ANALYTICS_FACT_QUERIES:
+                shutil.rmtree(os.path.join(path, table), ignore_errors=True)
+            state = {}
+
+        last_sale_id = int(since) if since is not None else state.get("last_sale_id", 0)
+        schemas = self._analytics_schemas()
+        counts = {}
+        connection = self._open_reader()
+        try:
+            # Fix the upper bound first so sales and their items stay consistent
+            # even if checkout adds sales while the export runs.
+            max_sale_id = connection.execute(
+                "SELECT COALESCE(MAX(id), 0) FROM sales"
+            ).fetchone()[0]
+
+            # Block b holds sales b * ANALYTICS_BATCH_SIZE < id <= (b + 1) * ANALYTICS_BATCH_SIZE;
+            # the block holding the first new sale is rewritten in full
+            blocks = range(
+                last_sale_id // ANALYTICS_BATCH_SIZE,
+                (max_sale_id - 1) // ANALYTICS_BATCH_SIZE + 1,
+            ) if max_sale_id > last_sale_id else ()
+            for table, query in ANALYTICS_FACT_QUERIES.items():
+                counts[table] = 0
+                for block in blocks:
+                    low = block * ANALYTICS_BATCH_SIZE
+                    bounds = (low, min(low + ANALYTICS_BATCH_SIZE, max_sale_id))
+                    start_key = low
+                    if table == "sale_items":
+                        # Items are keyed on their own id; start just before the
+                        # first item of the block's first sale (uses the sale_id index)
+                        first_item_id = connection.execute(
+                            "SELECT MIN(id) FROM sale_items WHERE sale_id > ? AND sale_id <= ?",
+                            bounds,
+                        ).fetchone()[0]
+                        start_key = None if first_item_id is None else first_item_id - 1
+                    counts[table] += self._write_fact_block(
+                        connection,
+                        os.path.join(path, table),
+                        query,
+                        bounds,
+                        start_key,
+                        f"part-{block}.parquet",
+                        schemas[table],
+                    )
+
+            for table, query in ANALYTICS_DIMENSION_QUERIES.items():
+                target = os.path.join(path, f"{table}.parquet")
+                temp_target = f"{target}.tmp"
+                counts[table] = 0
+                with pq.ParquetWriter(temp_target, schemas[table]) as writer:
+                    for columns, rows in self._keyset_batches(
+                        connection, query, (), 0, ANALYTICS_BATCH_SIZE
+                    ):
+                        writer.write_table(
+                            pa.Table.from_pylist(
+                                [dict(zip(columns, row)) for row in rows],
+                                schema=schemas[table],
+                            )
+                        )
+                        counts[table] += len(rows)
+                os.replace(temp_target, target)
+        except Exception as e:
+            logger.error(f"Analytics snapshot export failed: {e}")
+            return None
+        finally:
+            connection.close()
+
+        # Only move the high-water mark once everything has been written
+        state = {
+            "version": ANALYTICS_SNAPSHOT_VERSION,
+            "last_sale_id": max(max_sale_id, last_sale_id),
+            "exported_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "row_counts": counts,
+        }
+        temp_state_path = f"{state_path}.tmp"
+        with open(temp_state_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(temp_state_path, state_path)
+
+        logger.info(f"Analytics snapshot exported to {path}: {counts}")
+        return counts
@@ -3,6 +3,8 @@
 import pandas as pd
 import os
 import sys
+import time
+import tempfile
 from datetime import datetime
 import logging
 
@@ -10,22 +12,315 @@ import logging
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.database import Database
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
 logger = logging.getLogger(__name__)
 
+# Mapping from spreadsheet column names to database field names
+COLUMN_MAPPING = {
+    "Product_ID": "id",
+    "Product_Name": "name",
+    "Category": "category",
+    "Description": "description",
+    "Purchase_Price": "purchase_price",
+    "Selling_Price": "selling_price",
+    "Stock_Quantity": "stock_quantity",
+    "Min_Stock_Level": "min_stock_level",
+    "Supplier_ID": "supplier_id",
+    "Date_Added": "date_added",
+}
 
-def import_products_from_excel(excel_file_path):
+# Product fields in the order expected by Database.bulk_import_products
+PRODUCT_FIELDS = [
+    "id",
+    "name",
+    "category",
+    "description",
+    "purchase_price",
+    "selling_price",
+    "stock_quantity",
+    "min_stock_level",
+    "supplier_id",
+    "date_added",
+]
+REQUIRED_FIELDS = ["name", "selling_price"]
+# Fields compared against the database to decide whether a row changed
+UPDATE_FIELDS = PRODUCT_FIELDS[1:-1]
+# Fields a supplier price list may change during a sync
+SYNC_FIELDS = ["purchase_price", "selling_price", "stock_quantity"]
+# Products looked up per query when reading current values
+SYNC_LOOKUP_BATCH = 500
+
+
+def _to_sql_rows(df, columns):
+    """Convert DataFrame columns into plain Python tuples (NA becomes None)."""
+    subset = df[columns].astype(object)
+    return list(subset.where(subset.notna(), None).itertuples(index=False, name=None))
+
+
+def prepare_product_frame(df, known_supplier_ids=None, required=REQUIRED_FIELDS,
+                          fill_defaults=True):
+    """
+    Validate and coerce a raw product DataFrame in one vectorized pass.
+    Rows missing any required field are invalid. With fill_defaults, blank
+    prices and stock levels become 0.
+    Returns (valid_df, invalid_count). valid_df has exactly PRODUCT_FIELDS.
+    """
+    df = df.rename(columns=COLUMN_MAPPING)
+
+    missing = [field for field in required if field not in df.columns]
+    if missing:
+        raise KeyError(", ".join(missing))
+
+    for field in PRODUCT_FIELDS:
+        if field not in df.columns:
+            df[field] = pd.NA
+    df = df[PRODUCT_FIELDS].copy()
+
+    # Text fields
+    for field in ["name", "category", "description"]:
+        df[field] = df[field].astype("string").str.strip()
+    df.loc[df["name"] == "", "name"] = pd.NA
+
+    # Numeric fields (unparseable values become NA)
+    for field in ["id", "purchase_price", "selling_price", "stock_quantity",
+                  "min_stock_level", "supplier_id"]:
+        df[field] = pd.to_numeric(df[field], errors="coerce")
+
+    invalid = (
+        df[list(required)].isna().any(axis=1)
+        | (df["selling_price"] < 0)
+        | (df["purchase_price"] < 0)
+        | (df["stock_quantity"] < 0)
+        | (df["id"].notna() & ((df["id"] % 1 != 0) | (df["id"] <= 0)))
+    )
+    invalid_count = int(invalid.sum())
+    df = df[~invalid].copy()
+
+    df["purchase_price"] = df["purchase_price"].astype(float)
+    df["selling_price"] = df["selling_price"].astype(float)
+    for field in ["id", "stock_quantity", "min_stock_level", "supplier_id"]:
+        df[field] = df[field].round().astype("Int64")
+    if fill_defaults:
+        df["purchase_price"] = df["purchase_price"].fillna(0.0)
+        df["stock_quantity"] = df["stock_quantity"].fillna(0)
+        df["min_stock_level"] = df["min_stock_level"].fillna(0)
+
+    # Unknown suppliers would violate the foreign key, so drop the link
+    if known_supplier_ids is not None:
+        unknown = df["supplier_id"].notna() & ~df["supplier_id"].isin(known_supplier_ids)
+        if unknown.any():
+            logger.warning(f"{int(unknown.sum())} rows reference unknown suppliers; supplier cleared.")
+            df.loc[unknown, "supplier_id"] = pd.NA
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    df["date_added"] = (
+        pd.to_datetime(df["date_added"], errors="coerce").dt.strftime("%Y-%m-%d").fillna(today)
+    )
+
+    return df, invalid_count
+
+
+def import_products_dataframe(df, db, mode="upsert"):
+    """
+    Import a product DataFrame in one transaction.
+
+    Rows with an id that already exists are updated (mode="upsert") or left
+    alone (mode="skip"); rows identical to the stored product are skipped.
+    Returns a dict with inserted, updated, skipped and invalid counts.
+    """
+    suppliers = db.execute_query("SELECT id FROM suppliers", fetch="all")
+    prepared, invalid_count = prepare_product_frame(df, [s["id"] for s in suppliers])
+
+    # Later rows win when the same id appears more than once in the file
+    with_id = prepared["id"].notna()
+    duplicates = with_id & prepared.duplicated(subset="id", keep="last")
+    skipped_count = int(duplicates.sum())
+    prepared = prepared[~duplicates]
+    with_id = prepared["id"].notna()
+
+    # Only the id range present in this frame is read back, so chunked
+    # imports compare against a slice of the table rather than all of it
+    existing_query = f"SELECT {', '.join(PRODUCT_FIELDS[:-1])} FROM products"
+    if with_id.any():
+        existing = pd.read_sql_query(
+            existing_query + " WHERE id BETWEEN ? AND ?",
+            db.connection,
+            params=(int(prepared["id"].min()), int(prepared["id"].max())),
+        )
+    else:
+        existing = pd.read_sql_query(existing_query + " WHERE 0", db.connection)
+    existing["id"] = existing["id"].astype("Int64")
+    exists = with_id & prepared["id"].isin(existing["id"])
+
+    new_rows = prepared[~exists]
+    matched = prepared[exists]
+
+    if mode == "skip":
+        changed = matched.iloc[0:0]
+        skipped_count += len(matched)
+    else:
+        current = (
+            matched[["id"]]
+            .merge(existing, on="id", how="left")
+            .set_index(matched.index)
+        )
+        same = pd.Series(True, index=matched.index)
+        for field in UPDATE_FIELDS:
+            incoming = matched[field].astype(object)
+            stored = current[field].astype(object)
+            same &= (incoming == stored).fillna(False).astype(bool) | (
+                incoming.isna() & stored.isna()
+            )
+        changed = matched[~same]
+        skipped_count += int(same.sum())
+
+    insert_rows = _to_sql_rows(new_rows, PRODUCT_FIELDS)
+    update_rows = _to_sql_rows(changed, UPDATE_FIELDS + ["id"])
+
+    if not db.bulk_import_products(insert_rows, update_rows):
+        raise RuntimeError("Bulk product import failed; no changes were saved.")
+
+    return {
+        "inserted": len(insert_rows),
+        "updated": len(update_rows),
+        "skipped": skipped_count,
+        "invalid": invalid_count,
+    }
+
+
+def _row_hashes(df, fields):
+    """Hash the given fields of every row into a stable hex fingerprint."""
+    hashes = pd.util.hash_pandas_object(df[fields], index=False)
+    return hashes.map("{:016x}".format)
+
+
+def _current_product_values(db, product_ids):
+    """Read id, name and SYNC_FIELDS for the given products only."""
+    frames = []
+    for i in range(0, len(product_ids), SYNC_LOOKUP_BATCH):
+        batch = product_ids[i:i + SYNC_LOOKUP_BATCH]
+        placeholders = ", ".join("?" * len(batch))
+        frames.append(
+            pd.read_sql_query(
+                f"SELECT id, name, {', '.join(SYNC_FIELDS)} FROM products WHERE id IN ({placeholders})",
+                db.connection,
+                params=batch,
+            )
+        )
+    if not frames:
+        return pd.DataFrame(columns=["id", "name"] + SYNC_FIELDS)
+    current = pd.concat(frames, ignore_index=True)
+    current["id"] = current["id"].astype("Int64")
+    return current
+
+
+def sync_price_list(df, db, report_path=None):
+    """
+    Apply a supplier price list, touching only products whose prices or stock
+    changed. Each row is hashed and compared with the fingerprint stored at the
+    last sync; only rows with a new hash are checked against the database, and
+    only fields that actually differ are written. Columns missing from the file
+    are left untouched. Rows must carry a product id.
+
+    Returns (counts, changes) where changes is a DataFrame with one row per
+    changed field (product_id, name, field, old_value, new_value). When
+    report_path is given the changes are also written there as CSV.
+    """
+    source_fields = set(df.rename(columns=COLUMN_MAPPING).columns)
+    fields = [field for field in SYNC_FIELDS if field in source_fields]
+    if not fields:
+        raise KeyError(", ".join(SYNC_FIELDS))
+
+    prepared, invalid_count = prepare_product_frame(
+        df, required=["id"], fill_defaults=False
+    )
+    prepared = prepared.drop_duplicates(subset="id", keep="last")
+    counts = {
+        "checked": len(prepared),
+        "changed": 0,
+        "unchanged": 0,
+        "unknown": 0,
+        "invalid": invalid_count,
+    }
+    changes = pd.DataFrame(columns=["product_id", "name", "field", "old_value", "new_value"])
+    if prepared.empty:
+        return counts, changes
+
+    prepared = prepared[["id"] + fields].copy()
+    prepared["row_hash"] = _row_hashes(prepared, fields)
+
+    stored = pd.Series(
+        db.get_product_fingerprints(int(prepared["id"].min()), int(prepared["id"].max())),
+        dtype=object,
+    )
+    stale = prepared["row_hash"] != prepared["id"].astype(object).map(stored)
+    candidates = prepared[stale]
+    counts["unchanged"] = int((~stale).sum())
+
+    current = _current_product_values(db, [int(i) for i in candidates["id"]])
+    merged = candidates.merge(current, on="id", how="left", suffixes=("", "_old"),
+                              indicator=True)
+    known = merged["_merge"] == "both"
+    counts["unknown"] = int((~known).sum())
+    merged = merged[known]
+
+    differs = {}
+    for field in fields:
+        new, old = merged[field], merged[f"{field}_old"]
+        differs[field] = (new.notna() & (old.isna() | (new != old))).fillna(False).astype(bool)
+    changed = pd.DataFrame(differs).any(axis=1)
+    counts["changed"] = int(changed.sum())
+    counts["unchanged"] += int((~changed).sum())
+
+    changed_rows = merged[changed]
+    update_frame = pd.DataFrame({"id": changed_rows["id"]})
+    for field in SYNC_FIELDS:
+        if field in fields:
+            update_frame[field] = changed_rows[field].where(differs[field][changed])
+        else:
+            update_frame[field] = pd.NA
+    update_rows = _to_sql_rows(update_frame, SYNC_FIELDS + ["id"])
+
+    merged["synced_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    fingerprint_rows = _to_sql_rows(merged, ["id", "row_hash", "synced_at"])
+
+    if not db.apply_price_sync(update_rows, fingerprint_rows):
+        raise RuntimeError("Price list sync failed; no changes were saved.")
+
+    report = []
+    for field in fields:
+        rows = merged[differs[field]]
+        report.append(
+            pd.DataFrame(
+                {
+                    "product_id": rows["id"],
+                    "name": rows["name"],
+                    "field": field,
+                    "old_value": rows[f"{field}_old"],
+                    "new_value": rows[field],
+                }
+            )
+        )
+    changes = pd.concat(report, ignore_index=True).sort_values(["product_id", "field"])
+    if report_path:
+        changes.to_csv(report_path, index=False)
+        logger.info(f"Price change report written to {report_path}")
+
+    return counts, changes
+
+
+def import_products_from_excel(excel_file_path, db=None, mode="upsert", report_path=None):
     """
     Reads products from the specified Excel file and imports them into the database.
-    This function is safe to run multiple times; it will skip existing products.
+    This function is safe to run multiple times; products that already exist
+    (matched on id) are updated, or skipped when unchanged or when mode="skip".
+    mode="sync" applies the file as a supplier price list (see sync_price_list)
+    and writes the change report to report_path if given.
+    Returns the import counts, or None if the import failed.
     """
     # Verify the Excel file exists
     if not os.path.exists(excel_file_path):
         logger.error(f"FATAL: Product list file not found at '{excel_file_path}'")
-        return
+        return None
 
     logger.info(f"Starting product import from {excel_file_path}...")
 
@@ -34,44 +329,31 @@ def import_products_from_excel(excel_file_path):
         df = pd.read_excel(excel_file_path)
         logger.info(f"Found {len(df)} rows in the Excel file.")
 
-        # Define the mapping from CSV column names to database field names
-        column_mapping = {
-            "Product_ID": "id",
-            "Product_Name": "name",
-            "Category": "category",
-            "Purchase_Price": "purchase_price",
-            "Selling_Price": "selling_price",
-            "Stock_Quantity": "stock_quantity",
-            "Min_Stock_Level": "min_stock_level",
-            "Supplier_ID": "supplier_id",
-            "Date_Added": "date_added",
-        }
-
-        # Rename the DataFrame columns to match the database keys
-        df.rename(columns=column_mapping, inplace=True)
-
         # Instantiate the database
-        db = Database()
-        imported_count = 0
-        skipped_count = 0
-
-        # Process each product in the DataFrame
-        for index, row in df.iterrows():
-            product_data = row.to_dict()
+        if db is None:
+            db = Database()
 
-            # The add_product method handles checking for existence and inserting
-            product_id = db.add_product(product_data)
+        if mode == "sync":
+            counts, _ = sync_price_list(df, db, report_path)
+            logger.info("-" * 50)
+            logger.info("Price list sync finished.")
+            logger.info(f"Changed: {counts['changed']} products.")
+            logger.info(f"Unchanged: {counts['unchanged']} products.")
+            logger.info(f"Unknown product ids: {counts['unknown']} rows.")
+            logger.info(f"Invalid: {counts['invalid']} rows.")
+            logger.info("-" * 50)
+            return counts
 
-            if product_id:
-                imported_count += 1
-            else:
-                skipped_count += 1
+        counts = import_products_dataframe(df, db, mode=mode)
 
         logger.info("-" * 50)
         logger.info("Product import process finished.")
-        logger.info(f"Successfully Imported: {imported_count} new products.")
-        logger.info(f"Skipped (Already Exist): {skipped_count} products.")
+        logger.info(f"Inserted: {counts['inserted']} new products.")
+        logger.info(f"Updated: {counts['updated']} existing products.")
+        logger.info(f"Skipped (Unchanged or Duplicate): {counts['skipped']} products.")
+        logger.info(f"Invalid: {counts['invalid']} rows.")
         logger.info("-" * 50)
+        return counts
 
     except FileNotFoundError:
         logger.error(
@@ -83,12 +365,85 @@ def import_products_from_excel(excel_file_path):
         )
     except Exception as e:
         logger.error(f"An unexpected error occurred during import: {e}")
+    return None
+
+
+def make_benchmark_products(row_count):
+    """Build a DataFrame shaped like data/Product_List.xlsx with row_count rows."""
+    ids = pd.RangeIndex(1, row_count + 1)
+    return pd.DataFrame(
+        {
+            "Product_ID": ids,
+            "name": [f"Product {i}" for i in ids],
+            "category": [f"Category {'ABCDE'[i % 5]}" for i in ids],
+            "description": "Benchmark product",
+            "purchase_price": (ids % 900) + 100,
+            "selling_price": (ids % 900) + 150,
+            "stock_quantity": ids % 200,
+            "min_stock_level": 10,
+            "supplier_id": 1,
+        }
+    )
+
+
+def benchmark_bulk_import(row_count=100_000):
+    """
+    Time a fresh import, a re-import and a price-list sync (5% changed each)
+    into a throwaway database.
+    """
+    df = make_benchmark_products(row_count)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db = Database(os.path.join(temp_dir, "benchmark.db"))
+        db.add_supplier("Benchmark Supplier", "", "", "", "")
+
+        start = time.perf_counter()
+        first = import_products_dataframe(df, db)
+        first_time = time.perf_counter() - start
+
+        changed = df.sample(frac=0.05, random_state=1).index
+        df.loc[changed, "selling_price"] += 10
+
+        start = time.perf_counter()
+        second = import_products_dataframe(df, db)
+        second_time = time.perf_counter() - start
+
+        # The first sync records fingerprints; the second only sees the changes
+        sync_price_list(df, db)
+        changed = df.sample(frac=0.05, random_state=2).index
+        df.loc[changed, "purchase_price"] += 5
+
+        start = time.perf_counter()
+        third, _ = sync_price_list(df, db)
+        third_time = time.perf_counter() - start
+
+        db.connection.close()
+
+    print(f"Fresh import of {row_count} rows: {first_time:.2f}s {first}")
+    print(f"Re-import with 5% changed: {second_time:.2f}s {second}")
+    print(f"Price list sync with 5% changed: {third_time:.2f}s {third}")
 
 
 if __name__ == "__main__":
     """
     This allows the script to be run directly to perform the import.
+    Pass --benchmark [rows] to time the bulk import on generated data instead,
+    or --sync <price_list.xlsx> [report.csv] to apply a supplier price list.
     """
+    # Configure logging
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        benchmark_bulk_import(int(sys.argv[2]) if len(sys.argv) > 2 else 100_000)
+        sys.exit(0)
+
+    if len(sys.argv) > 2 and sys.argv[1] == "--sync":
+        report = sys.argv[3] if len(sys.argv) > 3 else None
+        result = import_products_from_excel(sys.argv[2], mode="sync", report_path=report)
+        sys.exit(0 if result is not None else 1)
+
     try:
         # Construct the path to the Excel file in the data directory
         project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -101,7 +456,7 @@ if __name__ == "__main__":
 
         # Now, run the import
         print("Starting product import...")
-        import_products_from_excel(excel_path)
+        import_products_from_excel(excel_path, db_setup)
         print("Import completed successfully!")
     except Exception as e:
         logger.critical(f"A critical error occurred in the main execution block: {e}")
@@ -53,10 +53,10 @@ def install_dependencies():
         ("reportlab", "3.6.12"),
         ("pyttsx3", "2.90"),
         ("Pillow", "9.5.0"),
-        ("qrcode", "7.4.2"),
         ("bcrypt", "4.0.1"),
         ("pandas", "2.0.3"),
         ("openpyxl", "3.1.2"),
+        ("pyarrow", "12.0.1"),
         
         # Voice recognition dependencies
         ("vosk", "0.3.45"),
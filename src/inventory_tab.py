@@ -26,10 +26,13 @@ from PyQt5.QtWidgets import (
     QTextEdit,
     QCheckBox,
     QTabWidget,
+    QFileDialog,
+    QProgressDialog,
 )
-from PyQt5.QtCore import Qt, QDate
+from PyQt5.QtCore import Qt, QDate, QThread
 from PyQt5.QtGui import QColor
-from src.style import MAIN_STYLESHEET
+from src.page_loader import PageLoader
+from src.low_stock import LowStockTracker
 
 logger = logging.getLogger(__name__)
 
@@ -39,32 +42,45 @@ class InventoryTab(QWidget):
     Inventory tab for managing products, low stock, and expiry tracking.
     """
 
-    def __init__(self, db, user_data):
+    def __init__(self, db, user_data, defer_load=False, low_stock=None):
         super().__init__()
         self.db = db
         self.user_data = user_data
         self.is_admin = self.user_data.get("role") == "Admin"
 
+        # The low stock list follows stock changes as they happen
+        self.low_stock = low_stock or LowStockTracker(db, self)
+        self.low_stock.changed.connect(self.load_low_stock)
+
+        # Last loaded products; search and filtering work on this list
+        self.products = []
+        self.loader = PageLoader(db, self)
+        self.loader.loaded.connect(self.on_data_loaded)
+
         self.product_search = None
         self.category_filter = None
         self.products_table = None
         self.low_stock_table = None
 
+        # Background import state
+        self.import_thread = None
+        self.import_worker = None
+        self.import_progress = None
+
         # Initialize database tables first
         self.initialize_tables()
 
         # Set up UI components
-        self.setStyleSheet(MAIN_STYLESHEET)
         self.setup_ui()
 
-        # Load initial data
-        self.refresh_all_data()
+        # Load initial data (the main window starts this itself)
+        if not defer_load:
+            self.refresh_all_data()
 
     def setup_ui(self):
         """Sets up the main tab widget for the inventory section."""
         main_layout = QVBoxLayout(self)
         self.tab_widget = QTabWidget()
-        self.tab_widget.currentChanged.connect(self.refresh_all_data)
         main_layout.addWidget(self.tab_widget)
 
         products_tab = QWidget()
@@ -74,6 +90,7 @@ class InventoryTab(QWidget):
         low_stock_tab = QWidget()
         self.setup_low_stock_tab(low_stock_tab)
         self.tab_widget.addTab(low_stock_tab, "Low Stock Alerts")
+        self.tab_widget.currentChanged.connect(self.refresh_all_data)
 
     def initialize_tables(self):
         """Initialize database tables if they don't exist"""
@@ -108,12 +125,16 @@ class InventoryTab(QWidget):
         add_button = QPushButton("Add New Product")
         add_button.setProperty("class", "primary-button")
         add_button.clicked.connect(self.add_product)
+        self.import_button = QPushButton("Import Products")
+        self.import_button.clicked.connect(self.import_products)
+        self.import_button.setEnabled(self.is_admin)
 
         top_bar.addWidget(QLabel("Search:"))
         top_bar.addWidget(self.product_search, 2)
         top_bar.addWidget(QLabel("Category:"))
         top_bar.addWidget(self.category_filter, 1)
         top_bar.addStretch()
+        top_bar.addWidget(self.import_button)
         top_bar.addWidget(add_button)
 
         # Initialize products table
@@ -172,17 +193,30 @@ class InventoryTab(QWidget):
 
     def refresh_all_data(self):
         """Refreshes the data on all tabs."""
-        self.load_categories()
+        self.load_data()
+
+    def load_data(self):
+        """Fetch products and categories on a worker thread."""
+        self.loader.load(lambda db: (db.get_all_products(), db.get_product_categories()))
+
+    def on_data_loaded(self, data):
+        """Fill every table from a background load."""
+        self.products, categories = data
+        self.load_categories(categories)
         self.load_products()
         self.load_low_stock()
 
-    def load_categories(self):
+    def on_user_changed(self):
+        """Re-apply role permissions after a user switch."""
+        self.is_admin = self.user_data.get("role") == "Admin"
+        self.import_button.setEnabled(self.is_admin)
+
+    def load_categories(self, categories):
         """Loads product categories into the filter combobox."""
         self.category_filter.blockSignals(True)
         current_text = self.category_filter.currentText()
         self.category_filter.clear()
         self.category_filter.addItem("All Categories")
-        categories = self.db.get_product_categories()
         if categories:
             self.category_filter.addItems([cat["category"] for cat in categories])
 
@@ -192,8 +226,8 @@ class InventoryTab(QWidget):
         self.category_filter.blockSignals(False)
 
     def load_products(self):
-        """Loads and filters products for the main table."""
-        products = self.db.get_all_products()
+        """Filters the loaded products into the main table."""
+        products = self.products
         search_term = self.product_search.text().lower()
         category = self.category_filter.currentText()
 
@@ -246,26 +280,13 @@ class InventoryTab(QWidget):
             self.products_table.setCellWidget(i, 8, actions_widget)
 
     def load_low_stock(self):
-        """Loads data for the low stock table."""
+        """Fills the low stock table from the low stock tracker."""
         try:
             if not hasattr(self, "low_stock_table") or self.low_stock_table is None:
                 logger.error("Low stock table not initialized")
                 return
 
-            products = self.db.get_all_products()
-            if not products:
-                logger.warning("No products found in database")
-                self.low_stock_table.setRowCount(0)
-                return
-
-            low_stock_products = [
-                p
-                for p in products
-                if isinstance(p, dict)
-                and "stock_quantity" in p
-                and "min_stock_level" in p
-                and p["stock_quantity"] <= p["min_stock_level"]
-            ]
+            low_stock_products = self.low_stock.products()
 
             self.low_stock_table.setRowCount(len(low_stock_products))
             for i, p in enumerate(low_stock_products):
@@ -311,6 +332,108 @@ class InventoryTab(QWidget):
         if dialog.exec_() == QDialog.Accepted:
             self.refresh_all_data()
 
+    def import_products(self):
+        """Stream a product list into the database on a worker thread."""
+        if self.import_thread is not None:
+            QMessageBox.information(
+                self, "Import Running", "Please wait for the current import to finish."
+            )
+            return
+
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Import Products",
+            "",
+            "Spreadsheets (*.xlsx *.csv);;Excel Files (*.xlsx);;CSV Files (*.csv)",
+        )
+        if not file_path:
+            return
+
+        # Progress dialog with cancel; a cancelled import resumes next time
+        self.import_progress = QProgressDialog("Importing products...", "Cancel", 0, 0, self)
+        self.import_progress.setWindowTitle("Import")
+        self.import_progress.setWindowModality(Qt.WindowModal)
+        self.import_progress.setMinimumDuration(0)
+
+        # Imported here so pandas is only loaded when an import is run
+        from src.bulk_importer import BulkImportWorker
+
+        # Worker thread
+        self.import_thread = QThread()
+        self.import_worker = BulkImportWorker(self.db, file_path, "products")
+        self.import_worker.moveToThread(self.import_thread)
+
+        self.import_thread.started.connect(self.import_worker.run)
+        self.import_worker.progress.connect(self.on_import_progress)
+        self.import_worker.finished.connect(self.on_import_finished)
+        self.import_worker.failed.connect(self.on_import_failed)
+        self.import_worker.cancelled.connect(self.on_import_cancelled)
+        # The worker's thread is busy in run(), so cancel() must be called
+        # directly from this thread rather than queued to the worker
+        self.import_progress.canceled.connect(self.import_worker.cancel, Qt.DirectConnection)
+
+        self.import_thread.start()
+        self.import_progress.show()
+
+    def on_import_progress(self, done, total):
+        """Update the import progress dialog."""
+        if self.import_progress is None:
+            return
+        self.import_progress.setMaximum(max(total, 1))
+        self.import_progress.setValue(min(done, max(total, 1)))
+        self.import_progress.setLabelText(f"Imported {done} of {total} rows...")
+
+    def on_import_finished(self, counts):
+        """Handle a completed import."""
+        self.cleanup_import()
+        self.db.publish("products")  # written through the importer's connection
+        self.db.log_activity(
+            self.user_data["id"],
+            "Import Products",
+            f"Imported products: {counts['inserted']} added, {counts['updated']} updated",
+        )
+        self.refresh_all_data()
+        QMessageBox.information(
+            self,
+            "Import Complete",
+            f"Inserted: {counts['inserted']}\n"
+            f"Updated: {counts['updated']}\n"
+            f"Skipped: {counts['skipped']}\n"
+            f"Invalid: {counts['invalid']}",
+        )
+
+    def on_import_failed(self, message):
+        """Handle a failed import."""
+        self.cleanup_import()
+        self.db.publish("products")  # written through the importer's connection
+        self.refresh_all_data()
+        QMessageBox.critical(self, "Import Failed", f"Failed to import products: {message}")
+
+    def on_import_cancelled(self):
+        """Handle a cancelled import."""
+        self.cleanup_import()
+        self.db.publish("products")  # written through the importer's connection
+        self.refresh_all_data()
+        QMessageBox.information(
+            self,
+            "Import Paused",
+            "The import was stopped. Importing the same file again will resume where it left off.",
+        )
+
+    def cleanup_import(self):
+        """Stop the import thread and close the progress dialog."""
+        if self.import_progress is not None:
+            self.import_progress.canceled.disconnect()
+            self.import_progress.close()
+            self.import_progress = None
+
+        if self.import_thread is not None:
+            self.import_thread.quit()
+            self.import_thread.wait()
+            self.import_thread = None
+
+        self.import_worker = None
+
     def edit_product(self, product_id):
         if not self.is_admin:
             QMessageBox.warning(
@@ -327,10 +450,9 @@ class InventoryTab(QWidget):
         if dialog.exec_() == QDialog.Accepted:
             change, notes = dialog.get_values()
             if change != 0:
-                self.db.execute_query(
-                    "UPDATE products SET stock_quantity = stock_quantity + ? WHERE id = ?",
-                    (change, product["id"]),
-                )
+                if not self.db.adjust_stock(product["id"], change, notes):
+                    QMessageBox.critical(self, "Error", "Failed to update stock.")
+                    return
                 self.db.log_activity(
                     self.user_data["id"],
                     "Stock Update",
@@ -347,13 +469,14 @@ class ProductDialog(QDialog):
         self.db = db
         self.product_data = product_data
         self.setWindowTitle("Edit Product" if product_data else "Add New Product")
-        self.setStyleSheet(MAIN_STYLESHEET)
         self.setMinimumWidth(500)
         self.setup_ui()
 
     def setup_ui(self):
         layout = QFormLayout(self)
         self.name = QLineEdit()
+        self.barcode = QLineEdit()
+        self.barcode.setPlaceholderText("Scan or type the barcode")
         self.category = QComboBox()
         self.category.setEditable(True)
         self.supplier = QComboBox()
@@ -372,6 +495,7 @@ class ProductDialog(QDialog):
             self.supplier.setCurrentIndex(0)  # Default to None
 
         layout.addRow("Name*:", self.name)
+        layout.addRow("Barcode:", self.barcode)
         layout.addRow("Category*:", self.category)
         layout.addRow("Supplier:", self.supplier)
         layout.addRow("Purchase Price*:", self.purchase_price)
@@ -397,6 +521,7 @@ class ProductDialog(QDialog):
 
     def populate_form(self):
         self.name.setText(self.product_data["name"])
+        self.barcode.setText(self.product_data.get("barcode") or "")
         self.category.setCurrentText(self.product_data.get("category", ""))
         self.purchase_price.setValue(self.product_data.get("purchase_price", 0))
         self.selling_price.setValue(self.product_data.get("selling_price", 0))
@@ -422,11 +547,19 @@ class ProductDialog(QDialog):
             "stock_quantity": self.stock.value(),
             "min_stock_level": self.min_stock.value(),
             "supplier_id": self.supplier.currentData(),
+            "barcode": self.barcode.text().strip(),
         }
         if self.product_data:
-            self.db.update_product(self.product_data["id"], data)
+            saved = self.db.update_product(self.product_data["id"], data)
         else:
-            self.db.add_product(data)
+            saved = self.db.add_product(data)
+        if not saved:
+            QMessageBox.warning(
+                self,
+                "Save Failed",
+                "Could not save the product. Check that the barcode is not used by another product.",
+            )
+            return
         self.accept()
 
 
@@ -436,7 +569,6 @@ class StockDialog(QDialog):
     def __init__(self, product, parent=None):
         super().__init__(parent)
         self.setWindowTitle(f"Update Stock for {product['name']}")
-        self.setStyleSheet(MAIN_STYLESHEET)
 
         layout = QFormLayout(self)
         layout.addRow(QLabel(f"Current Stock: <b>{product['stock_quantity']}</b>"))
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Live low-stock tracking for MAHER ZARAI MARKAZ.
+
+LowStockTracker keeps the products at or below their minimum stock level in
+memory. It loads them once (through the stock-gap index, not a table scan)
+and then follows the database's "stock" events from sales, stock
+adjustments and product edits, signalling when a product crosses the
+threshold in either direction.
+"""
+
+import logging
+from PyQt5.QtCore import QObject, pyqtSignal
+
+# Set up logging
+logger = logging.getLogger('low_stock')
+
+
+class LowStockTracker(QObject):
+    """Products at or below min_stock_level, kept current by stock events"""
+
+    # Define signals
+    went_low = pyqtSignal(dict)  # product that fell to or below its minimum
+    recovered = pyqtSignal(dict)  # product back above its minimum
+    changed = pyqtSignal(int)  # set or a tracked product changed; new count
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.low = {}  # product_id -> product
+        self.reload()
+        db.subscribe(self.on_change)
+
+    def __len__(self):
+        return len(self.low)
+
+    def is_low(self, product_id):
+        return product_id in self.low
+
+    def products(self):
+        """Low-stock products, largest shortage first"""
+        return sorted(
+            self.low.values(),
+            key=lambda p: (p["stock_quantity"] - p["min_stock_level"], p["name"] or ""),
+        )
+
+    def reload(self):
+        """Re-read the low-stock set (after imports, restores and deletions)"""
+        self.low = {p["id"]: p for p in self.db.get_low_stock_products()}
+        logger.info(f"Low stock: {len(self.low)} products")
+        self.changed.emit(len(self.low))
+
+    def on_change(self, event, data):
+        """Apply a database change event"""
+        if event == "stock":
+            self.update_product(data)
+        elif event in ("products", "reset"):
+            self.reload()
+
+    def update_product(self, data):
+        product_id = data["product_id"]
+        product = self.low.get(product_id)
+        if data["new_quantity"] <= data["min_stock_level"]:
+            if product is None:
+                product = {"id": product_id, "category": data.get("category")}
+                self.low[product_id] = product
+                crossed = True
+            else:
+                crossed = False
+            product["name"] = data["name"]
+            product["category"] = data.get("category", product.get("category"))
+            product["stock_quantity"] = data["new_quantity"]
+            product["min_stock_level"] = data["min_stock_level"]
+            if crossed:
+                self.went_low.emit(dict(product))
+            self.changed.emit(len(self.low))
+        elif product is not None:
+            del self.low[product_id]
+            product["stock_quantity"] = data["new_quantity"]
+            product["min_stock_level"] = data["min_stock_level"]
+            self.recovered.emit(dict(product))
+            self.changed.emit(len(self.low))
+
+    def close(self):
+        self.db.unsubscribe(self.on_change)
@@ -35,6 +35,7 @@ from PyQt5.QtWidgets import (
     QTableWidget,
     QTableWidgetItem,
     QHeaderView,
+    QInputDialog,
 )
 from PyQt5.QtGui import (
     QIcon,
@@ -51,6 +52,7 @@ from PyQt5.QtCore import (
     QSize,
     QTimer,
     QThread,
+    QObject,
     pyqtSignal,
     QPropertyAnimation,
     QPoint,
@@ -60,9 +62,13 @@ from PyQt5.QtCore import (
 # Add src directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Startup timing (no-op unless --profile-startup is given)
+from src.startup_profiler import profiler
+
+profiler.start_phase("import:app_modules")
+
 # Import custom styles
 from src.style import (
-    MAIN_STYLESHEET,
     LOGIN_STYLESHEET,
     SPLASH_STYLESHEET,
     get_default_font,
@@ -80,16 +86,29 @@ try:
     from src.billing_tab import BillingTab
     from src.inventory_tab import InventoryTab
     from src.customers_tab import CustomersTab
+    from src.suppliers_tab import SuppliersTab
     from src.reports_tab import ReportsTab
     from src.settings_tab import SettingsTab
-    from src.voice_recognition import VoiceRecognitionManager
     from src.receipt_generator import ReceiptGenerator
     from src.password_reset_dialog import PasswordResetDialog
+    from src.settings_store import SettingsStore
+    from src.dashboard_stats import DashboardStats, DASHBOARD_REFRESH_MS
+    from src.low_stock import LowStockTracker
+    from src.theme_engine import apply_saved_theme, get_style_manager
+    from src.backup_manager import (
+        BackupScheduler,
+        BackupWorker,
+        IncrementalBackupStore,
+        MANIFEST_FILE,
+        backup_file_path,
+    )
 except ImportError as e:
     print(f"Error importing modules: {e}")
     print("Make sure you're running the application from the correct directory.")
     sys.exit(1)
 
+profiler.end_phase("import:app_modules")
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -176,13 +195,42 @@ class ToastNotification(QFrame):
         self.animation.start()
 
 
+class LoginWorker(QObject):
+    """Checks a password against its bcrypt hash off the GUI thread"""
+
+    # Define signals
+    finished = pyqtSignal(bool, object)  # password ok, upgraded hash or None
+
+    def __init__(self, password, password_hash, rounds):
+        super().__init__()
+        self.password = password
+        self.password_hash = password_hash
+        self.rounds = rounds
+
+    def run(self):
+        try:
+            ok, new_hash = Database.check_password(
+                self.password, self.password_hash, self.rounds
+            )
+        except Exception as e:
+            logger.error(f"Password check failed: {e}")
+            ok, new_hash = False, None
+        self.finished.emit(ok, new_hash)
+
+
 class LoginWindow(QDialog):
     """Simple, fully responsive login window"""
 
-    def __init__(self, database):
+    def __init__(self, database, exit_on_cancel=True):
         super().__init__()
         self.db = database
         self.user_data = None
+        self.exit_on_cancel = exit_on_cancel
+
+        # Background password check state
+        self.login_thread = None
+        self.login_worker = None
+        self.pending_user = None
         
         # Set window flags
         self.setWindowFlags(
@@ -487,6 +535,14 @@ class LoginWindow(QDialog):
         """)
         self.login_button.clicked.connect(self.handle_login)
         form_layout.addWidget(self.login_button)
+
+        # Busy indicator shown while the password is being checked
+        self.login_spinner = QProgressBar()
+        self.login_spinner.setRange(0, 0)
+        self.login_spinner.setTextVisible(False)
+        self.login_spinner.setMaximumHeight(6)
+        self.login_spinner.hide()
+        form_layout.addWidget(self.login_spinner)
         
         right_layout.addWidget(form_container)
         
@@ -622,6 +678,9 @@ class LoginWindow(QDialog):
 
     def handle_login(self):
         """Handle login button click"""
+        if self.login_thread is not None:
+            return
+
         username = self.username_input.text().strip()
         password = self.password_input.text().strip()
 
@@ -631,20 +690,63 @@ class LoginWindow(QDialog):
             )
             return
 
-        # Authenticate user
-        user_data = self.db.verify_user(username, password)
+        self.pending_user = self.db.get_user_by_username(username)
+        if self.pending_user is None:
+            QMessageBox.warning(self, "Login Failed", "Invalid username or password.")
+            return
+
+        # Check the password on a worker thread so the window stays responsive
+        self.set_busy(True)
+        self.login_thread = QThread()
+        self.login_worker = LoginWorker(
+            password, self.pending_user["password_hash"], self.db.password_rounds()
+        )
+        self.login_worker.moveToThread(self.login_thread)
+
+        self.login_thread.started.connect(self.login_worker.run)
+        self.login_worker.finished.connect(self.on_login_finished)
 
-        if user_data:
-            self.user_data = user_data
+        self.login_thread.start()
+
+    def on_login_finished(self, ok, new_hash):
+        """Accept the login, storing an upgraded hash if the worker made one"""
+        self.cleanup_login()
+        self.set_busy(False)
+
+        if ok:
+            self.db.complete_login(self.pending_user, new_hash)
+            self.user_data = self.pending_user
             self.accept()
         else:
             QMessageBox.warning(self, "Login Failed", "Invalid username or password.")
+            self.password_input.selectAll()
+            self.password_input.setFocus()
+
+    def cleanup_login(self):
+        """Stop the password check thread"""
+        if self.login_thread is not None:
+            self.login_thread.quit()
+            self.login_thread.wait()
+            self.login_thread = None
+
+        self.login_worker = None
+
+    def set_busy(self, busy):
+        """Show the spinner and lock the form while a login is checked"""
+        self.username_input.setEnabled(not busy)
+        self.password_input.setEnabled(not busy)
+        self.login_button.setEnabled(not busy)
+        self.login_button.setText("SIGNING IN..." if busy else "SIGN IN")
+        self.login_spinner.setVisible(busy)
 
     def accept(self):
         super().accept()
 
     def reject(self):
-        sys.exit(0)
+        self.cleanup_login()
+        if self.exit_on_cancel:
+            sys.exit(0)
+        super().reject()
 
     def get_user_data(self):
         return self.user_data
@@ -691,6 +793,7 @@ class KeyboardShortcutsDialog(QDialog):
             ("Switch to Customers", "Alt+3"),
             ("Switch to Reports", "Alt+4"),
             ("Switch to Settings", "Alt+5"),
+            ("Switch to Suppliers", "Alt+6"),
             ("Show Keyboard Shortcuts", "F1"),
             ("Logout", "Ctrl+L"),
             ("New Sale", "Ctrl+N"),
@@ -714,49 +817,40 @@ class KeyboardShortcutsDialog(QDialog):
 class MainWindow(QMainWindow):
     """Main application window"""
 
-    def __init__(self, user_data):
+    def __init__(self, user_data, db=None):
         super().__init__()
         self.user_data = user_data
-        self.db = Database()
-        self.receipt_generator = ReceiptGenerator(self.db)
+        self.db = db or Database()
+        self.settings = SettingsStore(self.db, parent=self)
+        self.settings.settings_changed.connect(self.on_settings_changed)
+        self.receipt_generator = ReceiptGenerator(self.db, self.settings)
+        self.dashboard_stats = DashboardStats(self.db)
+        self.low_stock = LowStockTracker(self.db, parent=self)
+        self.low_stock.went_low.connect(self.on_product_low)
         self.voice_recognition = None
 
+        # Yesterday's closing stock is snapshotted once per day, off the startup path
+        self.snapshot_day = None
+        QTimer.singleShot(0, self.check_stock_snapshot)
+
+        # Background backup state
+        self.backup_thread = None
+        self.backup_worker = None
+        self.backup_is_auto = False
+        self.backup_scheduler = None
+
         # Set window properties
         self.setWindowTitle(APP_NAME)
         self.resize(950, 700)  # Set smaller default size
         self.setMinimumSize(700, 500)  # Set smaller minimum size
         self.setWindowIcon(QIcon(os.path.join("assets", "logo.png")))
 
-        # Apply theme based on saved setting
-        theme = self.db.get_setting("theme") or "light"
+        # Apply theme, accent and high contrast from settings; nothing is
+        # re-applied if main() already set the same layers
         app = QApplication.instance()
+        self.style_manager = get_style_manager(app)
         try:
-            if theme == "dark":
-                from src.style import get_dark_palette, MAIN_STYLESHEET, DARK_STYLESHEET
-
-                app.setPalette(get_dark_palette())
-                style = MAIN_STYLESHEET + DARK_STYLESHEET
-            elif theme == "blue":
-                from src.style import get_blue_palette, MAIN_STYLESHEET, BLUE_STYLESHEET
-
-                app.setPalette(get_blue_palette())
-                style = MAIN_STYLESHEET + BLUE_STYLESHEET
-            else:  # Light theme or default
-                from src.style import MAIN_STYLESHEET, LIGHT_STYLESHEET
-
-                app.setPalette(app.style().standardPalette())
-                style = MAIN_STYLESHEET + LIGHT_STYLESHEET
-            # Try to validate the style by ensuring all braces are matched
-            open_braces = style.count("{")
-            close_braces = style.count("}")
-            if open_braces != close_braces:
-                logger.error(
-                    f"Invalid stylesheet: Unmatched braces ({open_braces} vs {close_braces})"
-                )
-                raise ValueError("Stylesheet validation failed")
-
-            app.setStyleSheet(style)
-            logger.info("Theme applied successfully")
+            self.style_manager.apply_settings(self.settings)
         except Exception as e:
             logger.error(f"Error applying theme: {e}")
             # Fall back to system style
@@ -876,6 +970,11 @@ class MainWindow(QMainWindow):
         settings_action.triggered.connect(self.show_settings_page)
         view_menu.addAction(settings_action)
 
+        suppliers_action = QAction("Suppliers", self)
+        suppliers_action.setShortcut(QKeySequence("Alt+6"))
+        suppliers_action.triggered.connect(self.show_suppliers_page)
+        view_menu.addAction(suppliers_action)
+
         # Help menu
         help_menu = menubar.addMenu("Help")
 
@@ -956,6 +1055,9 @@ class MainWindow(QMainWindow):
         self.customers_button = self.create_sidebar_button(
             "Customers", "customer_icon.png"
         )
+        self.suppliers_button = self.create_sidebar_button(
+            "Suppliers", "supplier_icon.png"
+        )
         self.reports_button = self.create_sidebar_button("Reports", "report_icon.png")
         self.settings_button = self.create_sidebar_button(
             "Settings", "settings_icon.png"
@@ -965,6 +1067,7 @@ class MainWindow(QMainWindow):
         self.billing_button.clicked.connect(self.show_billing_page)
         self.inventory_button.clicked.connect(self.show_inventory_page)
         self.customers_button.clicked.connect(self.show_customers_page)
+        self.suppliers_button.clicked.connect(self.show_suppliers_page)
         self.reports_button.clicked.connect(self.show_reports_page)
         self.settings_button.clicked.connect(self.show_settings_page)
 
@@ -972,6 +1075,7 @@ class MainWindow(QMainWindow):
         sidebar_layout.addWidget(self.billing_button)
         sidebar_layout.addWidget(self.inventory_button)
         sidebar_layout.addWidget(self.customers_button)
+        sidebar_layout.addWidget(self.suppliers_button)
         sidebar_layout.addWidget(self.reports_button)
         sidebar_layout.addWidget(self.settings_button)
 
@@ -1035,16 +1139,16 @@ class MainWindow(QMainWindow):
         user_widget.setLayout(user_layout)
 
         # Username
-        user_info = QLabel(f"Welcome, {self.user_data['username']}")
-        user_info.setObjectName("userInfo")
-        user_info.setAlignment(Qt.AlignRight)
-        user_layout.addWidget(user_info)
+        self.user_info_label = QLabel(f"Welcome, {self.user_data['username']}")
+        self.user_info_label.setObjectName("userInfo")
+        self.user_info_label.setAlignment(Qt.AlignRight)
+        user_layout.addWidget(self.user_info_label)
 
         # Role
-        user_role = QLabel(f"Role: {self.user_data['role']}")
-        user_role.setObjectName("userRole")
-        user_role.setAlignment(Qt.AlignRight)
-        user_layout.addWidget(user_role)
+        self.user_role_label = QLabel(f"Role: {self.user_data['role']}")
+        self.user_role_label.setObjectName("userRole")
+        self.user_role_label.setAlignment(Qt.AlignRight)
+        user_layout.addWidget(self.user_role_label)
 
         header_layout.addWidget(user_widget)
 
@@ -1069,22 +1173,61 @@ class MainWindow(QMainWindow):
         self.stacked_widget = QStackedWidget()
         self.stacked_widget.setObjectName("contentArea")
 
-        # Create pages
-        self.billing_page = BillingTab(self.db, self.user_data, self.receipt_generator)
-        self.inventory_page = InventoryTab(self.db, self.user_data)
-        self.customers_page = CustomersTab(self.db, self.user_data)
-        self.reports_page = ReportsTab(self.db, self.user_data)
-        self.settings_page = SettingsTab(self.db, self.user_data, self)
-
-        # Add pages to stacked widget
-        self.stacked_widget.addWidget(self.billing_page)
-        self.stacked_widget.addWidget(self.inventory_page)
-        self.stacked_widget.addWidget(self.customers_page)
-        self.stacked_widget.addWidget(self.reports_page)
-        self.stacked_widget.addWidget(self.settings_page)
+        # Pages are built on first navigation (see get_page); until then a
+        # placeholder is shown so the window responds straight away
+        self.pages = {}
+        self.current_page = None
+        self.loading_placeholder = QLabel("Loading...")
+        self.loading_placeholder.setAlignment(Qt.AlignCenter)
+        self.stacked_widget.addWidget(self.loading_placeholder)
 
         content_layout.addWidget(self.stacked_widget)
 
+    def create_page(self, name):
+        """Construct a page without loading its data"""
+        if name == "billing":
+            return BillingTab(self.db, self.user_data, self.receipt_generator, defer_load=True)
+        if name == "inventory":
+            return InventoryTab(self.db, self.user_data, defer_load=True, low_stock=self.low_stock)
+        if name == "customers":
+            return CustomersTab(self.db, self.user_data, defer_load=True)
+        if name == "suppliers":
+            return SuppliersTab(self.db, self.user_data)
+        if name == "reports":
+            return ReportsTab(self.db, self.user_data)
+        return SettingsTab(self.db, self.user_data, self)
+
+    def get_page(self, name):
+        """Return a page, building it and starting its data load on first use"""
+        page = self.pages.get(name)
+        if page is None:
+            with profiler.phase(f"page:{name}"):
+                page = self.create_page(name)
+            self.pages[name] = page
+            self.stacked_widget.addWidget(page)
+            if hasattr(page, "load_data"):
+                page.load_data()
+        return page
+
+    def show_page(self, name, title, button):
+        """Switch to a page, building it after the placeholder has painted"""
+        self.current_page = name
+        self.header_title.setText(title)
+        self.set_active_button(button)
+        self.new_sale_button.setVisible(name == "billing")
+
+        if name in self.pages:
+            self.stacked_widget.setCurrentWidget(self.pages[name])
+        else:
+            self.stacked_widget.setCurrentWidget(self.loading_placeholder)
+            QTimer.singleShot(0, lambda: self.finish_show_page(name))
+
+    def finish_show_page(self, name):
+        """Build a page queued by show_page and show it if still selected"""
+        page = self.get_page(name)
+        if self.current_page == name:
+            self.stacked_widget.setCurrentWidget(page)
+
     def setup_footer(self):
         """Set up the footer/status bar"""
         self.footer = QStatusBar()
@@ -1099,6 +1242,19 @@ class MainWindow(QMainWindow):
         # Add spacer
         self.footer.addPermanentWidget(QLabel("  |  "))
 
+        # Today's sales, low stock and udhaar, redrawn from the stats cache
+        self.stats_label = QLabel()
+        self.stats_label.setObjectName("footerText")
+        self.footer.addPermanentWidget(self.stats_label)
+        self.update_dashboard_stats()
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_dashboard_stats)
+        self.stats_timer.timeout.connect(self.check_stock_snapshot)
+        self.stats_timer.start(DASHBOARD_REFRESH_MS)
+
+        # Add spacer
+        self.footer.addPermanentWidget(QLabel("  |  "))
+
         # Backup status
         self.backup_status_label = QLabel("Next backup: Not scheduled")
         self.backup_status_label.setObjectName("backupStatus")
@@ -1122,38 +1278,27 @@ class MainWindow(QMainWindow):
 
     def show_billing_page(self):
         """Show the billing page"""
-        self.stacked_widget.setCurrentWidget(self.billing_page)
-        self.header_title.setText("Billing")
-        self.set_active_button(self.billing_button)
-        self.new_sale_button.show()
+        self.show_page("billing", "Billing", self.billing_button)
 
     def show_inventory_page(self):
         """Show the inventory page"""
-        self.stacked_widget.setCurrentWidget(self.inventory_page)
-        self.header_title.setText("Inventory")
-        self.set_active_button(self.inventory_button)
-        self.new_sale_button.hide()
+        self.show_page("inventory", "Inventory", self.inventory_button)
 
     def show_customers_page(self):
         """Show the customers page"""
-        self.stacked_widget.setCurrentWidget(self.customers_page)
-        self.header_title.setText("Customers")
-        self.set_active_button(self.customers_button)
-        self.new_sale_button.hide()
+        self.show_page("customers", "Customers", self.customers_button)
+
+    def show_suppliers_page(self):
+        """Show the suppliers and purchase orders page"""
+        self.show_page("suppliers", "Suppliers", self.suppliers_button)
 
     def show_reports_page(self):
         """Show the reports page"""
-        self.stacked_widget.setCurrentWidget(self.reports_page)
-        self.header_title.setText("Reports")
-        self.set_active_button(self.reports_button)
-        self.new_sale_button.hide()
+        self.show_page("reports", "Reports", self.reports_button)
 
     def show_settings_page(self):
         """Show the settings page"""
-        self.stacked_widget.setCurrentWidget(self.settings_page)
-        self.header_title.setText("Settings")
-        self.set_active_button(self.settings_button)
-        self.new_sale_button.hide()
+        self.show_page("settings", "Settings", self.settings_button)
 
     def set_active_button(self, active_button):
         """Set the active sidebar button"""
@@ -1162,6 +1307,7 @@ class MainWindow(QMainWindow):
             self.billing_button,
             self.inventory_button,
             self.customers_button,
+            self.suppliers_button,
             self.reports_button,
             self.settings_button,
         ]:
@@ -1180,6 +1326,34 @@ class MainWindow(QMainWindow):
         formatted_datetime = current_datetime.strftime("%A, %d %B %Y %H:%M:%S")
         self.date_time_label.setText(formatted_datetime)
 
+    def check_stock_snapshot(self):
+        """Take the daily stock snapshot when the day has changed"""
+        today = datetime.date.today()
+        if self.snapshot_day != today:
+            self.snapshot_day = today
+            self.db.ensure_stock_snapshot()
+
+    def update_dashboard_stats(self):
+        """Show the current dashboard figures in the status bar"""
+        try:
+            stats = self.dashboard_stats.get()
+        except Exception as e:
+            logger.error(f"Error loading dashboard stats: {e}")
+            return
+        self.stats_label.setText(
+            f"Today: Rs. {stats['today_sales']:,.2f}  |  "
+            f"Low stock: {stats['low_stock_items']}  |  "
+            f"Udhaar: Rs. {stats['total_udhaar']:,.2f}"
+        )
+
+    def on_product_low(self, product):
+        """Warn when a product falls to its minimum stock level"""
+        self.show_toast(
+            f"Low stock: {product['name']} ({product['stock_quantity']} left)",
+            duration=5000,
+            notification_type="warning",
+        )
+
     def init_voice_recognition(self):
         """Initialize voice recognition"""
         # Voice recognition is removed as requested
@@ -1193,43 +1367,106 @@ class MainWindow(QMainWindow):
     def clear_sale(self):
         """Clear the current sale and start a new one"""
         if isinstance(self.stacked_widget.currentWidget(), BillingTab):
-            self.billing_page.clear_sale()
+            self.pages["billing"].clear_sale()
             self.show_toast("Sale cleared", notification_type="info")
 
     def backup_database(self):
         """Backup the database"""
-        # Get backup directory
-        backup_dir = os.path.join(os.getcwd(), "backups")
-        os.makedirs(backup_dir, exist_ok=True)
+        return self.start_backup(backup_file_path("backup"))
+
+    def start_backup(self, backup_file=None, auto=False):
+        """
+        Run an online backup on a worker thread so checkout can continue.
+        Without a backup_file the backup goes to the incremental store,
+        which is then pruned to the configured retention period.
+        """
+        if self.backup_thread is not None:
+            if not auto:
+                self.show_toast("A backup is already running", notification_type="info")
+            return False
 
-        # Generate backup filename with timestamp
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = os.path.join(backup_dir, f"backup_{timestamp}.db")
+        self.backup_is_auto = auto
+        retention_days = self.settings.get_int("backup_retention_days", 30)
+        activity_retention_days = self.settings.get_int("activity_retention_days", 365)
 
-        try:
-            # Perform backup
-            self.db.backup_database(backup_file)
+        # Worker thread
+        self.backup_thread = QThread()
+        self.backup_worker = BackupWorker(
+            self.db, backup_file, retention_days, activity_retention_days
+        )
+        self.backup_worker.moveToThread(self.backup_thread)
+
+        self.backup_thread.started.connect(self.backup_worker.run)
+        self.backup_worker.progress.connect(self.on_backup_progress)
+        self.backup_worker.finished.connect(self.on_backup_finished)
+        self.backup_worker.failed.connect(self.on_backup_failed)
+
+        self.backup_status_label.setText("Backing up...")
+        self.backup_thread.start()
+        return True
 
-            # Show success message
+    def on_backup_progress(self, copied, total):
+        """Show backup progress in the status bar"""
+        percent = int(copied * 100 / total) if total else 0
+        self.backup_status_label.setText(f"Backing up... {percent}%")
+
+    def on_backup_finished(self, backup_file):
+        """Handle a completed backup"""
+        auto = self.backup_is_auto
+        self.cleanup_backup()
+
+        # Show toast notification
+        if auto:
+            self.show_toast("Auto backup completed", notification_type="success")
+        else:
             self.show_toast(
                 "Database backed up successfully", notification_type="success"
             )
+        status = f"Last backup: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}"
+        if self.backup_scheduler is not None and self.backup_scheduler.next_run:
+            status += f" | Next: {self.backup_scheduler.next_run.strftime('%Y-%m-%d %H:%M')}"
+        self.backup_status_label.setText(status)
 
-            # Log backup
-            logger.info(f"Database backed up to {backup_file}")
+        # Log backup
+        logger.info(f"Database backed up to {backup_file}")
 
-            return True
-        except Exception as e:
-            # Show error message
-            self.show_toast(f"Backup failed: {str(e)}", notification_type="error")
+    def on_backup_failed(self, message):
+        """Handle a failed backup"""
+        auto = self.backup_is_auto
+        self.cleanup_backup()
 
-            # Log error
-            logger.error(f"Database backup failed: {str(e)}")
+        # Show error toast
+        prefix = "Auto backup failed" if auto else "Backup failed"
+        self.show_toast(f"{prefix}: {message}", notification_type="error")
+        self.backup_status_label.setText(prefix)
 
-            return False
+        # Log error
+        logger.error(f"Database backup failed: {message}")
+
+    def cleanup_backup(self):
+        """Stop the backup thread"""
+        if self.backup_thread is not None:
+            self.backup_thread.quit()
+            self.backup_thread.wait()
+            self.backup_thread = None
+
+        self.backup_worker = None
 
     def restore_database(self):
         """Restore the database from a backup"""
+        if self.backup_thread is not None:
+            QMessageBox.information(
+                self, "Backup Running", "Please wait for the current backup to finish."
+            )
+            return
+        # The import writes on its own connection, which a restore can't swap
+        inventory = self.pages.get("inventory")
+        if inventory is not None and inventory.import_thread is not None:
+            QMessageBox.information(
+                self, "Import Running", "Please wait for the product import to finish."
+            )
+            return
+
         # Confirm restore
         confirm = QMessageBox.warning(
             self,
@@ -1249,93 +1486,117 @@ class MainWindow(QMainWindow):
 
         # Show file dialog
         backup_file, _ = QFileDialog.getOpenFileName(
-            self, "Select Backup File", backup_dir, "Database Files (*.db)"
+            self,
+            "Select Backup File",
+            backup_dir,
+            "Database Files (*.db);;Incremental Backups (manifest.json)",
         )
 
         if not backup_file:
             return
 
+        temp_file = None
+        QApplication.setOverrideCursor(Qt.WaitCursor)
         try:
-            # Perform restore
-            self.db.restore_database(backup_file)
-
-            # Show success message
-            QMessageBox.information(
-                self,
-                "Restore Successful",
-                "Database restored successfully.\n" "The application will now restart.",
-            )
-
-            # Log restore
-            logger.info(f"Database restored from {backup_file}")
+            # Rebuild a point from the incremental store first
+            if os.path.basename(backup_file) == MANIFEST_FILE:
+                QApplication.restoreOverrideCursor()
+                store = IncrementalBackupStore(os.path.dirname(backup_file))
+                backups = list(reversed(store.list_backups()))
+                if not backups:
+                    QMessageBox.information(self, "Restore", "No backups found.")
+                    return
+                labels = [
+                    f"{b['created_at'].replace('T', ' ')} ({b['type']})" for b in backups
+                ]
+                label, ok = QInputDialog.getItem(
+                    self, "Select Backup", "Restore the database as of:", labels, 0, False
+                )
+                if not ok:
+                    return
+                QApplication.setOverrideCursor(Qt.WaitCursor)
+                chosen = backups[labels.index(label)]
+                temp_file = os.path.join(store.store_dir, f"restore_{chosen['id']}.db")
+                backup_file = store.restore(chosen["id"], temp_file)
 
-            # Restart application
-            self.restart_application()
+            # Perform restore
+            restored = self.db.restore_from_backup(backup_file)
         except Exception as e:
+            restored = False
+            logger.error(f"Database restore failed: {str(e)}")
+        finally:
+            if QApplication.overrideCursor() is not None:
+                QApplication.restoreOverrideCursor()
+            if temp_file and os.path.exists(temp_file):
+                os.remove(temp_file)
+
+        if not restored:
             # Show error message
             QMessageBox.critical(
-                self, "Restore Failed", f"Failed to restore database: {str(e)}"
+                self,
+                "Restore Failed",
+                "The backup could not be restored. It may be damaged or not a "
+                "backup of this application.\nThe current database was not changed.",
             )
+            return
 
-            # Log error
-            logger.error(f"Database restore failed: {str(e)}")
+        # Log restore
+        logger.info(f"Database restored from {backup_file}")
+
+        self.reload_pages()
+        self.show_toast("Database restored successfully", notification_type="success")
+
+    def reload_pages(self):
+        """Reload every page from the database after a restore"""
+        self.settings.reload()
+        if "billing" in self.pages:
+            self.pages["billing"].clear_sale()
+        for page in self.pages.values():
+            if hasattr(page, "load_data"):
+                page.load_data()
+        if "reports" in self.pages:
+            self.pages["reports"].load_daily_sales()
+            self.pages["reports"].load_monthly_sales()
+            self.pages["reports"].load_top_products()
+        if "settings" in self.pages:
+            self.pages["settings"].load_settings()
 
     def setup_auto_backup(self):
-        """Set up automatic database backup"""
-        # Schedule backup for 9 PM today
-        now = datetime.datetime.now()
-        backup_time = now.replace(hour=21, minute=0, second=0, microsecond=0)
-
-        # If it's already past 9 PM, schedule for tomorrow
-        if now > backup_time:
-            backup_time += datetime.timedelta(days=1)
-
-        # Calculate seconds until backup
-        seconds_until_backup = (backup_time - now).total_seconds()
-
-        # Set up timer
-        self.backup_timer = QTimer(self)
-        self.backup_timer.timeout.connect(self.perform_auto_backup)
-        self.backup_timer.start(
-            int(seconds_until_backup * 1000)
-        )  # Convert to milliseconds
-
-        # Update backup status
-        self.backup_status_label.setText(
-            f"Next backup: {backup_time.strftime('%Y-%m-%d %H:%M:%S')}"
-        )
+        """Set up (or refresh after a settings change) the daily auto backup"""
+        if self.backup_scheduler is None:
+            self.backup_scheduler = BackupScheduler(
+                self.settings, busy=self.is_sale_in_progress, parent=self
+            )
+            self.backup_scheduler.due.connect(self.perform_auto_backup)
+            self.backup_scheduler.scheduled.connect(self.on_backup_scheduled)
+        self.backup_scheduler.reschedule()
+
+    def on_settings_changed(self, changes):
+        """React to saved settings that affect the main window"""
+        if self.backup_scheduler is not None and (
+            "auto_backup_enabled" in changes or "auto_backup_time" in changes
+        ):
+            self.backup_scheduler.reschedule()
+
+    def on_backup_scheduled(self, backup_time):
+        """Show the next scheduled backup in the status bar"""
+        if self.backup_thread is not None:
+            return
+        if backup_time is None:
+            self.backup_status_label.setText("Auto backup: Off")
+        else:
+            self.backup_status_label.setText(
+                f"Next backup: {backup_time.strftime('%Y-%m-%d %H:%M')}"
+            )
 
-        # Log scheduled backup
-        logger.info(f"Auto backup scheduled for {backup_time}")
+    def is_sale_in_progress(self):
+        """True while the billing page has items in the cart"""
+        billing_page = self.pages.get("billing")
+        return billing_page is not None and bool(billing_page.current_sale_items)
 
     def perform_auto_backup(self):
         """Perform automatic database backup"""
-        # Get backup directory
-        backup_dir = os.path.join(os.getcwd(), "backups")
-        os.makedirs(backup_dir, exist_ok=True)
-
-        # Generate backup filename with timestamp
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = os.path.join(backup_dir, f"auto_backup_{timestamp}.db")
-
-        try:
-            # Perform backup
-            self.db.backup_database(backup_file)
-
-            # Show toast notification
-            self.show_toast("Auto backup completed", notification_type="success")
-
-            # Log backup
-            logger.info(f"Auto backup completed: {backup_file}")
-        except Exception as e:
-            # Show error toast
-            self.show_toast(f"Auto backup failed: {str(e)}", notification_type="error")
-
-            # Log error
-            logger.error(f"Auto backup failed: {str(e)}")
-
-            # Schedule next backup
-            self.setup_auto_backup()
+        self.start_backup(auto=True)
 
     def show_about(self):
         """Show about dialog"""
@@ -1369,13 +1630,39 @@ class MainWindow(QMainWindow):
         if confirm == QMessageBox.Yes:
             # Log logout
             logger.info(f"User {self.user_data['username']} logged out")
+            self.db.log_activity(
+                self.user_data['id'], "Logout", f"User '{self.user_data['username']}' logged out."
+            )
 
-            # Restart application
-            self.restart_application()
+            # Let the next user log in without rebuilding the window
+            self.switch_user()
+
+    def switch_user(self):
+        """Hand the window over to the next user who logs in"""
+        self.hide()
+        login_window = LoginWindow(self.db, exit_on_cancel=False)
+        if login_window.exec() != QDialog.Accepted:
+            # Nobody logged back in, so shut down as the old restart did
+            logger.info("Login canceled after logout.")
+            self.cleanup_backup()
+            self.db.close()
+            QApplication.quit()
+            return
 
-    def restart_application(self):
-        """Restart the application"""
-        os.execl(sys.executable, sys.executable, *sys.argv)
+        # Every page holds this dict, so updating it in place switches them all
+        self.user_data.clear()
+        self.user_data.update(login_window.get_user_data())
+        self.user_info_label.setText(f"Welcome, {self.user_data['username']}")
+        self.user_role_label.setText(f"Role: {self.user_data['role']}")
+        for page in self.pages.values():
+            if hasattr(page, "on_user_changed"):
+                page.on_user_changed()
+
+        logger.info(f"Switched to user: {self.user_data['username']}")
+        self.show_billing_page()
+        self.showMaximized()
+        self.raise_()
+        self.activateWindow()
 
     def closeEvent(self, event):
         """Handle window close event"""
@@ -1392,6 +1679,13 @@ class MainWindow(QMainWindow):
             # Log application exit
             logger.info(f"Application exited by user: {self.user_data['username']}")
 
+            # Let a running backup and page loads finish before closing the database
+            self.cleanup_backup()
+            for page in self.pages.values():
+                for name in ("loader", "scan_loader"):
+                    if hasattr(page, name):
+                        getattr(page, name).cleanup_load()
+
             # Close database connection
             self.db.close()
 
@@ -1532,33 +1826,24 @@ def main():
     app.setApplicationName(APP_NAME)
     app.setStyle("Fusion")
 
-    # Initialize database for settings
-    db = Database()
+    # One database for the whole session; login and main window share it
+    with profiler.phase("database"):
+        db = Database()
 
-    # Apply theme based on saved setting
-    theme = db.get_setting("theme") or "light"
-    if theme == "dark":
-        from style import get_dark_palette, MAIN_STYLESHEET, DARK_STYLESHEET
-
-        app.setPalette(get_dark_palette())
-        app.setStyleSheet(MAIN_STYLESHEET + DARK_STYLESHEET)
-    elif theme == "blue":
-        from style import get_blue_palette, MAIN_STYLESHEET, BLUE_STYLESHEET
-
-        app.setPalette(get_blue_palette())
-        app.setStyleSheet(MAIN_STYLESHEET + BLUE_STYLESHEET)
-    else:  # Light theme or default
-        from style import MAIN_STYLESHEET, LIGHT_STYLESHEET
-
-        app.setPalette(app.style().standardPalette())
-        app.setStyleSheet(MAIN_STYLESHEET + LIGHT_STYLESHEET)
+    # Apply theme based on saved settings
+    with profiler.phase("stylesheet"):
+        try:
+            apply_saved_theme(app, db)
+        except Exception as e:
+            logger.error(f"Error applying theme: {e}")
 
     # Set default font
     app.setFont(get_default_font())
 
     # Show splash screen
-    splash = SplashScreen()
-    splash.show()
+    with profiler.phase("splash"):
+        splash = SplashScreen()
+        splash.show()
 
     # Check directories first
     splash.update_progress(10, "Checking directories...")
@@ -1567,8 +1852,7 @@ def main():
 
     # Initialize database
     splash.update_progress(20, "Initializing database...")
-    db = Database()
-    if not db.initialize_db():
+    if not db.initialized:
         QMessageBox.critical(
             None,
             "Database Error",
@@ -1581,6 +1865,7 @@ def main():
 
     # Create placeholder logo if it doesn't exist
     splash.update_progress(50, "Loading resources...")
+    profiler.start_phase("resources")
     logo_path = os.path.join("assets", "logo.png")
     if not os.path.exists(logo_path):
         try:
@@ -1603,13 +1888,15 @@ def main():
     templates_dir = os.path.join("src", "templates")
     if not os.path.exists(templates_dir):
         os.makedirs(templates_dir, exist_ok=True)
+    profiler.end_phase("resources")
 
     splash.update_progress(70, "Preparing application...")
 
     # Show login window
     print("Creating login window...")
     splash.update_progress(90, "Ready to login...")
-    login_window = LoginWindow(db)
+    with profiler.phase("login_window"):
+        login_window = LoginWindow(db)
     login_window.setWindowState(Qt.WindowActive)  # Ensure window is active
     print("Finishing splash screen...")
     splash.finish(login_window)
@@ -1619,18 +1906,25 @@ def main():
     login_window.activateWindow()  # Activate the window
 
     print("Waiting for login...")
-    if login_window.exec() == 1:  # Changed from exec_() to exec()
+    profiler.start_phase("login (interactive)")
+    login_result = login_window.exec()  # Changed from exec_() to exec()
+    profiler.end_phase("login (interactive)")
+    if login_result == 1:
         # Login successful
         print("Login successful!")
         user_data = login_window.get_user_data()
 
         # Show main window
         print("Creating main window...")
-        main_window = MainWindow(user_data)
-        print("Showing main window...")
-        main_window.showMaximized()  # Open in full screen
-        main_window.raise_()  # Bring window to front
-        main_window.activateWindow()  # Activate the window
+        with profiler.phase("main_window"):
+            main_window = MainWindow(user_data, db)
+            print("Showing main window...")
+            main_window.showMaximized()  # Open in full screen
+            main_window.raise_()  # Bring window to front
+            main_window.activateWindow()  # Activate the window
+
+        # The trace ends once the event loop has built the first page
+        QTimer.singleShot(0, profiler.finish)
 
         print("Starting main event loop...")
         return app.exec()  # Changed from exec_() to exec()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Background data loading for MAHER ZARAI MARKAZ pages.
+
+Pages fetch their rows on a QThread through a read-only connection (see
+Database.reader) and fill their widgets when the result arrives, so opening
+a page never blocks the UI on a large table.
+"""
+
+import logging
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+
+# Set up logging
+logger = logging.getLogger('page_loader')
+
+
+class PageLoadWorker(QObject):
+    """Run a fetch function against a read-only connection on a worker thread"""
+
+    # Define signals
+    finished = pyqtSignal(object)  # whatever fetch returned
+    failed = pyqtSignal(str)
+
+    def __init__(self, db, fetch):
+        super().__init__()
+        self.db = db
+        self.fetch = fetch
+
+    def run(self):
+        """Run the fetch (connected to QThread.started)"""
+        reader = None
+        try:
+            reader = self.db.reader()
+            self.finished.emit(self.fetch(reader))
+        except Exception as e:
+            logger.error(f"Background load failed: {e}")
+            self.failed.emit(str(e))
+        finally:
+            if reader is not None:
+                reader.close()
+
+
+class PageLoader(QObject):
+    """
+    Owns one page's background loads. A load requested while another is
+    running is queued, and only the latest queued request is kept.
+    """
+
+    # Define signals
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.load_thread = None
+        self.load_worker = None
+        self.pending_fetch = None
+
+    def is_loading(self):
+        return self.load_thread is not None
+
+    def load(self, fetch):
+        """Run fetch(reader_db) on a worker thread and emit loaded(result)"""
+        if self.load_thread is not None:
+            self.pending_fetch = fetch
+            return
+
+        self.load_thread = QThread()
+        self.load_worker = PageLoadWorker(self.db, fetch)
+        self.load_worker.moveToThread(self.load_thread)
+
+        self.load_thread.started.connect(self.load_worker.run)
+        self.load_worker.finished.connect(self.on_load_finished)
+        self.load_worker.failed.connect(self.on_load_failed)
+
+        self.load_thread.start()
+
+    def on_load_finished(self, result):
+        self.cleanup_load()
+        if self.pending_fetch is None:
+            self.loaded.emit(result)
+        self.start_pending()
+
+    def on_load_failed(self, message):
+        self.cleanup_load()
+        if self.pending_fetch is None:
+            self.failed.emit(message)
+        self.start_pending()
+
+    def start_pending(self):
+        """Start the queued load, if any"""
+        if self.pending_fetch is not None:
+            fetch, self.pending_fetch = self.pending_fetch, None
+            self.load(fetch)
+
+    def cleanup_load(self):
+        """Stop the load thread"""
+        if self.load_thread is not None:
+            self.load_thread.quit()
+            self.load_thread.wait()
+            self.load_thread = None
+
+        self.load_worker = None
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Barcode scanning support for MAHER ZARAI MARKAZ billing.
+
+Keyboard-wedge scanners "type" the code followed by Enter, much faster than
+a person can. ScanDetector tells such bursts apart from typing, and
+ProductLookup resolves the scanned code from an in-memory map of barcodes
+and product IDs (SKUs), so a scan adds the product without a database query.
+
+Run `python src/product_lookup.py --benchmark` to time lookups.
+"""
+
+import sys
+import time
+import logging
+
+# Set up logging
+logger = logging.getLogger('product_lookup')
+
+# Scanners send keys a few milliseconds apart; people rarely manage 30 ms
+SCAN_MAX_KEY_INTERVAL_MS = 30
+SCAN_MIN_LENGTH = 4
+
+
+class ProductLookup:
+    """Barcode/SKU -> product map for the billing scan fast path"""
+
+    def __init__(self, products=None):
+        self._by_code = {}
+        self._products = {}
+        if products:
+            self.rebuild(products)
+
+    def __len__(self):
+        return len(self._products)
+
+    def rebuild(self, products):
+        """
+        Replace the map from product rows with id, name, selling_price,
+        stock_quantity and barcode (see Database.get_scan_products).
+        """
+        products = products or []
+        by_id = {
+            row['id']: {
+                'id': row['id'],
+                'name': row['name'],
+                'price': row['selling_price'] or 0.0,
+                'stock': row['stock_quantity'] or 0,
+            }
+            for row in products
+        }
+        by_code = {str(product_id): product for product_id, product in by_id.items()}
+
+        # Barcodes win over IDs when a label happens to look like one
+        for row in products:
+            if row.get('barcode'):
+                by_code[row['barcode']] = by_id[row['id']]
+        self._by_code = by_code
+        self._products = by_id
+        logger.info(f"Scan map built: {len(by_id)} products, {len(by_code)} codes")
+
+    def find(self, code):
+        """Product dict for a scanned barcode or product ID, or None"""
+        return self._by_code.get(code.strip())
+
+    def set_stock(self, product_id, quantity):
+        """Keep the cached stock in step with a stock change"""
+        product = self._products.get(product_id)
+        if product is not None:
+            product['stock'] = quantity
+
+
+class ScanDetector:
+    """Recognise keyboard-wedge scanner bursts from key timing"""
+
+    def __init__(self, max_interval_ms=SCAN_MAX_KEY_INTERVAL_MS, min_length=SCAN_MIN_LENGTH):
+        self.max_interval = max_interval_ms / 1000.0
+        self.min_length = min_length
+        self.burst_length = 0
+        self.last_key = 0.0
+
+    def key_pressed(self, now=None):
+        """Record a character key"""
+        now = time.monotonic() if now is None else now
+        if now - self.last_key <= self.max_interval:
+            self.burst_length += 1
+        else:
+            self.burst_length = 1
+        self.last_key = now
+
+    def in_burst(self, now=None):
+        """True while keys are still arriving at scanner speed"""
+        now = time.monotonic() if now is None else now
+        return self.burst_length > 1 and now - self.last_key <= self.max_interval
+
+    def is_scan(self, text, now=None):
+        """
+        True if text (ending with Enter now) was typed in a single burst.
+        Call when Enter is pressed.
+        """
+        now = time.monotonic() if now is None else now
+        text = text.strip()
+        return (
+            len(text) >= self.min_length
+            and self.burst_length >= len(text)
+            and now - self.last_key <= self.max_interval
+        )
+
+    def reset(self):
+        self.burst_length = 0
+        self.last_key = 0.0
+
+
+def benchmark_product_lookup(products=50000, scans=100000):
+    """Time building the scan map and resolving scans against it."""
+    import random
+
+    rows = [
+        {
+            'id': i,
+            'name': f"Product {i}",
+            'selling_price': 100.0 + i % 500,
+            'stock_quantity': i % 50,
+            'barcode': f"89{i:011d}",
+        }
+        for i in range(1, products + 1)
+    ]
+    codes = [random.choice(rows)['barcode'] for _ in range(scans)]
+
+    start = time.perf_counter()
+    lookup = ProductLookup(rows)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for code in codes:
+        lookup.find(code)
+    scan_us = (time.perf_counter() - start) / scans * 1e6
+
+    return {
+        "products": products,
+        "build_ms": build_ms,
+        "lookup_us_per_scan": scan_us,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+        for name, value in benchmark_product_lookup(count).items():
+            print(f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}")
+    else:
+        print("Usage: python src/product_lookup.py --benchmark [products]")
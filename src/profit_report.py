@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Profit and margin reporting for MAHER ZARAI MARKAZ.
+
+Each sale line records the product's purchase price at the time of sale,
+and create_sale adds revenue and cost of goods to per-day rollups by day,
+product and customer (categories come from the product rollup). Profit
+reports read those rollups with Database.get_profit_report, so a year is
+at most a few hundred rows per group instead of a join over every sale line.
+
+Run `python src/profit_report.py --benchmark` to compare the rollups with
+joining the sales history.
+"""
+
+import os
+import sys
+import time
+import datetime
+import logging
+
+# Set up logging
+logger = logging.getLogger('profit_report')
+
+# (label shown in the report, Database.get_profit_report grouping, quantity heading)
+PROFIT_GROUPINGS = [
+    ("Day", "day", "Sales"),
+    ("Product", "product", "Units Sold"),
+    ("Category", "category", "Units Sold"),
+    ("Customer", "customer", "Sales"),
+]
+
+
+def profit_totals(rows):
+    """Revenue, discount, cost, profit and margin (%) over report rows"""
+    revenue = sum(row['revenue'] for row in rows)
+    discount = sum(row['discount'] for row in rows)
+    cost = sum(row['cost'] for row in rows)
+    profit = revenue - discount - cost
+    return {
+        'revenue': round(revenue, 2),
+        'discount': round(discount, 2),
+        'cost': round(cost, 2),
+        'profit': round(profit, 2),
+        'margin': profit / revenue * 100 if revenue else 0.0,
+    }
+
+
+def benchmark_profit_report(products=2000, customers=500, sales=100000, lines_per_sale=3, rounds=10):
+    """Time a year's profit by product and by customer from the rollups and by joining sales."""
+    import random
+    import tempfile
+    from src.database import Database
+
+    with tempfile.TemporaryDirectory() as folder:
+        db = Database(os.path.join(folder, "bench.db"))
+        first_day = datetime.date.today() - datetime.timedelta(days=365)
+        with db as cursor:
+            cursor.executemany(
+                "INSERT INTO products (id, name, category, purchase_price, selling_price, stock_quantity, min_stock_level) VALUES (?, ?, ?, ?, ?, 100, 10)",
+                [(i, f"Product {i}", f"Category {i % 20}", 80.0, 100.0) for i in range(1, products + 1)],
+            )
+            cursor.executemany(
+                "INSERT INTO customers (id, name, balance) VALUES (?, ?, 0)",
+                [(i, f"Customer {i}") for i in range(2, customers + 2)],
+            )
+            cursor.executemany(
+                "INSERT INTO sales (id, customer_id, user_id, sale_date, subtotal, discount, tax, total) VALUES (?, ?, 1, ?, 300, 0, 0, 300)",
+                [
+                    (i, random.randint(1, customers + 1),
+                     (first_day + datetime.timedelta(days=i * 365 // sales)).strftime("%Y-%m-%d 12:00:00"))
+                    for i in range(1, sales + 1)
+                ],
+            )
+            cursor.executemany(
+                "INSERT INTO sale_items (sale_id, product_id, quantity, unit_price, total_price, unit_cost) VALUES (?, ?, 1, 100, 100, 80)",
+                [(i, random.randint(1, products)) for i in range(1, sales + 1) for _ in range(lines_per_sale)],
+            )
+            db._rebuild_sales_rollups(cursor)
+
+        start = first_day.strftime("%Y-%m-%d")
+        end = datetime.date.today().strftime("%Y-%m-%d")
+
+        def joined(group):
+            return db.execute_query(
+                f"""
+                SELECT {group} AS label, SUM(si.total_price) AS revenue,
+                       SUM(si.quantity * si.unit_cost) AS cost
+                FROM sale_items si
+                JOIN sales s ON si.sale_id = s.id
+                WHERE substr(s.sale_date, 1, 10) BETWEEN ? AND ?
+                GROUP BY {group}
+                """,
+                (start, end),
+                fetch="all",
+            )
+
+        def timed(func):
+            began = time.perf_counter()
+            for _ in range(rounds):
+                func()
+            return (time.perf_counter() - began) / rounds * 1000
+
+        results = {
+            "sale_lines": sales * lines_per_sale,
+            "join_by_product_ms": timed(lambda: joined("si.product_id")),
+            "rollup_by_product_ms": timed(lambda: db.get_profit_report(start, end, "product")),
+            "join_by_customer_ms": timed(lambda: joined("s.customer_id")),
+            "rollup_by_customer_ms": timed(lambda: db.get_profit_report(start, end, "customer")),
+        }
+        db.close()
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        for name, value in benchmark_profit_report().items():
+            print(f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}")
+    else:
+        print("Usage: python src/profit_report.py --benchmark")
@@ -7,7 +7,7 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
                              QSpinBox, QDialogButtonBox, QFrame)
 from PyQt5.QtCore import Qt, QEvent
 from PyQt5.QtGui import QFont
-from src.style import (get_default_font, get_header_font, MAIN_STYLESHEET)
+from src.style import (get_default_font, get_header_font)
 
 class QuantityDialog(QDialog):
     """
@@ -19,7 +19,6 @@ class QuantityDialog(QDialog):
         
         self.setWindowTitle("Enter Quantity")
         self.setMinimumWidth(450)
-        self.setStyleSheet(MAIN_STYLESHEET)
         self.setModal(True) # Ensure it blocks the main window
 
         self.product_name = product_name
@@ -5,30 +5,67 @@
 
 import os
 import datetime
-import qrcode
-from io import BytesIO
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.units import inch, cm
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, Table,
-                                TableStyle, Image, PageBreak)
-from reportlab.pdfgen import canvas
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
+from functools import lru_cache
 import logging
 
+# ReportLab is imported inside the functions that draw receipts, so it is only
+# loaded when the first receipt is printed rather than at application start
+
 # Set up logging
 logger = logging.getLogger('receipt')
 
+# Printed size of the receipt QR code (points; 1.2 inch)
+QR_CODE_SIZE = 1.2 * 72
+
+
+@lru_cache(maxsize=256)
+def get_qr_drawing(payload, size=QR_CODE_SIZE):
+    """Return a vector QR code drawing for a payload.
+
+    The code is drawn with ReportLab's own QR widget, so no PNG is rendered
+    and nothing goes through PIL. Drawings are cached by payload because a
+    reprint or a duplicate receipt asks for exactly the same code again.
+    """
+    from reportlab.graphics.shapes import Drawing
+    from reportlab.graphics.barcode.qr import QrCodeWidget
+
+    widget = QrCodeWidget(payload)
+    x1, y1, x2, y2 = widget.getBounds()
+    width, height = x2 - x1, y2 - y1
+
+    drawing = Drawing(size, size, transform=[size / width, 0, 0, size / height, 0, 0])
+    drawing.add(widget)
+    drawing.hAlign = 'CENTER'
+    return drawing
+
+
+def build_receipt_qr_payload(sale_id, sale_data, shop_name="MAHER ZARAI MARKAZ"):
+    """Build the text encoded in the receipt QR code"""
+    return (
+        f"{shop_name}|Receipt #{sale_id}|"
+        f"{sale_data.get('date', 'N/A')} {sale_data.get('time', 'N/A')}|"
+        f"Total: Rs. {sale_data.get('total', 0):.2f}"
+    )
+
+
 class ReceiptGenerator:
     """Generate and print receipts for sales"""
     
-    def __init__(self, db):
+    def __init__(self, db, settings=None):
         self.db = db
+        self.settings = settings
         
         # Create receipts directory if it doesn't exist
         os.makedirs('receipts', exist_ok=True)
     
+    def _shop_name(self):
+        """Shop name from the cached settings, falling back to the database"""
+        if self.settings is not None:
+            name = self.settings.get("shop_name")
+        else:
+            name = self.db.get_setting("shop_name")
+        return name or "MAHER ZARAI MARKAZ"
+    
     def generate_receipt(self, sale_id, sale_data, items, customer_data=None, save_pdf=True):
         """Generate a receipt for a sale"""
         try:
@@ -74,6 +111,14 @@ class ReceiptGenerator:
     def generate_pdf_receipt(self, sale_id, sale_data, items, customer_data=None):
         """Generate a PDF receipt for a sale"""
         try:
+            from reportlab.lib.pagesizes import A4
+            from reportlab.lib import colors
+            from reportlab.lib.units import inch
+            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+            from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, Table,
+                                            TableStyle, Image)
+            from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+
             # Ensure receipts directory exists
             os.makedirs('receipts', exist_ok=True)
             
@@ -98,7 +143,7 @@ class ReceiptGenerator:
             
             # Add custom styles
             styles.add(ParagraphStyle(
-                name='Title',
+                name='ReceiptTitle',
                 parent=styles['Heading1'],
                 alignment=TA_CENTER,
                 fontSize=16,
@@ -106,7 +151,7 @@ class ReceiptGenerator:
             ))
             
             styles.add(ParagraphStyle(
-                name='Subtitle',
+                name='ReceiptSubtitle',
                 parent=styles['Heading2'],
                 alignment=TA_CENTER,
                 fontSize=14,
@@ -136,8 +181,9 @@ class ReceiptGenerator:
                 story.append(Spacer(1, 12))
             
             # Add title
-            story.append(Paragraph("MAHER ZARAI MARKAZ", styles['Title']))
-            story.append(Paragraph("Agricultural Supply Shop", styles['Subtitle']))
+            shop_name = self._shop_name()
+            story.append(Paragraph(shop_name, styles['ReceiptTitle']))
+            story.append(Paragraph("Agricultural Supply Shop", styles['ReceiptSubtitle']))
             story.append(Spacer(1, 12))
             
             # Add receipt details
@@ -215,8 +261,12 @@ class ReceiptGenerator:
             
             story.append(Spacer(1, 24))
             
+            # Add QR code for receipt verification
+            story.append(get_qr_drawing(build_receipt_qr_payload(sale_id, sale_data, shop_name)))
+            story.append(Spacer(1, 12))
+            
             # Add footer
-            story.append(Paragraph("Thank you for shopping at MAHER ZARAI MARKAZ!", styles['Normal_CENTER']))
+            story.append(Paragraph(f"Thank you for shopping at {shop_name}!", styles['Normal_CENTER']))
             story.append(Paragraph("Please visit again.", styles['Normal_CENTER']))
             story.append(Spacer(1, 12))
             story.append(Paragraph(f"Generated on: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal_RIGHT']))
@@ -234,10 +284,11 @@ class ReceiptGenerator:
     def _format_receipt_content(self, sale_id, sale_data, items, customer_data=None):
         """Format receipt content as text"""
         lines = []
+        shop_name = self._shop_name()
         
         # Add header
         lines.append("=" * 50)
-        lines.append(f"{'MAHER ZARAI MARKAZ':^50}")
+        lines.append(f"{shop_name:^50}")
         lines.append(f"{'Agricultural Supply Shop':^50}")
         lines.append("=" * 50)
         lines.append("")
@@ -297,7 +348,7 @@ class ReceiptGenerator:
         lines.append("")
         
         # Add footer
-        lines.append(f"{'Thank you for shopping at MAHER ZARAI MARKAZ!':^50}")
+        lines.append(f"{'Thank you for shopping at ' + shop_name + '!':^50}")
         lines.append(f"{'Please visit again.':^50}")
         lines.append("")
         lines.append(f"Generated on: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Reorder suggestions for MAHER ZARAI MARKAZ.
+
+Per-product daily sales over a rolling window are laid out as a
+products x days matrix, and velocity, days of cover and reorder quantities
+are computed for every product at once with NumPy:
+
+- velocity is the larger of the average daily sales over the whole window
+  and over its last week, so a product that has started selling faster is
+  not under-ordered;
+- a product is due for reorder when its stock would fall to its minimum
+  level within the supplier lead time;
+- the suggested quantity brings stock up to lead time + target cover days
+  of sales above the minimum level.
+
+Suggestions are grouped by supplier and can be exported as purchase-order
+drafts. Run `python src/reorder.py --benchmark` to time the computation.
+"""
+
+import sys
+import time
+import logging
+
+# Set up logging
+logger = logging.getLogger('reorder')
+
+REORDER_WINDOW_DAYS = 30
+RECENT_DAYS = 7
+DEFAULT_LEAD_TIME_DAYS = 7
+DEFAULT_TARGET_DAYS = 14
+NO_SUPPLIER = "No Supplier"
+
+PURCHASE_ORDER_COLUMNS = [
+    "supplier", "product_id", "product", "category", "stock", "min_stock",
+    "daily_sales", "days_of_cover", "order_quantity", "unit_cost", "line_cost",
+]
+
+
+def compute_reorder_suggestions(products, sales, window_days=REORDER_WINDOW_DAYS,
+                                lead_time_days=DEFAULT_LEAD_TIME_DAYS,
+                                target_days=DEFAULT_TARGET_DAYS):
+    """
+    Compute velocity, days of cover and order quantities for every product.
+
+    products are rows with id, name, category, supplier_id, supplier_name,
+    stock_quantity, min_stock_level and purchase_price; sales are
+    (product_id, days_ago, quantity) rows with days_ago in [0, window_days)
+    (see Database.get_reorder_data). Returns one dict per product that
+    needs reordering, grouped by supplier and most urgent first.
+    """
+    import numpy as np
+
+    if not products:
+        return []
+
+    ids = np.array([p['id'] for p in products], dtype=np.int64)
+    stock = np.array([p['stock_quantity'] or 0 for p in products], dtype=np.float64)
+    min_stock = np.array([p['min_stock_level'] or 0 for p in products], dtype=np.float64)
+
+    # products x days matrix of units sold; column 0 is the oldest day
+    daily = np.zeros((len(products), window_days))
+    if sales:
+        sold = np.asarray(sales, dtype=np.float64)
+        order = np.argsort(ids)
+        pos = np.searchsorted(ids, sold[:, 0].astype(np.int64), sorter=order)
+        rows = order[np.clip(pos, 0, len(ids) - 1)]
+        days_ago = sold[:, 1].astype(np.int64)
+        known = (ids[rows] == sold[:, 0]) & (days_ago >= 0) & (days_ago < window_days)
+        cells = rows[known] * window_days + (window_days - 1 - days_ago[known])
+        daily = np.bincount(
+            cells, weights=sold[known, 2], minlength=daily.size
+        ).reshape(daily.shape)
+
+    recent = min(RECENT_DAYS, window_days)
+    velocity = np.maximum(daily.mean(axis=1), daily[:, -recent:].mean(axis=1))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cover = np.where(velocity > 0, stock / velocity, np.inf)
+
+    reorder_point = min_stock + velocity * lead_time_days
+    target_stock = min_stock + velocity * (lead_time_days + target_days)
+    due = stock <= reorder_point
+    quantity = np.where(due, np.ceil(np.maximum(target_stock - stock, 0)), 0)
+    # Products at their minimum with no recent sales still get topped up
+    quantity = np.where(due & (quantity == 0) & (stock <= min_stock), min_stock - stock + 1, quantity)
+
+    suggestions = []
+    for i in np.flatnonzero(quantity > 0):
+        product = products[i]
+        unit_cost = product.get('purchase_price') or 0.0
+        suggestions.append({
+            'supplier_id': product.get('supplier_id'),
+            'supplier': product.get('supplier_name') or NO_SUPPLIER,
+            'product_id': int(ids[i]),
+            'product': product['name'],
+            'category': product.get('category'),
+            'stock': int(stock[i]),
+            'min_stock': int(min_stock[i]),
+            'daily_sales': round(float(velocity[i]), 2),
+            'days_of_cover': None if np.isinf(cover[i]) else round(float(cover[i]), 1),
+            'order_quantity': int(quantity[i]),
+            'unit_cost': unit_cost,
+            'line_cost': round(unit_cost * int(quantity[i]), 2),
+        })
+
+    suggestions.sort(key=lambda s: (
+        s['supplier'],
+        s['days_of_cover'] if s['days_of_cover'] is not None else float('inf'),
+    ))
+    return suggestions
+
+
+def group_by_supplier(suggestions):
+    """{supplier name: [suggestions]} in supplier order"""
+    groups = {}
+    for suggestion in suggestions:
+        groups.setdefault(suggestion['supplier'], []).append(suggestion)
+    return groups
+
+
+def export_purchase_orders(suggestions, path):
+    """
+    Write purchase-order drafts: one sheet per supplier for .xlsx, or one
+    CSV with a supplier column. Returns the number of lines written.
+    """
+    groups = group_by_supplier(suggestions)
+    header = [column.replace('_', ' ').title() for column in PURCHASE_ORDER_COLUMNS]
+
+    if path.lower().endswith('.csv'):
+        from src.report_exporter import open_sink
+
+        sink = open_sink(path, PURCHASE_ORDER_COLUMNS)
+        try:
+            sink.write_rows([s[c] for c in PURCHASE_ORDER_COLUMNS] for s in suggestions)
+        finally:
+            sink.close()
+        return len(suggestions)
+
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for supplier, lines in groups.items():
+        # Sheet titles are limited to 31 characters and some punctuation
+        title = "".join(c for c in supplier if c not in '[]:*?/\\')[:31] or NO_SUPPLIER
+        sheet = workbook.create_sheet(title=title)
+        sheet.append([f"Purchase order draft: {supplier}"])
+        sheet.append(header)
+        for line in lines:
+            sheet.append([line[c] for c in PURCHASE_ORDER_COLUMNS])
+        sheet.append([""] * (len(header) - 1) + [round(sum(l['line_cost'] for l in lines), 2)])
+    workbook.save(path)
+    return len(suggestions)
+
+
+def benchmark_reorder(products=5000, window_days=REORDER_WINDOW_DAYS, sales_per_day=400):
+    """Time the suggestion computation on synthetic data."""
+    import random
+
+    rows = [
+        {
+            'id': i,
+            'name': f"Product {i}",
+            'category': "Bench",
+            'supplier_id': i % 20,
+            'supplier_name': f"Supplier {i % 20}",
+            'stock_quantity': random.randint(0, 200),
+            'min_stock_level': 10,
+            'purchase_price': 100.0,
+        }
+        for i in range(1, products + 1)
+    ]
+    sales = [
+        (random.randint(1, products), day, random.randint(1, 5))
+        for day in range(window_days)
+        for _ in range(sales_per_day)
+    ]
+
+    compute_reorder_suggestions(rows[:10], sales[:10], window_days)  # import numpy
+    start = time.perf_counter()
+    suggestions = compute_reorder_suggestions(rows, sales, window_days)
+    elapsed = (time.perf_counter() - start) * 1000
+    return {
+        "products": products,
+        "sales_rows": len(sales),
+        "suggestions": len(suggestions),
+        "compute_ms": elapsed,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+        for name, value in benchmark_reorder(count).items():
+            print(f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}")
+    else:
+        print("Usage: python src/reorder.py --benchmark [products]")
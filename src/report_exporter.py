@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Streaming report export for MAHER ZARAI MARKAZ.
+
+Rows are pulled from SQLite in fixed-size batches and written straight into a
+write-only Excel workbook or a CSV file, so memory use stays flat no matter how
+many sales are exported. Exports run on a QThread and can be cancelled.
+"""
+
+import os
+import csv
+import logging
+import threading
+from PyQt5.QtCore import QObject, pyqtSignal
+
+# Set up logging
+logger = logging.getLogger('report_export')
+
+# Rows fetched from SQLite per batch
+EXPORT_BATCH_SIZE = 500
+
+
+def sales_lines_query(start_date, end_date):
+    """Query for every sale line between two datetimes (end exclusive)"""
+    query = """
+        SELECT
+            s.id AS invoice,
+            s.sale_date AS sale_date,
+            c.name AS customer,
+            u.username AS cashier,
+            s.payment_method AS payment_method,
+            p.name AS product,
+            p.category AS category,
+            si.quantity AS quantity,
+            si.unit_price AS unit_price,
+            si.total_price AS line_total,
+            s.total AS sale_total,
+            s.amount_paid AS amount_paid,
+            s.udhaar_amount AS udhaar_amount
+        FROM sales s
+        JOIN sale_items si ON si.sale_id = s.id
+        LEFT JOIN products p ON si.product_id = p.id
+        LEFT JOIN customers c ON s.customer_id = c.id
+        LEFT JOIN users u ON s.user_id = u.id
+        WHERE s.sale_date >= ? AND s.sale_date < ?
+        ORDER BY s.sale_date, s.id, si.id
+    """
+    return query, (start_date, end_date)
+
+
+def top_products_query(start_date=None, end_date=None, limit=0):
+    """Query for products ranked by quantity sold in a period"""
+    query = """
+        SELECT
+            p.id AS product_id,
+            p.name AS product,
+            p.category AS category,
+            COUNT(DISTINCT s.id) AS num_sales,
+            SUM(si.quantity) AS quantity_sold,
+            SUM(si.total_price) AS total_sales
+        FROM sale_items si
+        JOIN sales s ON si.sale_id = s.id
+        JOIN products p ON si.product_id = p.id
+        WHERE 1=1
+    """
+    params = []
+    if start_date:
+        query += " AND s.sale_date >= ?"
+        params.append(start_date)
+    if end_date:
+        query += " AND s.sale_date <= ?"
+        params.append(end_date)
+    query += " GROUP BY p.id ORDER BY quantity_sold DESC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    return query, tuple(params)
+
+
+def _header_labels(columns):
+    """Turn column aliases into spreadsheet headers"""
+    return [column.replace('_', ' ').title() for column in columns]
+
+
+class _CsvSink:
+    """Row sink writing a CSV file that opens cleanly in Excel"""
+
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(_header_labels(columns))
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class _XlsxSink:
+    """Row sink writing an openpyxl write-only workbook"""
+
+    def __init__(self, path, columns, sheet_title):
+        from openpyxl import Workbook
+
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(title=sheet_title[:31])
+        self.sheet.append(_header_labels(columns))
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.sheet.append(list(row))
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+def open_sink(path, columns, sheet_title="Report"):
+    """
+    Create a row sink for the output path based on its extension. The header
+    row is written straight away, so an empty report still names its columns.
+    """
+    if path.lower().endswith('.csv'):
+        return _CsvSink(path, columns)
+    return _XlsxSink(path, columns, sheet_title)
+
+
+class ReportExportWorker(QObject):
+    """Stream a query result into a file on a worker thread"""
+
+    # Define signals
+    progress = pyqtSignal(int, int)  # rows written, total rows
+    finished = pyqtSignal(str, int)  # output path, rows written
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, db, query, params, output_path, sheet_title="Report",
+                 batch_size=EXPORT_BATCH_SIZE):
+        super().__init__()
+        self.db = db
+        self.query = query
+        self.params = params
+        self.output_path = output_path
+        self.sheet_title = sheet_title
+        self.batch_size = batch_size
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """
+        Request cancellation; the export stops after the current batch.
+        Thread-safe: connect with Qt.DirectConnection, since the worker's
+        own thread is busy in run() and would only see a queued call after.
+        """
+        self._cancel_event.set()
+
+    def run(self):
+        """Run the export (connected to QThread.started)"""
+        sink = None
+        written = 0
+        try:
+            total = self.db.count_query_rows(self.query, self.params)
+            self.progress.emit(0, total)
+
+            columns = self.db.query_columns(self.query, self.params)
+            sink = open_sink(self.output_path, columns, self.sheet_title)
+            for _, rows in self.db.stream_query(self.query, self.params, self.batch_size):
+                if self._cancel_event.is_set():
+                    break
+                sink.write_rows(rows)
+                written += len(rows)
+                self.progress.emit(written, total)
+
+            if self._cancel_event.is_set():
+                sink.close()
+                sink = None
+                self._remove_partial_file()
+                logger.info(f"Export cancelled after {written} rows: {self.output_path}")
+                self.cancelled.emit()
+                return
+
+            sink.close()
+            sink = None
+            logger.info(f"Exported {written} rows to {self.output_path}")
+            self.finished.emit(self.output_path, written)
+        except Exception as e:
+            logger.error(f"Report export failed: {e}")
+            if sink is not None:
+                try:
+                    sink.close()
+                except Exception:
+                    pass
+            self._remove_partial_file()
+            self.failed.emit(str(e))
+
+    def _remove_partial_file(self):
+        """Delete an incomplete export file"""
+        try:
+            if os.path.exists(self.output_path):
+                os.remove(self.output_path)
+        except OSError as e:
+            logger.error(f"Could not remove partial export {self.output_path}: {e}")
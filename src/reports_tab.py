@@ -8,10 +8,19 @@ import calendar
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QPushButton, QTabWidget, QDateEdit, QComboBox,
                              QTableWidget, QTableWidgetItem, QHeaderView,
-                             QGroupBox, QFormLayout, QFrame, QFileDialog)
-from PyQt5.QtCore import Qt, QDate
+                             QGroupBox, QFormLayout, QFrame, QFileDialog,
+                             QProgressDialog, QMessageBox, QSpinBox)
+from PyQt5.QtCore import Qt, QDate, QThread
 from PyQt5.QtGui import QFont, QColor
 
+from src.report_exporter import (ReportExportWorker, sales_lines_query,
+                                 top_products_query)
+from src.reorder import (compute_reorder_suggestions, export_purchase_orders,
+                         group_by_supplier, DEFAULT_LEAD_TIME_DAYS,
+                         REORDER_WINDOW_DAYS)
+from src.stock_history import last_month_end, summarize_valuation
+from src.profit_report import PROFIT_GROUPINGS, profit_totals
+
 # Set up logging
 logger = logging.getLogger('reports')
 
@@ -23,6 +32,14 @@ class ReportsTab(QWidget):
         self.db = db
         self.user_data = user_data
         
+        # Reorder suggestions currently shown
+        self.reorder_suggestions = []
+        
+        # Background export state
+        self.export_thread = None
+        self.export_worker = None
+        self.export_progress = None
+        
         # Set up UI
         self.setup_ui()
     
@@ -50,6 +67,21 @@ class ReportsTab(QWidget):
         top_products_tab = QWidget()
         self.tab_widget.addTab(top_products_tab, "Top Products")
         self.setup_top_products_tab(top_products_tab)
+        
+        # Reorder Suggestions tab
+        reorder_tab = QWidget()
+        self.tab_widget.addTab(reorder_tab, "Reorder Suggestions")
+        self.setup_reorder_tab(reorder_tab)
+        
+        # Stock Valuation tab
+        valuation_tab = QWidget()
+        self.tab_widget.addTab(valuation_tab, "Stock Valuation")
+        self.setup_valuation_tab(valuation_tab)
+        
+        # Profit tab
+        profit_tab = QWidget()
+        self.tab_widget.addTab(profit_tab, "Profit")
+        self.setup_profit_tab(profit_tab)
     
     def setup_daily_sales_tab(self, tab):
         """Set up the daily sales report tab"""
@@ -237,6 +269,160 @@ class ReportsTab(QWidget):
         # Load initial data
         self.load_top_products()
     
+    def setup_reorder_tab(self, tab):
+        """Set up the reorder suggestions report tab"""
+        # Layout
+        layout = QVBoxLayout()
+        tab.setLayout(layout)
+        
+        # Options
+        options_layout = QHBoxLayout()
+        
+        window_label = QLabel("Sales Window:")
+        self.reorder_window_combo = QComboBox()
+        for days in (14, 30, 60, 90):
+            self.reorder_window_combo.addItem(f"Last {days} Days", days)
+        self.reorder_window_combo.setCurrentIndex(
+            self.reorder_window_combo.findData(REORDER_WINDOW_DAYS))
+        
+        lead_time_label = QLabel("Lead Time (days):")
+        self.lead_time_spin = QSpinBox()
+        self.lead_time_spin.setRange(1, 90)
+        self.lead_time_spin.setValue(DEFAULT_LEAD_TIME_DAYS)
+        
+        supplier_label = QLabel("Supplier:")
+        self.reorder_supplier_combo = QComboBox()
+        self.reorder_supplier_combo.addItem("All Suppliers", None)
+        self.reorder_supplier_combo.currentIndexChanged.connect(self.show_reorder_suggestions)
+        
+        view_button = QPushButton("View Report")
+        view_button.clicked.connect(self.load_reorder_suggestions)
+        
+        export_button = QPushButton("Export PO Draft")
+        export_button.clicked.connect(self.export_purchase_order)
+        
+        options_layout.addWidget(window_label)
+        options_layout.addWidget(self.reorder_window_combo)
+        options_layout.addWidget(lead_time_label)
+        options_layout.addWidget(self.lead_time_spin)
+        options_layout.addWidget(supplier_label)
+        options_layout.addWidget(self.reorder_supplier_combo)
+        options_layout.addWidget(view_button)
+        options_layout.addWidget(export_button)
+        options_layout.addStretch()
+        
+        layout.addLayout(options_layout)
+        
+        # Suggestions table
+        self.reorder_table = QTableWidget()
+        self.reorder_table.setColumnCount(8)
+        self.reorder_table.setHorizontalHeaderLabels([
+            "Supplier", "Product Name", "Stock", "Min Stock", "Daily Sales",
+            "Days of Cover", "Order Qty", "Est. Cost"
+        ])
+        self.reorder_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.reorder_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.reorder_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        
+        layout.addWidget(self.reorder_table, 1)
+        
+        # Summary
+        self.reorder_summary_label = QLabel()
+        layout.addWidget(self.reorder_summary_label)
+    
+    def setup_valuation_tab(self, tab):
+        """Set up the point-in-time stock valuation report tab"""
+        # Layout
+        layout = QVBoxLayout()
+        tab.setLayout(layout)
+        
+        # Date selection
+        date_layout = QHBoxLayout()
+        
+        date_label = QLabel("Stock at end of:")
+        self.valuation_date_edit = QDateEdit()
+        self.valuation_date_edit.setCalendarPopup(True)
+        self.valuation_date_edit.setMaximumDate(QDate.currentDate())
+        month_end = last_month_end()
+        self.valuation_date_edit.setDate(QDate(month_end.year, month_end.month, month_end.day))
+        
+        view_button = QPushButton("View Report")
+        view_button.clicked.connect(self.load_stock_valuation)
+        
+        date_layout.addWidget(date_label)
+        date_layout.addWidget(self.valuation_date_edit)
+        date_layout.addWidget(view_button)
+        date_layout.addStretch()
+        
+        layout.addLayout(date_layout)
+        
+        # Valuation by category
+        self.valuation_table = QTableWidget()
+        self.valuation_table.setColumnCount(4)
+        self.valuation_table.setHorizontalHeaderLabels([
+            "Category", "Products in Stock", "Quantity", "Value (at cost)"
+        ])
+        self.valuation_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.valuation_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.valuation_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        
+        layout.addWidget(self.valuation_table, 1)
+        
+        # Totals
+        self.valuation_total_label = QLabel()
+        layout.addWidget(self.valuation_total_label)
+    
+    def setup_profit_tab(self, tab):
+        """Set up the gross profit and margin report tab"""
+        # Layout
+        layout = QVBoxLayout()
+        tab.setLayout(layout)
+        
+        # Date range and grouping
+        options_layout = QHBoxLayout()
+        
+        from_label = QLabel("From:")
+        self.profit_from_edit = QDateEdit()
+        self.profit_from_edit.setCalendarPopup(True)
+        self.profit_from_edit.setDate(QDate(QDate.currentDate().year(), 1, 1))
+        
+        to_label = QLabel("To:")
+        self.profit_to_edit = QDateEdit()
+        self.profit_to_edit.setCalendarPopup(True)
+        self.profit_to_edit.setDate(QDate.currentDate())
+        
+        group_label = QLabel("By:")
+        self.profit_group_combo = QComboBox()
+        for label, group_by, quantity_label in PROFIT_GROUPINGS:
+            self.profit_group_combo.addItem(label, (group_by, quantity_label))
+        
+        view_button = QPushButton("View Report")
+        view_button.clicked.connect(self.load_profit_report)
+        
+        options_layout.addWidget(from_label)
+        options_layout.addWidget(self.profit_from_edit)
+        options_layout.addWidget(to_label)
+        options_layout.addWidget(self.profit_to_edit)
+        options_layout.addWidget(group_label)
+        options_layout.addWidget(self.profit_group_combo)
+        options_layout.addWidget(view_button)
+        options_layout.addStretch()
+        
+        layout.addLayout(options_layout)
+        
+        # Profit table
+        self.profit_table = QTableWidget()
+        self.profit_table.setColumnCount(7)
+        self.profit_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.profit_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.profit_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        
+        layout.addWidget(self.profit_table, 1)
+        
+        # Totals
+        self.profit_total_label = QLabel()
+        layout.addWidget(self.profit_total_label)
+    
     def load_daily_sales(self):
         """Load sales data for the selected date"""
         # Get selected date
@@ -418,17 +604,273 @@ class ReportsTab(QWidget):
             # Total sales
             self.top_products_table.setItem(row, 4, QTableWidgetItem(f"{product['total_sales']:.2f}"))
     
+    def load_reorder_suggestions(self):
+        """Compute reorder suggestions for the selected window and lead time"""
+        window_days = self.reorder_window_combo.currentData()
+        products, sales = self.db.get_reorder_data(window_days)
+        self.reorder_suggestions = compute_reorder_suggestions(
+            products, sales, window_days, self.lead_time_spin.value())
+        
+        # Offer the suppliers that have something to order
+        selected = self.reorder_supplier_combo.currentData()
+        self.reorder_supplier_combo.blockSignals(True)
+        self.reorder_supplier_combo.clear()
+        self.reorder_supplier_combo.addItem("All Suppliers", None)
+        for supplier in group_by_supplier(self.reorder_suggestions):
+            self.reorder_supplier_combo.addItem(supplier, supplier)
+        index = self.reorder_supplier_combo.findData(selected)
+        self.reorder_supplier_combo.setCurrentIndex(max(index, 0))
+        self.reorder_supplier_combo.blockSignals(False)
+        
+        self.show_reorder_suggestions()
+    
+    def selected_reorder_suggestions(self):
+        """Suggestions for the selected supplier (all when none is selected)"""
+        supplier = self.reorder_supplier_combo.currentData()
+        if supplier is None:
+            return self.reorder_suggestions
+        return [s for s in self.reorder_suggestions if s['supplier'] == supplier]
+    
+    def show_reorder_suggestions(self):
+        """Fill the reorder table from the computed suggestions"""
+        suggestions = self.selected_reorder_suggestions()
+        
+        self.reorder_table.setUpdatesEnabled(False)
+        self.reorder_table.setRowCount(len(suggestions))
+        for row, suggestion in enumerate(suggestions):
+            cover = suggestion['days_of_cover']
+            values = [
+                suggestion['supplier'],
+                suggestion['product'],
+                str(suggestion['stock']),
+                str(suggestion['min_stock']),
+                f"{suggestion['daily_sales']:.2f}",
+                "No sales" if cover is None else f"{cover:.1f}",
+                str(suggestion['order_quantity']),
+                f"{suggestion['line_cost']:.2f}",
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column >= 2:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.reorder_table.setItem(row, column, item)
+            
+            # Highlight products that will run out within the lead time
+            if cover is not None and cover <= self.lead_time_spin.value():
+                self.reorder_table.item(row, 5).setForeground(QColor("red"))
+        self.reorder_table.setUpdatesEnabled(True)
+        
+        total_cost = sum(s['line_cost'] for s in suggestions)
+        self.reorder_summary_label.setText(
+            f"{len(suggestions)} products to reorder, estimated cost Rs. {total_cost:,.2f}")
+    
+    def load_stock_valuation(self):
+        """Value the stock on hand at the end of the selected day"""
+        day = self.valuation_date_edit.date().toString("yyyy-MM-dd")
+        categories, totals = summarize_valuation(self.db.get_stock_on(day) or [])
+        
+        self.valuation_table.setRowCount(len(categories))
+        for row, category in enumerate(categories):
+            self.valuation_table.setItem(row, 0, QTableWidgetItem(category['category']))
+            self.valuation_table.setItem(row, 1, QTableWidgetItem(str(category['products'])))
+            self.valuation_table.setItem(row, 2, QTableWidgetItem(str(category['quantity'])))
+            self.valuation_table.setItem(row, 3, QTableWidgetItem(f"{category['value']:,.2f}"))
+        
+        self.valuation_total_label.setText(
+            f"Stock on {day}: {totals['products']} products, {totals['quantity']} units, "
+            f"valued at Rs. {totals['value']:,.2f}")
+    
+    def load_profit_report(self):
+        """Load gross profit and margin for the selected range and grouping"""
+        start_date = self.profit_from_edit.date().toString("yyyy-MM-dd")
+        end_date = self.profit_to_edit.date().toString("yyyy-MM-dd")
+        group_by, quantity_label = self.profit_group_combo.currentData()
+        
+        rows = self.db.get_profit_report(start_date, end_date, group_by)
+        
+        self.profit_table.setHorizontalHeaderLabels([
+            self.profit_group_combo.currentText(), quantity_label, "Revenue",
+            "Discount", "Cost of Goods", "Gross Profit", "Margin %"
+        ])
+        self.profit_table.setUpdatesEnabled(False)
+        self.profit_table.setRowCount(len(rows))
+        for row, data in enumerate(rows):
+            values = [
+                str(data['label']),
+                str(data['quantity']),
+                f"{data['revenue']:,.2f}",
+                f"{data['discount']:,.2f}",
+                f"{data['cost']:,.2f}",
+                f"{data['profit']:,.2f}",
+                f"{data['margin']:.1f}",
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column >= 1:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.profit_table.setItem(row, column, item)
+            
+            # Highlight lines sold at a loss
+            if data['profit'] < 0:
+                self.profit_table.item(row, 5).setForeground(QColor("red"))
+        self.profit_table.setUpdatesEnabled(True)
+        
+        totals = profit_totals(rows)
+        self.profit_total_label.setText(
+            f"Revenue Rs. {totals['revenue']:,.2f}  |  Cost Rs. {totals['cost']:,.2f}  |  "
+            f"Gross Profit Rs. {totals['profit']:,.2f}  |  Margin {totals['margin']:.1f}%")
+    
     def export_daily_sales(self):
         """Export daily sales report to Excel"""
-        # Implement Excel export functionality
-        pass
+        selected_date = self.daily_date_edit.date()
+        start_date = selected_date.toString("yyyy-MM-dd")
+        end_date = selected_date.addDays(1).toString("yyyy-MM-dd")
+        
+        query, params = sales_lines_query(start_date, end_date)
+        self.start_export(query, params, f"daily_sales_{start_date}", "Daily Sales")
     
     def export_monthly_sales(self):
         """Export monthly sales report to Excel"""
-        # Implement Excel export functionality
-        pass
+        month = self.month_combo.currentData()
+        year = self.year_combo.currentData()
+        
+        start_date = f"{year}-{month:02d}-01"
+        if month == 12:
+            end_date = f"{year+1}-01-01"
+        else:
+            end_date = f"{year}-{month+1:02d}-01"
+        
+        query, params = sales_lines_query(start_date, end_date)
+        self.start_export(query, params, f"monthly_sales_{year}_{month:02d}", "Monthly Sales")
     
     def export_top_products(self):
         """Export top products report to Excel"""
-        # Implement Excel export functionality
-        pass 
\ No newline at end of file
+        days = self.period_combo.currentData()
+        limit = self.limit_combo.currentData()
+        
+        end_date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        start_date = None
+        if days > 0:
+            start_date = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+        
+        query, params = top_products_query(start_date, end_date, limit)
+        self.start_export(query, params, "top_products", "Top Products")
+    
+    def export_purchase_order(self):
+        """Export purchase-order drafts for the shown suggestions, one sheet per supplier"""
+        suggestions = self.selected_reorder_suggestions()
+        if not suggestions:
+            QMessageBox.information(self, "Nothing to Export",
+                                    "View the reorder report first; there are no products to reorder.")
+            return
+        
+        default_name = f"purchase_orders_{datetime.date.today().strftime('%Y-%m-%d')}"
+        default_path = os.path.join(os.getcwd(), f"{default_name}.xlsx")
+        output_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Export Purchase Order Draft",
+            default_path,
+            "Excel Files (*.xlsx);;CSV Files (*.csv)"
+        )
+        
+        if not output_path:
+            return
+        
+        if not output_path.lower().endswith(('.xlsx', '.csv')):
+            output_path += '.xlsx'
+        
+        try:
+            written = export_purchase_orders(suggestions, output_path)
+        except Exception as e:
+            logger.error(f"Error exporting purchase orders: {e}")
+            QMessageBox.critical(self, "Export Failed", f"Failed to export purchase orders: {e}")
+            return
+        
+        QMessageBox.information(
+            self,
+            "Export Complete",
+            f"Exported {written} order lines to:\n{output_path}"
+        )
+    
+    def start_export(self, query, params, default_name, sheet_title):
+        """Ask for a destination and stream the query into it on a worker thread"""
+        if self.export_thread is not None:
+            QMessageBox.information(self, "Export Running", "Please wait for the current export to finish.")
+            return
+        
+        default_path = os.path.join(os.getcwd(), f"{default_name}.xlsx")
+        output_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Export Report",
+            default_path,
+            "Excel Files (*.xlsx);;CSV Files (*.csv)"
+        )
+        
+        if not output_path:
+            return
+        
+        if not output_path.lower().endswith(('.xlsx', '.csv')):
+            output_path += '.xlsx'
+        
+        # Progress dialog with cancel
+        self.export_progress = QProgressDialog("Exporting report...", "Cancel", 0, 0, self)
+        self.export_progress.setWindowTitle("Export")
+        self.export_progress.setWindowModality(Qt.WindowModal)
+        self.export_progress.setMinimumDuration(0)
+        
+        # Worker thread
+        self.export_thread = QThread()
+        self.export_worker = ReportExportWorker(self.db, query, params, output_path, sheet_title)
+        self.export_worker.moveToThread(self.export_thread)
+        
+        self.export_thread.started.connect(self.export_worker.run)
+        self.export_worker.progress.connect(self.on_export_progress)
+        self.export_worker.finished.connect(self.on_export_finished)
+        self.export_worker.failed.connect(self.on_export_failed)
+        self.export_worker.cancelled.connect(self.on_export_cancelled)
+        # The worker's thread is busy in run(), so cancel() must be called
+        # directly from this thread rather than queued to the worker
+        self.export_progress.canceled.connect(self.export_worker.cancel, Qt.DirectConnection)
+        
+        self.export_thread.start()
+        self.export_progress.show()
+    
+    def on_export_progress(self, written, total):
+        """Update the export progress dialog"""
+        if self.export_progress is None:
+            return
+        self.export_progress.setMaximum(max(total, 1))
+        self.export_progress.setValue(min(written, max(total, 1)))
+        self.export_progress.setLabelText(f"Exported {written} of {total} rows...")
+    
+    def on_export_finished(self, output_path, written):
+        """Handle a completed export"""
+        self.cleanup_export()
+        QMessageBox.information(
+            self,
+            "Export Complete",
+            f"Exported {written} rows to:\n{output_path}"
+        )
+    
+    def on_export_failed(self, message):
+        """Handle a failed export"""
+        self.cleanup_export()
+        QMessageBox.critical(self, "Export Failed", f"Failed to export report: {message}")
+    
+    def on_export_cancelled(self):
+        """Handle a cancelled export"""
+        self.cleanup_export()
+    
+    def cleanup_export(self):
+        """Stop the export thread and close the progress dialog"""
+        if self.export_progress is not None:
+            self.export_progress.canceled.disconnect()
+            self.export_progress.close()
+            self.export_progress = None
+        
+        if self.export_thread is not None:
+            self.export_thread.quit()
+            self.export_thread.wait()
+            self.export_thread = None
+        
+        self.export_worker = None
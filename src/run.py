@@ -9,12 +9,18 @@ Main entry point for the application
 import os
 import sys
 import logging
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import Qt
 
 # Add src directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Startup timing (no-op unless --profile-startup is given)
+from src.startup_profiler import profiler
+
+profiler.start_phase("import:qt")
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import Qt
+profiler.end_phase("import:qt")
+
 
 def setup_logging():
     """Set up logging configuration"""
@@ -41,12 +47,14 @@ if __name__ == "__main__":
             os.makedirs(directory, exist_ok=True)
 
         # Create QApplication instance
-        app = QApplication(sys.argv)
-        app.setAttribute(Qt.AA_EnableHighDpiScaling)
-        app.setAttribute(Qt.AA_UseHighDpiPixmaps)
+        with profiler.phase("qt_app"):
+            app = QApplication(sys.argv)
+            app.setAttribute(Qt.AA_EnableHighDpiScaling)
+            app.setAttribute(Qt.AA_UseHighDpiPixmaps)
 
         # Import main after QApplication creation
-        from src.main import main
+        with profiler.phase("import:main"):
+            from src.main import main
 
         # Run the application
         logger.info("Initializing main application...")
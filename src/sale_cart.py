@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Sale cart model for MAHER ZARAI MARKAZ.
+
+Holds the line items of the sale being rung up and keeps the subtotal as a
+running total. Every change is reported as a row-level signal, so the
+billing table inserts, updates or removes a single row instead of being
+rebuilt, and totals are not re-summed over the whole cart.
+"""
+
+import logging
+from PyQt5.QtCore import QObject, pyqtSignal
+
+# Set up logging
+logger = logging.getLogger('sale_cart')
+
+
+class SaleCart(QObject):
+    """Line items of the current sale with a running subtotal"""
+
+    # Define signals
+    row_inserted = pyqtSignal(int)  # row
+    row_updated = pyqtSignal(int)  # row
+    row_removed = pyqtSignal(int)  # row
+    cleared = pyqtSignal()
+    subtotal_changed = pyqtSignal(float)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.items = []
+        self.subtotal = 0.0
+        self._rows = {}  # product_id -> row
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, row):
+        return self.items[row]
+
+    def row_of(self, product_id):
+        """Row of a product in the cart, or None"""
+        return self._rows.get(product_id)
+
+    def quantity_of(self, product_id):
+        """Quantity of a product already in the cart"""
+        row = self._rows.get(product_id)
+        return 0 if row is None else self.items[row]['quantity']
+
+    def add(self, product_id, name, price, quantity):
+        """
+        Add a quantity of a product, merging into its existing line.
+        Returns the row of the line.
+        """
+        row = self._rows.get(product_id)
+        if row is not None:
+            return self.set_quantity(row, self.items[row]['quantity'] + quantity)
+
+        item = {
+            'product_id': product_id,
+            'name': name,
+            'price': price,
+            'quantity': quantity,
+            'total': round(price * quantity, 2)
+        }
+        row = len(self.items)
+        self.items.append(item)
+        self._rows[product_id] = row
+        self.row_inserted.emit(row)
+        self._adjust_subtotal(item['total'])
+        return row
+
+    def set_quantity(self, row, quantity):
+        """Change the quantity of a line. Returns the row."""
+        item = self.items[row]
+        old_total = item['total']
+        item['quantity'] = quantity
+        item['total'] = round(item['price'] * quantity, 2)
+        self.row_updated.emit(row)
+        self._adjust_subtotal(item['total'] - old_total)
+        return row
+
+    def remove(self, row):
+        """Remove a line. Returns the removed item, or None for a bad row."""
+        if not 0 <= row < len(self.items):
+            return None
+
+        item = self.items.pop(row)
+        del self._rows[item['product_id']]
+        for later in self.items[row:]:
+            self._rows[later['product_id']] -= 1
+        self.row_removed.emit(row)
+        self._adjust_subtotal(-item['total'])
+        return item
+
+    def clear(self):
+        """Empty the cart"""
+        self.items = []
+        self._rows = {}
+        self.subtotal = 0.0
+        self.cleared.emit()
+        self.subtotal_changed.emit(self.subtotal)
+
+    def _adjust_subtotal(self, delta):
+        # Line totals are rounded to paisa, so rounding the running total
+        # keeps it equal to the sum of the lines
+        self.subtotal = round(self.subtotal + delta, 2)
+        if not self.items:
+            self.subtotal = 0.0
+        self.subtotal_changed.emit(self.subtotal)
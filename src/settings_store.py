@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+In-memory application settings for MAHER ZARAI MARKAZ.
+
+The settings table is read once into a dict. Reads are served from memory;
+writes go through to SQLite in a single transaction and emit Qt signals so
+other parts of the UI can react without polling the database.
+"""
+
+import logging
+from PyQt5.QtCore import QObject, pyqtSignal
+
+# Set up logging
+logger = logging.getLogger('settings_store')
+
+
+class SettingsStore(QObject):
+    """Cached, write-through view of the settings table"""
+
+    # Define signals
+    changed = pyqtSignal(str, str)  # key, new value
+    settings_changed = pyqtSignal(dict)  # every key changed by one update
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self._values = {}
+        self.reload()
+
+    def reload(self):
+        """Re-read the whole settings table (e.g. after a database restore)"""
+        self._values = self.db.get_all_settings()
+
+    def get(self, key, default=None):
+        """Return a setting, or default if it is unset"""
+        value = self._values.get(key)
+        return default if value is None else value
+
+    def get_bool(self, key, default=False):
+        """Return a "true"/"false" setting as a bool"""
+        value = self._values.get(key)
+        return default if value is None else value == "true"
+
+    def get_int(self, key, default=0):
+        """Return a numeric setting as an int"""
+        try:
+            return int(self._values[key])
+        except (KeyError, TypeError, ValueError):
+            return default
+
+    def set(self, key, value, user_id=None):
+        """Update a single setting"""
+        return self.update_many({key: value}, user_id)
+
+    def update_many(self, values, user_id=None):
+        """
+        Write the settings that differ from the cache in one transaction,
+        log one activity entry and emit change signals.
+        Returns True on success (including when nothing changed).
+        """
+        changes = {
+            key: str(value)
+            for key, value in values.items()
+            if self._values.get(key) != str(value)
+        }
+        if not changes:
+            return True
+
+        if not self.db.update_settings(changes):
+            return False
+
+        self._values.update(changes)
+        self.db.log_activity(
+            user_id, "Setting Change", f"Settings changed: {', '.join(sorted(changes))}"
+        )
+        for key, value in changes.items():
+            self.changed.emit(key, value)
+        self.settings_changed.emit(changes)
+        return True
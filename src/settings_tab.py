@@ -8,21 +8,36 @@ import shutil
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QPushButton, QTabWidget, QLineEdit, QComboBox,
                              QCheckBox, QGroupBox, QFormLayout, QTimeEdit,
-                             QMessageBox, QFileDialog, QSpinBox, QFrame, QApplication)
-from PyQt5.QtCore import Qt, QTime
+                             QMessageBox, QFileDialog, QSpinBox, QFrame)
+from PyQt5.QtCore import Qt, QTime, QTimer
 from PyQt5.QtGui import QFont, QPixmap
 
+from src.settings_store import SettingsStore
+from src.theme_engine import get_style_manager
+
 # Set up logging
 logger = logging.getLogger('settings')
 
 class SettingsTab(QWidget):
     """Settings tab for configuring application preferences"""
     
+    ACCENT_APPLY_DELAY_MS = 150
+    
     def __init__(self, db, user_data, main_window):
         super().__init__()
         self.db = db
         self.user_data = user_data
+        self.is_admin = self.user_data.get("role") == "Admin"
         self.main_window = main_window
+        self.settings = getattr(main_window, 'settings', None) or SettingsStore(db)
+        self.style_manager = get_style_manager()
+        
+        # Accent previews update immediately; the application follows once
+        # the user stops clicking through colours
+        self.accent_timer = QTimer(self)
+        self.accent_timer.setSingleShot(True)
+        self.accent_timer.setInterval(self.ACCENT_APPLY_DELAY_MS)
+        self.accent_timer.timeout.connect(self.commit_accent_color)
         
         # Set up UI
         self.setup_ui()
@@ -469,40 +484,24 @@ class SettingsTab(QWidget):
             logger.error(f"Error updating preview: {e}")
     
     def apply_accent_color(self, color):
-        """Apply a custom accent color"""
+        """Preview an accent color and apply it shortly after the last click"""
+        # Store the accent color
+        self.accent_color = color
+        
+        # Update the preview button
+        button = self.preview_widget.findChild(QPushButton)
+        button.setStyleSheet(f"background-color: {color}; color: white; border-radius: 4px;")
+        
+        self.accent_timer.start()
+    
+    def commit_accent_color(self):
+        """Apply the previewed accent color to the application and save it"""
         try:
-            # Store the accent color
-            self.accent_color = color
-            
-            # Update the preview button
-            button = self.preview_widget.findChild(QPushButton)
-            button.setStyleSheet(f"background-color: {color}; color: white; border-radius: 4px;")
-            
-            # Apply the accent color to the application
-            from style import create_accent_stylesheet
-            
-            # Get the current theme
-            theme = self.theme_combo.currentData()
-            
-            # Create and apply the accent stylesheet
-            accent_stylesheet = create_accent_stylesheet(color, theme)
-            app = QApplication.instance()
-            
-            # Store the current stylesheet
-            current_stylesheet = app.styleSheet()
-            
-            # Remove any previous accent stylesheet (simple approach)
-            if hasattr(self, 'previous_accent_stylesheet') and self.previous_accent_stylesheet:
-                current_stylesheet = current_stylesheet.replace(self.previous_accent_stylesheet, '')
-            
-            # Apply the new accent stylesheet
-            app.setStyleSheet(current_stylesheet + accent_stylesheet)
-            
-            # Store the accent stylesheet for future reference
-            self.previous_accent_stylesheet = accent_stylesheet
+            # Only the palette changes, the stylesheet stays as it is
+            self.apply_appearance()
             
             # Store the accent color in settings
-            self.db.update_setting("accent_color", color)
+            self.settings.set("accent_color", self.accent_color, self.user_data.get('id'))
             
             # Show toast notification
             if hasattr(self.main_window, 'show_toast'):
@@ -512,59 +511,22 @@ class SettingsTab(QWidget):
             if hasattr(self.main_window, 'show_toast'):
                 self.main_window.show_toast(f"Error applying accent color", notification_type="error")
     
+    def apply_appearance(self):
+        """Apply the selected theme, accent colour and high contrast to the application"""
+        self.style_manager.apply(
+            self.theme_combo.currentData(),
+            getattr(self, 'accent_color', None),
+            self.high_contrast_checkbox.isChecked(),
+        )
+    
     def toggle_high_contrast(self, state):
         """Toggle high contrast mode"""
         try:
-            # Store the current stylesheet
-            app = QApplication.instance()
-            current_stylesheet = app.styleSheet()
-            
-            # Define high contrast stylesheet
-            high_contrast_stylesheet = """
-                /* High contrast mode */
-                QGroupBox {
-                    border-width: 2px;
-                }
-                
-                QLineEdit, QComboBox, QSpinBox, QDoubleSpinBox, QDateEdit {
-                    border-width: 2px;
-                }
-                
-                QTableWidget {
-                    border-width: 2px;
-                }
-                
-                QHeaderView::section {
-                    font-weight: bold;
-                    padding: 12px 8px;
-                }
-                
-                QPushButton {
-                    font-weight: bold;
-                    border-width: 2px;
-                }
-                
-                QCheckBox::indicator, QRadioButton::indicator {
-                    width: 20px;
-                    height: 20px;
-                    border-width: 2px;
-                }
-            """
-            
-            # Remove any previous high contrast stylesheet
-            if hasattr(self, 'high_contrast_applied') and self.high_contrast_applied:
-                current_stylesheet = current_stylesheet.replace(high_contrast_stylesheet, '')
-            
-            # Apply or remove high contrast
-            if state:
-                app.setStyleSheet(current_stylesheet + high_contrast_stylesheet)
-                self.high_contrast_applied = True
-            else:
-                app.setStyleSheet(current_stylesheet)
-                self.high_contrast_applied = False
+            # Recompose the application stylesheet with or without high contrast
+            self.apply_appearance()
             
             # Store the setting
-            self.db.update_setting("high_contrast_mode", "true" if state else "false")
+            self.settings.set("high_contrast_mode", "true" if state else "false", self.user_data.get('id'))
             
             # Show toast notification
             if hasattr(self.main_window, 'show_toast'):
@@ -733,27 +695,39 @@ class SettingsTab(QWidget):
         password_group.setLayout(password_layout)
         layout.addWidget(password_group)
         
-        # Admin section - only show if user is admin
-        if self.user_data['role'] == 'admin':
-            admin_group = QGroupBox("Admin Tools")
-            admin_layout = QVBoxLayout()
-            
-            # Reset admin password button
-            reset_admin_button = QPushButton("Reset Admin Password to Default")
-            reset_admin_button.clicked.connect(self.reset_admin_password)
-            admin_layout.addWidget(reset_admin_button)
-            
-            # Reset any user's password
-            reset_user_button = QPushButton("Reset User Password")
-            reset_user_button.clicked.connect(self.show_admin_password_reset)
-            admin_layout.addWidget(reset_user_button)
-            
-            admin_group.setLayout(admin_layout)
-            layout.addWidget(admin_group)
+        # Admin section - only shown while an admin is logged in
+        self.admin_group = QGroupBox("Admin Tools")
+        admin_layout = QVBoxLayout()
+        
+        # Reset admin password button
+        reset_admin_button = QPushButton("Reset Admin Password to Default")
+        reset_admin_button.clicked.connect(self.reset_admin_password)
+        admin_layout.addWidget(reset_admin_button)
+        
+        # Reset any user's password
+        reset_user_button = QPushButton("Reset User Password")
+        reset_user_button.clicked.connect(self.show_admin_password_reset)
+        admin_layout.addWidget(reset_user_button)
+        
+        self.admin_group.setLayout(admin_layout)
+        self.admin_group.setVisible(self.is_admin)
+        layout.addWidget(self.admin_group)
         
         # Add stretch to push everything to the top
         layout.addStretch(1)
     
+    def on_user_changed(self):
+        """Re-apply role permissions and reload settings after a user switch"""
+        self.is_admin = self.user_data.get("role") == "Admin"
+        self.admin_group.setVisible(self.is_admin)
+        
+        # Don't leave the previous user's typing in the password fields
+        self.current_password_input.clear()
+        self.new_password_input.clear()
+        self.confirm_password_input.clear()
+        
+        self.load_settings()
+    
     def reset_admin_password(self):
         """Reset the admin password to the default"""
         confirm = QMessageBox.question(
@@ -830,7 +804,7 @@ class SettingsTab(QWidget):
         try:
             # Load general settings
             try:
-                theme = self.db.get_setting("theme") or "light"
+                theme = self.settings.get("theme") or "light"
                 index = self.theme_combo.findData(theme)
                 if index >= 0:
                     self.theme_combo.setCurrentIndex(index)
@@ -842,64 +816,68 @@ class SettingsTab(QWidget):
             
             # Load high contrast mode setting
             try:
-                high_contrast = self.db.get_setting("high_contrast_mode") == "true"
+                # The application already has it applied; just sync the checkbox
+                high_contrast = self.settings.get("high_contrast_mode") == "true"
+                self.high_contrast_checkbox.blockSignals(True)
                 self.high_contrast_checkbox.setChecked(high_contrast)
-                if high_contrast:
-                    self.toggle_high_contrast(True)
+                self.high_contrast_checkbox.blockSignals(False)
             except Exception as e:
                 logger.error(f"Error loading high contrast settings: {e}")
             
             # Load accent color setting
             try:
-                accent_color = self.db.get_setting("accent_color")
+                accent_color = self.settings.get("accent_color")
                 if accent_color:
-                    self.apply_accent_color(accent_color)
+                    self.accent_color = accent_color
+                    button = self.preview_widget.findChild(QPushButton)
+                    if button:
+                        button.setStyleSheet(f"background-color: {accent_color}; color: white; border-radius: 4px;")
             except Exception as e:
                 logger.error(f"Error loading accent color settings: {e}")
             
-            voice_enabled = self.db.get_setting("voice_commands_enabled") == "true"
+            voice_enabled = self.settings.get("voice_commands_enabled") == "true"
             self.voice_enabled_checkbox.setChecked(voice_enabled)
             
-            voice_language = self.db.get_setting("voice_language") or "en"
+            voice_language = self.settings.get("voice_language") or "en"
             index = self.voice_language_combo.findData(voice_language)
             if index >= 0:
                 self.voice_language_combo.setCurrentIndex(index)
             
-            voice_feedback = self.db.get_setting("voice_feedback_enabled") == "true"
+            voice_feedback = self.settings.get("voice_feedback_enabled") == "true"
             self.voice_feedback_checkbox.setChecked(voice_feedback)
             
-            auto_open_receipt = self.db.get_setting("auto_open_receipt") == "true"
+            auto_open_receipt = self.settings.get("auto_open_receipt") == "true"
             self.auto_open_receipt_checkbox.setChecked(auto_open_receipt)
             
-            receipt_footer = self.db.get_setting("receipt_footer") or "Thank you for your business!"
+            receipt_footer = self.settings.get("receipt_footer") or "Thank you for your business!"
             self.receipt_footer_input.setText(receipt_footer)
             
             # Load shop information
-            shop_name = self.db.get_setting("shop_name") or "MAHER ZARAI MARKAZ"
+            shop_name = self.settings.get("shop_name") or "MAHER ZARAI MARKAZ"
             self.shop_name_input.setText(shop_name)
             
-            shop_address = self.db.get_setting("shop_address") or ""
+            shop_address = self.settings.get("shop_address") or ""
             self.shop_address_input.setText(shop_address)
             
-            shop_phone = self.db.get_setting("shop_phone") or ""
+            shop_phone = self.settings.get("shop_phone") or ""
             self.shop_phone_input.setText(shop_phone)
             
-            receipt_prefix = self.db.get_setting("receipt_prefix") or "INV"
+            receipt_prefix = self.settings.get("receipt_prefix") or "INV"
             self.receipt_prefix_input.setText(receipt_prefix)
             
-            logo_path = self.db.get_setting("logo_path") or ""
+            logo_path = self.settings.get("logo_path") or ""
             if logo_path and os.path.exists(logo_path):
                 self.logo_path_label.setText(logo_path)
             
             # Load backup settings
-            auto_backup = self.db.get_setting("auto_backup_enabled") == "true"
+            auto_backup = self.settings.get("auto_backup_enabled") == "true"
             self.auto_backup_checkbox.setChecked(auto_backup)
             
-            backup_time = self.db.get_setting("auto_backup_time") or "21:00"
+            backup_time = self.settings.get("auto_backup_time") or "21:00"
             hour, minute = map(int, backup_time.split(":"))
             self.backup_time_edit.setTime(QTime(hour, minute))
             
-            backup_retention = int(self.db.get_setting("backup_retention_days") or "30")
+            backup_retention = int(self.settings.get("backup_retention_days") or "30")
             self.backup_retention_spin.setValue(backup_retention)
         
         except Exception as e:
@@ -962,25 +940,30 @@ class SettingsTab(QWidget):
     def save_settings(self):
         """Save settings to database"""
         try:
-            # Save general settings
-            self.db.update_setting("theme", self.theme_combo.currentData())
-            self.db.update_setting("voice_commands_enabled", "true" if self.voice_enabled_checkbox.isChecked() else "false")
-            self.db.update_setting("voice_language", self.voice_language_combo.currentData())
-            self.db.update_setting("voice_feedback_enabled", "true" if self.voice_feedback_checkbox.isChecked() else "false")
-            self.db.update_setting("auto_open_receipt", "true" if self.auto_open_receipt_checkbox.isChecked() else "false")
-            self.db.update_setting("receipt_footer", self.receipt_footer_input.text())
-            
-            # Save shop information
-            self.db.update_setting("shop_name", self.shop_name_input.text())
-            self.db.update_setting("shop_address", self.shop_address_input.text())
-            self.db.update_setting("shop_phone", self.shop_phone_input.text())
-            self.db.update_setting("receipt_prefix", self.receipt_prefix_input.text())
+            values = {
+                # General settings
+                "theme": self.theme_combo.currentData(),
+                "voice_commands_enabled": "true" if self.voice_enabled_checkbox.isChecked() else "false",
+                "voice_language": self.voice_language_combo.currentData(),
+                "voice_feedback_enabled": "true" if self.voice_feedback_checkbox.isChecked() else "false",
+                "auto_open_receipt": "true" if self.auto_open_receipt_checkbox.isChecked() else "false",
+                "receipt_footer": self.receipt_footer_input.text(),
+                
+                # Shop information
+                "shop_name": self.shop_name_input.text(),
+                "shop_address": self.shop_address_input.text(),
+                "shop_phone": self.shop_phone_input.text(),
+                "receipt_prefix": self.receipt_prefix_input.text(),
+                
+                # Backup settings
+                "auto_backup_enabled": "true" if self.auto_backup_checkbox.isChecked() else "false",
+                "auto_backup_time": self.backup_time_edit.time().toString("HH:mm"),
+                "backup_retention_days": str(self.backup_retention_spin.value()),
+            }
             
-            # Save backup settings
-            self.db.update_setting("auto_backup_enabled", "true" if self.auto_backup_checkbox.isChecked() else "false")
-            backup_time = self.backup_time_edit.time().toString("HH:mm")
-            self.db.update_setting("auto_backup_time", backup_time)
-            self.db.update_setting("backup_retention_days", str(self.backup_retention_spin.value()))
+            # Save all settings in one transaction
+            if not self.settings.update_many(values, self.user_data.get('id')):
+                raise RuntimeError("The settings could not be written to the database.")
             
             # Apply settings
             self.apply_settings()
@@ -994,20 +977,7 @@ class SettingsTab(QWidget):
     def apply_settings(self):
         """Apply settings immediately"""
         # Apply theme
-        theme = self.theme_combo.currentData()
-        from PyQt5.QtWidgets import QApplication
-        from style import get_dark_palette, get_blue_palette, MAIN_STYLESHEET, DARK_STYLESHEET, BLUE_STYLESHEET, LIGHT_STYLESHEET
-        
-        app = QApplication.instance()
-        if theme == "dark":
-            app.setPalette(get_dark_palette())
-            app.setStyleSheet(MAIN_STYLESHEET + DARK_STYLESHEET)
-        elif theme == "blue":
-            app.setPalette(get_blue_palette())
-            app.setStyleSheet(MAIN_STYLESHEET + BLUE_STYLESHEET)
-        else:  # Light theme or default
-            app.setPalette(app.style().standardPalette())
-            app.setStyleSheet(MAIN_STYLESHEET + LIGHT_STYLESHEET)
+        self.apply_appearance()
         
         # Apply voice settings
         voice_enabled = self.voice_enabled_checkbox.isChecked()
@@ -1021,11 +991,6 @@ class SettingsTab(QWidget):
                                 tool_action.trigger()  # Toggle voice recognition
                             break
                     break
-        
-        # Apply backup settings
-        auto_backup = self.auto_backup_checkbox.isChecked()
-        if hasattr(self.main_window, 'setup_auto_backup'):
-            self.main_window.setup_auto_backup()
     
     def browse_logo(self):
         """Browse for shop logo"""
@@ -1053,7 +1018,7 @@ class SettingsTab(QWidget):
                 
                 # Update logo path
                 self.logo_path_label.setText(new_file_path)
-                self.db.update_setting("logo_path", new_file_path)
+                self.settings.set("logo_path", new_file_path, self.user_data.get('id'))
                 
                 QMessageBox.information(self, "Logo Updated", "Shop logo has been updated.")
             
@@ -1078,8 +1043,13 @@ class SettingsTab(QWidget):
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_path = os.path.join(backup_dir, f"manual_backup_{timestamp}.db")
             
+            # Run the backup in the background when the main window can
+            if hasattr(self.main_window, 'start_backup'):
+                self.main_window.start_backup(backup_path)
+                return
+            
             # Create backup
-            result = self.db.create_backup(backup_path)
+            result = self.db.backup_database(backup_path)
             
             if result:
                 QMessageBox.information(
@@ -1104,6 +1074,11 @@ class SettingsTab(QWidget):
     
     def restore_backup(self):
         """Restore from a backup file"""
+        # The main window restores in place and reloads every page
+        if hasattr(self.main_window, 'restore_database'):
+            self.main_window.restore_database()
+            return
+        
         try:
             # Ask for confirmation
             confirm = QMessageBox.warning(
@@ -1137,13 +1112,9 @@ class SettingsTab(QWidget):
                 QMessageBox.information(
                     self, 
                     "Restore Successful", 
-                    "Database restored successfully. "
-                    "The application will now restart."
+                    "Database restored successfully."
                 )
-                
-                # Restart application
-                if hasattr(self.main_window, 'restart_application'):
-                    self.main_window.restart_application()
+                self.load_settings()
             else:
                 QMessageBox.critical(
                     self, 
@@ -1183,24 +1154,16 @@ class SettingsTab(QWidget):
             return
         
         # Verify current password
-        result = self.db.authenticate_user(self.user_data['username'], current_password)
-        if not result:
+        user = self.db.get_user_by_username(self.user_data['username'])
+        if not user or not self.db.check_password(current_password, user['password_hash'])[0]:
             QMessageBox.warning(self, "Authentication Error", "Current password is incorrect.")
             self.current_password_input.setFocus()
             return
         
         # Update password in database
         try:
-            import bcrypt
-            
-            # Hash new password
-            password_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            
-            # Update in database
-            query = "UPDATE users SET password_hash = ? WHERE id = ?"
-            params = (password_hash, self.user_data['id'])
-            
-            result = self.db.execute_query(query, params)
+            # Hash at the configured work factor and update in database
+            result = self.db.update_password(self.user_data['id'], new_password)
             
             if result:
                 QMessageBox.information(
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Startup timing for MAHER ZARAI MARKAZ.
+
+Run with --profile-startup (or set MZM_PROFILE_STARTUP=1) to record how long
+each startup phase takes: imports, database initialisation, stylesheet,
+splash, login and main window. The timings are written to
+data/startup_trace.json in Chrome trace-event format, so the file can be
+opened in chrome://tracing or https://ui.perfetto.dev.
+
+When profiling is off every call is a no-op.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import contextlib
+
+# Set up logging
+logger = logging.getLogger('startup')
+
+PROFILE_ENV_VAR = "MZM_PROFILE_STARTUP"
+PROFILE_FLAG = "--profile-startup"
+TRACE_PATH = os.path.join("data", "startup_trace.json")
+
+
+class StartupProfiler:
+    """Collects named startup phases relative to process start"""
+
+    def __init__(self, enabled=None, trace_path=TRACE_PATH):
+        if enabled is None:
+            enabled = bool(os.environ.get(PROFILE_ENV_VAR)) or PROFILE_FLAG in sys.argv
+        self.enabled = enabled
+        self.trace_path = trace_path
+        self.origin = time.perf_counter()
+        self.events = []
+        self.open_phases = {}
+        self.finished = False
+
+    def _now_us(self):
+        return (time.perf_counter() - self.origin) * 1e6
+
+    def start_phase(self, name):
+        """Start timing a phase; end it with end_phase(name)"""
+        if self.enabled and not self.finished:
+            self.open_phases[name] = self._now_us()
+
+    def end_phase(self, name):
+        """Stop timing a phase started with start_phase"""
+        if not self.enabled or self.finished:
+            return
+        start = self.open_phases.pop(name, None)
+        if start is None:
+            return
+        self.events.append({
+            "name": name,
+            "ph": "X",
+            "ts": round(start),
+            "dur": round(self._now_us() - start),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        })
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Time the body of a with block as one phase"""
+        self.start_phase(name)
+        try:
+            yield
+        finally:
+            self.end_phase(name)
+
+    def mark(self, name):
+        """Record an instant, e.g. the first frame of a window"""
+        if self.enabled and not self.finished:
+            self.events.append({
+                "name": name,
+                "ph": "i",
+                "s": "p",
+                "ts": round(self._now_us()),
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+            })
+
+    def finish(self):
+        """Write the trace file once; later calls do nothing"""
+        if not self.enabled or self.finished:
+            return None
+        for name in list(self.open_phases):
+            self.end_phase(name)
+        self.finished = True
+
+        total_ms = self._now_us() / 1000
+        phases = {
+            event["name"]: round(event["dur"] / 1000, 1)
+            for event in self.events if event["ph"] == "X"
+        }
+        trace = {
+            "traceEvents": self.events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "total_ms": round(total_ms, 1),
+                "phases_ms": phases,
+                "modules_loaded": len(sys.modules),
+                "python": sys.version.split()[0],
+                "argv": sys.argv,
+            },
+        }
+        try:
+            os.makedirs(os.path.dirname(self.trace_path) or ".", exist_ok=True)
+            with open(self.trace_path, "w") as f:
+                json.dump(trace, f, indent=2)
+        except OSError as e:
+            logger.error(f"Could not write startup trace: {e}")
+            return None
+
+        logger.info(
+            f"Startup took {total_ms:.0f} ms "
+            f"({', '.join(f'{name}: {ms} ms' for name, ms in phases.items())}); "
+            f"trace written to {self.trace_path}"
+        )
+        return self.trace_path
+
+
+# Shared profiler for the running application; the entry points import this
+# module first so its clock starts as close to process start as possible
+profiler = StartupProfiler()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Historical stock and inventory valuation for MAHER ZARAI MARKAZ.
+
+Every stock change is appended to the stock_movements ledger and each
+product's closing stock is snapshotted once a day (month-ends are kept for
+good). Database.get_stock_on reads the snapshot nearest to the requested day
+and applies only the movements in between, so a month-end valuation does
+not replay the whole history.
+
+Run `python src/stock_history.py --benchmark` to compare replaying the
+ledger with a snapshot read plus a delta scan.
+"""
+
+import os
+import sys
+import time
+import datetime
+import logging
+
+# Set up logging
+logger = logging.getLogger('stock_history')
+
+
+def last_month_end(today=None):
+    """The last day of the previous month"""
+    today = today or datetime.date.today()
+    return today.replace(day=1) - datetime.timedelta(days=1)
+
+
+def summarize_valuation(rows):
+    """
+    Roll Database.get_stock_on rows up by category. Products with no stock
+    on hand (or negative stock) carry no value. Returns (categories, totals)
+    where categories are dicts with category, products, quantity and value.
+    """
+    categories = {}
+    for row in rows:
+        quantity = row['quantity'] or 0
+        if quantity <= 0:
+            continue
+        category = categories.setdefault(row['category'] or "Uncategorized", {
+            'category': row['category'] or "Uncategorized",
+            'products': 0,
+            'quantity': 0,
+            'value': 0.0,
+        })
+        category['products'] += 1
+        category['quantity'] += quantity
+        category['value'] += quantity * (row['unit_cost'] or 0.0)
+
+    summary = sorted(categories.values(), key=lambda c: c['category'])
+    totals = {
+        'products': sum(c['products'] for c in summary),
+        'quantity': sum(c['quantity'] for c in summary),
+        'value': round(sum(c['value'] for c in summary), 2),
+    }
+    for category in summary:
+        category['value'] = round(category['value'], 2)
+    return summary, totals
+
+
+def benchmark_stock_history(products=5000, days=365, movements_per_day=1500, rounds=20):
+    """Time a month-end stock query by full replay and by snapshot plus delta."""
+    import random
+    import tempfile
+    from src.database import Database
+
+    with tempfile.TemporaryDirectory() as folder:
+        db = Database(os.path.join(folder, "bench.db"))
+        first_day = datetime.date.today() - datetime.timedelta(days=days)
+        with db as cursor:
+            cursor.executemany(
+                "INSERT INTO products (id, name, category, purchase_price, selling_price, stock_quantity, min_stock_level) VALUES (?, ?, 'Bench', 100, 150, 0, 10)",
+                [(i, f"Product {i}") for i in range(1, products + 1)],
+            )
+            cursor.executemany(
+                "INSERT INTO stock_movements (product_id, moved_at, quantity_change, reason) VALUES (?, ?, ?, 'bench')",
+                [
+                    (random.randint(1, products),
+                     (first_day + datetime.timedelta(days=day)).strftime("%Y-%m-%d 12:00:00"),
+                     random.choice((-2, -1, 5)))
+                    for day in range(days)
+                    for _ in range(movements_per_day)
+                ],
+            )
+            cursor.execute(
+                "UPDATE products SET stock_quantity = (SELECT COALESCE(SUM(quantity_change), 0) FROM stock_movements m WHERE m.product_id = products.id)"
+            )
+
+        # Month-end snapshots, as ensure_stock_snapshot keeps them
+        day = first_day
+        while day < datetime.date.today():
+            if (day + datetime.timedelta(days=1)).day == 1:
+                db.take_stock_snapshot(day.strftime("%Y-%m-%d"))
+            day += datetime.timedelta(days=1)
+
+        target = (last_month_end() - datetime.timedelta(days=40)).strftime("%Y-%m-%d")
+
+        def replay():
+            return db.execute_query(
+                "SELECT product_id, SUM(quantity_change) AS quantity FROM stock_movements WHERE moved_at < ? GROUP BY product_id",
+                (db._next_day(target),),
+                fetch="all",
+            )
+
+        def timed(func):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                result = func()
+            return (time.perf_counter() - start) / rounds * 1000, result
+
+        replay_ms, replayed = timed(replay)
+        snapshot_ms, rows = timed(lambda: db.get_stock_on(target))
+        replayed = {row['product_id']: row['quantity'] for row in replayed}
+        mismatches = sum(1 for row in rows if row['quantity'] != replayed.get(row['id'], 0))
+        db.close()
+    return {
+        "movements": days * movements_per_day,
+        "replay_ms": replay_ms,
+        "snapshot_delta_ms": snapshot_ms,
+        "mismatches": mismatches,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        for name, value in benchmark_stock_history().items():
+            print(f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}")
+    else:
+        print("Usage: python src/stock_history.py --benchmark")
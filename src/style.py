@@ -1443,6 +1443,39 @@ QFrame#errorToast {{
 """
 
 
+# High contrast overrides, layered over any theme
+HIGH_CONTRAST_STYLESHEET = """
+/* High contrast mode */
+QGroupBox {
+    border-width: 2px;
+}
+
+QLineEdit, QComboBox, QSpinBox, QDoubleSpinBox, QDateEdit {
+    border-width: 2px;
+}
+
+QTableWidget {
+    border-width: 2px;
+}
+
+QHeaderView::section {
+    font-weight: bold;
+    padding: 12px 8px;
+}
+
+QPushButton {
+    font-weight: bold;
+    border-width: 2px;
+}
+
+QCheckBox::indicator, QRadioButton::indicator {
+    width: 20px;
+    height: 20px;
+    border-width: 2px;
+}
+"""
+
+
 # Dark mode palette
 def get_dark_palette():
     """Return a dark color palette for the application"""
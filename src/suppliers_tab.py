@@ -3,11 +3,16 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import logging
 from PyQt5.QtWidgets import (QWidget, QHBoxLayout, QVBoxLayout, QTableWidget, QTableWidgetItem,
                              QGroupBox, QFormLayout, QLineEdit, QPushButton, QMessageBox,
-                             QHeaderView)
+                             QHeaderView, QDialog, QDialogButtonBox, QCheckBox, QLabel)
 from PyQt5.QtCore import Qt
-from src.style import MAIN_STYLESHEET
+
+from src.reorder import compute_reorder_suggestions, REORDER_WINDOW_DAYS
+
+# Set up logging
+logger = logging.getLogger('suppliers')
 
 class SuppliersTab(QWidget):
     """
@@ -19,16 +24,17 @@ class SuppliersTab(QWidget):
         self.user_data = user_data
         self.selected_supplier_id = None
         
-        self.setStyleSheet(MAIN_STYLESHEET)
-        
         self.setup_ui()
         self.load_suppliers()
 
     def setup_ui(self):
         """Sets up the main UI layout and widgets for the suppliers tab."""
-        main_layout = QHBoxLayout(self)
-        main_layout.setContentsMargins(15, 15, 15, 15)
+        outer_layout = QVBoxLayout(self)
+        outer_layout.setContentsMargins(15, 15, 15, 15)
+        outer_layout.setSpacing(15)
+        main_layout = QHBoxLayout()
         main_layout.setSpacing(15)
+        outer_layout.addLayout(main_layout, 1)
 
         # Left Side: Supplier List Table
         table_group = QGroupBox("All Suppliers")
@@ -91,6 +97,44 @@ class SuppliersTab(QWidget):
 
         main_layout.addWidget(table_group, 3)
         main_layout.addWidget(form_group, 1)
+
+        # Bottom: Purchase Orders of the selected supplier (all when none is selected)
+        orders_group = QGroupBox("Purchase Orders")
+        orders_layout = QVBoxLayout(orders_group)
+
+        self.order_table = QTableWidget()
+        self.order_table.setColumnCount(6)
+        self.order_table.setHorizontalHeaderLabels(["PO #", "Supplier", "Order Date", "Status", "Items", "Total"])
+        self.order_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.order_table.setSelectionMode(QTableWidget.SingleSelection)
+        self.order_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.order_table.verticalHeader().setVisible(False)
+        self.order_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.order_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents) # PO #
+        self.order_table.itemSelectionChanged.connect(self.update_order_buttons)
+        self.order_table.doubleClicked.connect(self.receive_goods)
+        orders_layout.addWidget(self.order_table)
+
+        order_button_layout = QHBoxLayout()
+        self.new_order_button = QPushButton("New Order from Reorder Suggestions")
+        self.new_order_button.setProperty("class", "primary-button")
+        self.new_order_button.clicked.connect(self.create_order_from_suggestions)
+
+        self.receive_button = QPushButton("Receive Goods")
+        self.receive_button.setProperty("class", "info-button")
+        self.receive_button.clicked.connect(self.receive_goods)
+
+        self.cancel_order_button = QPushButton("Cancel Order")
+        self.cancel_order_button.setProperty("class", "danger-button")
+        self.cancel_order_button.clicked.connect(self.cancel_order)
+
+        order_button_layout.addWidget(self.new_order_button)
+        order_button_layout.addWidget(self.receive_button)
+        order_button_layout.addWidget(self.cancel_order_button)
+        order_button_layout.addStretch()
+        orders_layout.addLayout(order_button_layout)
+
+        outer_layout.addWidget(orders_group, 1)
         
         self.clear_form()
 
@@ -132,6 +176,8 @@ class SuppliersTab(QWidget):
         self.add_button.setEnabled(False)
         self.update_button.setEnabled(True)
         self.delete_button.setEnabled(True)
+        self.new_order_button.setEnabled(True)
+        self.load_purchase_orders()
 
     def clear_form(self):
         """Clears all input fields and resets the form state."""
@@ -146,7 +192,9 @@ class SuppliersTab(QWidget):
         self.add_button.setEnabled(True)
         self.update_button.setEnabled(False)
         self.delete_button.setEnabled(False)
+        self.new_order_button.setEnabled(False)
         self.name_input.setFocus()
+        self.load_purchase_orders()
 
     def add_supplier(self):
         """Adds a new supplier to the database."""
@@ -215,4 +263,159 @@ class SuppliersTab(QWidget):
                 self.load_suppliers()
                 self.clear_form()
             else:
-                QMessageBox.critical(self, "Database Error", "Failed to delete supplier.")
\ No newline at end of file
+                QMessageBox.critical(self, "Database Error", "Failed to delete supplier.")
+
+    def load_purchase_orders(self):
+        """Fills the purchase order table for the selected supplier."""
+        orders = self.db.get_purchase_orders(self.selected_supplier_id) or []
+        self.order_table.setRowCount(len(orders))
+        for row_num, order in enumerate(orders):
+            id_item = QTableWidgetItem(str(order['id']))
+            id_item.setData(Qt.UserRole, order['status'])
+            self.order_table.setItem(row_num, 0, id_item)
+            self.order_table.setItem(row_num, 1, QTableWidgetItem(order.get('supplier_name') or ''))
+            self.order_table.setItem(row_num, 2, QTableWidgetItem(order.get('order_date') or ''))
+            self.order_table.setItem(row_num, 3, QTableWidgetItem(order['status']))
+            self.order_table.setItem(row_num, 4, QTableWidgetItem(str(order['item_count'])))
+            self.order_table.setItem(row_num, 5, QTableWidgetItem(f"{order['total']:.2f}"))
+        self.update_order_buttons()
+
+    def selected_order(self):
+        """(order id, status) of the selected purchase order, or (None, None)."""
+        selected_rows = self.order_table.selectionModel().selectedRows()
+        if not selected_rows:
+            return None, None
+        item = self.order_table.item(selected_rows[0].row(), 0)
+        return int(item.text()), item.data(Qt.UserRole)
+
+    def update_order_buttons(self):
+        _, status = self.selected_order()
+        self.receive_button.setEnabled(status in ('Open', 'Partial'))
+        self.cancel_order_button.setEnabled(status == 'Open')
+
+    def create_order_from_suggestions(self):
+        """Drafts a purchase order for the selected supplier from the reorder suggestions."""
+        if self.selected_supplier_id is None: return
+
+        products, sales = self.db.get_reorder_data(REORDER_WINDOW_DAYS)
+        items = [
+            {'product_id': s['product_id'], 'quantity': s['order_quantity'], 'unit_cost': s['unit_cost']}
+            for s in compute_reorder_suggestions(products, sales, REORDER_WINDOW_DAYS)
+            if s['supplier_id'] == self.selected_supplier_id
+        ]
+        supplier_name = self.name_input.text()
+        if not items:
+            QMessageBox.information(self, "Nothing to Order", f"No products from '{supplier_name}' need reordering.")
+            return
+
+        reply = QMessageBox.question(self, "Create Purchase Order",
+                                     f"Create a purchase order for {len(items)} products from '{supplier_name}'?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+        if reply != QMessageBox.Yes:
+            return
+
+        order_id = self.db.create_purchase_order(self.selected_supplier_id, items, self.user_data['id'])
+        if order_id:
+            self.db.log_activity(self.user_data['id'], 'Create Purchase Order', f"PO #{order_id} for {supplier_name}, {len(items)} items")
+            self.load_purchase_orders()
+        else:
+            QMessageBox.critical(self, "Database Error", "Failed to create purchase order.")
+
+    def receive_goods(self):
+        """Books the delivery of the selected purchase order into stock."""
+        order_id, status = self.selected_order()
+        if status not in ('Open', 'Partial'): return
+
+        items = self.db.get_purchase_order_items(order_id)
+        dialog = GoodsReceivedDialog(order_id, items, self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+
+        updated = self.db.receive_goods(dialog.get_lines(), dialog.update_cost_check.isChecked(), order_id)
+        if updated is None:
+            QMessageBox.critical(self, "Database Error", "Failed to receive goods.")
+            return
+        self.db.log_activity(self.user_data['id'], 'Receive Goods', f"PO #{order_id}: {updated} products received")
+        QMessageBox.information(self, "Goods Received", f"Stock updated for {updated} products.")
+        self.load_purchase_orders()
+
+    def cancel_order(self):
+        """Cancels the selected open purchase order."""
+        order_id, status = self.selected_order()
+        if status != 'Open': return
+
+        reply = QMessageBox.question(self, "Confirm Cancel",
+                                     f"Are you sure you want to cancel PO #{order_id}?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            if self.db.cancel_purchase_order(order_id):
+                self.db.log_activity(self.user_data['id'], 'Cancel Purchase Order', f"Cancelled PO #{order_id}")
+                self.load_purchase_orders()
+            else:
+                QMessageBox.critical(self, "Database Error", "Failed to cancel purchase order.")
+
+
+class GoodsReceivedDialog(QDialog):
+    """
+    Quantities and unit costs delivered against a purchase order. Every line
+    starts at its outstanding quantity, so a complete delivery is one click.
+    """
+    RECEIVE_COLUMN = 3
+    COST_COLUMN = 4
+
+    def __init__(self, order_id, items, parent=None):
+        super().__init__(parent)
+        self.items = items or []
+        self.setWindowTitle(f"Receive Goods - PO #{order_id}")
+        self.setMinimumSize(700, 450)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel("Edit the quantities and unit costs that arrived, then click OK."))
+
+        self.table = QTableWidget(len(self.items), 5)
+        self.table.setHorizontalHeaderLabels(["Product", "Ordered", "Already Received", "Receive Now", "Unit Cost"])
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.setEditTriggers(QTableWidget.AllEditTriggers)
+        for row, item in enumerate(self.items):
+            outstanding = max(item['quantity'] - (item['received_quantity'] or 0), 0)
+            values = [item['product_name'], str(item['quantity']), str(item['received_quantity'] or 0),
+                      str(outstanding), f"{item['unit_cost'] or 0:.2f}"]
+            for column, value in enumerate(values):
+                cell = QTableWidgetItem(value)
+                if column not in (self.RECEIVE_COLUMN, self.COST_COLUMN):
+                    cell.setFlags(cell.flags() & ~Qt.ItemIsEditable)
+                self.table.setItem(row, column, cell)
+        layout.addWidget(self.table)
+
+        self.update_cost_check = QCheckBox("Update purchase prices (weighted average with stock on hand)")
+        self.update_cost_check.setChecked(True)
+        layout.addWidget(self.update_cost_check)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.validate_and_accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def validate_and_accept(self):
+        try:
+            self.lines = [
+                (item['product_id'],
+                 int(self.table.item(row, self.RECEIVE_COLUMN).text()),
+                 float(self.table.item(row, self.COST_COLUMN).text()))
+                for row, item in enumerate(self.items)
+            ]
+        except ValueError:
+            QMessageBox.warning(self, "Input Error", "Quantities must be whole numbers and costs must be numbers.")
+            return
+        if any(quantity < 0 or cost < 0 for _, quantity, cost in self.lines):
+            QMessageBox.warning(self, "Input Error", "Quantities and costs cannot be negative.")
+            return
+        if not self.get_lines():
+            QMessageBox.warning(self, "Input Error", "Enter the quantity received for at least one product.")
+            return
+        self.accept()
+
+    def get_lines(self):
+        """(product_id, quantity, unit_cost) for every line with something received."""
+        return [line for line in self.lines if line[1] > 0]
@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Theme engine for MAHER ZARAI MARKAZ.
+
+The application look is one stylesheet set on the QApplication, built from
+layers: the main sheet, the theme sheet, an optional accent layer and
+optional high-contrast overrides. compile_stylesheet() composes and minifies
+that sheet once per combination and caches it.
+
+StyleManager tracks the layers and changes as little as possible:
+
+- The accent layer refers to palette(highlight) instead of a literal colour,
+  so switching between accent colours only updates the palette and
+  re-polishes the widgets the accent styles (buttons and tab bars). The
+  stylesheet is not re-parsed.
+- A theme or high-contrast change swaps the (cached) stylesheet, and only
+  when it differs from the one already applied.
+
+Widgets should not set MAIN_STYLESHEET on themselves; they inherit it from
+the application.
+
+Run `python src/theme_engine.py --benchmark` to time theme and accent
+switches and dialog opens.
+"""
+
+import re
+import sys
+import time
+import logging
+from functools import lru_cache
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtGui import QColor, QPalette
+
+# Set up logging
+logger = logging.getLogger('theme')
+
+THEMES = ("light", "dark", "blue")
+DEFAULT_THEME = "light"
+
+_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_SPACE = re.compile(r"\s+")
+_AROUND_PUNCTUATION = re.compile(r"\s*([{};,])\s*")
+_COLON = re.compile(r"\s*:\s*")
+
+# The accent layer is written against the palette so the colour can change
+# without re-parsing the stylesheet
+ACCENT_PALETTE_COLOR = "palette(highlight)"
+
+
+def normalize_theme(theme):
+    """Map a stored theme name onto a known theme (old values fall back to light)"""
+    return theme if theme in THEMES else DEFAULT_THEME
+
+
+def minify_qss(qss):
+    """
+    Strip comments and redundant whitespace from a Qt stylesheet.
+    Spaces around ':' are removed in selectors too: Qt cannot parse
+    "QScrollBar : horizontal", and one such selector makes it reject the
+    whole application stylesheet.
+    """
+    qss = _COMMENT.sub("", qss)
+    qss = _SPACE.sub(" ", qss)
+    qss = _AROUND_PUNCTUATION.sub(r"\1", qss)
+    qss = _COLON.sub(":", qss)
+    return qss.replace(";}", "}").strip()
+
+
+@lru_cache(maxsize=32)
+def compile_stylesheet(theme=DEFAULT_THEME, accent_color=None, high_contrast=False):
+    """
+    Compose the application stylesheet for a theme, accent colour and
+    high-contrast setting, minified. Cached per combination. Pass
+    ACCENT_PALETTE_COLOR as the accent to take it from the palette.
+    """
+    from src.style import (MAIN_STYLESHEET, LIGHT_STYLESHEET, DARK_STYLESHEET,
+                           BLUE_STYLESHEET, HIGH_CONTRAST_STYLESHEET,
+                           create_accent_stylesheet)
+
+    theme = normalize_theme(theme)
+    theme_sheets = {
+        "light": LIGHT_STYLESHEET,
+        "dark": DARK_STYLESHEET,
+        "blue": BLUE_STYLESHEET,
+    }
+
+    parts = [MAIN_STYLESHEET, theme_sheets[theme]]
+    if accent_color:
+        parts.append(create_accent_stylesheet(accent_color, theme))
+    if high_contrast:
+        parts.append(HIGH_CONTRAST_STYLESHEET)
+
+    qss = minify_qss("\n".join(parts))
+    if qss.count("{") != qss.count("}"):
+        raise ValueError(f"Stylesheet for theme '{theme}' has unmatched braces")
+    return qss
+
+
+def theme_palette(app, theme):
+    """Palette that goes with a theme"""
+    from src.style import get_dark_palette, get_blue_palette
+
+    theme = normalize_theme(theme)
+    if theme == "dark":
+        return get_dark_palette()
+    if theme == "blue":
+        return get_blue_palette()
+    return app.style().standardPalette()
+
+
+class StyleManager(QObject):
+    """Applies the theme, accent and high-contrast layers to the application"""
+
+    # Define signals
+    changed = pyqtSignal(dict)  # the layers now applied
+
+    # Widgets whose look depends on the accent layer
+    ACCENT_WIDGET_TYPES = ("QAbstractButton", "QTabBar")
+
+    def __init__(self, app, parent=None):
+        super().__init__(parent)
+        self.app = app
+        self.theme = None
+        self.accent_color = None
+        self.high_contrast = False
+
+    def layers(self):
+        return {
+            "theme": self.theme,
+            "accent_color": self.accent_color,
+            "high_contrast": self.high_contrast,
+        }
+
+    def palette_for(self, theme, accent_color):
+        """Theme palette with the accent colour as the highlight"""
+        palette = theme_palette(self.app, theme)
+        if accent_color:
+            color = QColor(accent_color)
+            if color.isValid():
+                palette.setColor(QPalette.Highlight, color)
+        return palette
+
+    def apply(self, theme=DEFAULT_THEME, accent_color=None, high_contrast=False):
+        """
+        Bring the application to the given layers, doing the least work
+        possible. Returns True if anything changed.
+        """
+        theme = normalize_theme(theme)
+        accent_color = accent_color or None
+        high_contrast = bool(high_contrast)
+
+        qss = compile_stylesheet(
+            theme, ACCENT_PALETTE_COLOR if accent_color else None, high_contrast
+        )
+        sheet_changed = self.app.styleSheet() != qss
+        palette_changed = (self.theme is None or theme != self.theme
+                           or accent_color != self.accent_color)
+        if not sheet_changed and not palette_changed:
+            return False
+
+        # The palette goes first so a new stylesheet resolves it when polishing
+        if palette_changed:
+            self.app.setPalette(self.palette_for(theme, accent_color))
+        if sheet_changed:
+            self.app.setStyleSheet(qss)
+        elif accent_color != self.accent_color:
+            self.repolish_accent_widgets()
+
+        self.theme = theme
+        self.accent_color = accent_color
+        self.high_contrast = high_contrast
+        logger.info(f"Applied theme '{theme}' (accent: {accent_color or 'none'}, "
+                    f"high contrast: {high_contrast}, "
+                    f"{'stylesheet' if sheet_changed else 'palette only'})")
+        self.changed.emit(self.layers())
+        return True
+
+    def set_theme(self, theme):
+        return self.apply(theme, self.accent_color, self.high_contrast)
+
+    def set_accent(self, accent_color):
+        return self.apply(self.theme or DEFAULT_THEME, accent_color, self.high_contrast)
+
+    def set_high_contrast(self, enabled):
+        return self.apply(self.theme or DEFAULT_THEME, self.accent_color, enabled)
+
+    def apply_settings(self, settings):
+        """Apply the layers stored in settings (a SettingsStore or Database)"""
+        def setting(key):
+            return settings.get(key) if hasattr(settings, "get") else settings.get_setting(key)
+
+        return self.apply(
+            setting("theme") or DEFAULT_THEME,
+            setting("accent_color"),
+            setting("high_contrast_mode") == "true",
+        )
+
+    def repolish_accent_widgets(self):
+        """Re-resolve palette(highlight) on the widgets the accent styles"""
+        for widget in self.app.allWidgets():
+            if any(widget.inherits(name) for name in self.ACCENT_WIDGET_TYPES):
+                style = widget.style()
+                style.unpolish(widget)
+                style.polish(widget)
+                widget.update()
+
+
+_style_manager = None
+
+
+def get_style_manager(app=None):
+    """The application's StyleManager, created on first use"""
+    global _style_manager
+    if _style_manager is None:
+        from PyQt5.QtWidgets import QApplication
+
+        _style_manager = StyleManager(app or QApplication.instance())
+    return _style_manager
+
+
+def apply_theme(app, theme=DEFAULT_THEME, accent_color=None, high_contrast=False):
+    """Apply a theme to the whole application. Returns True if the look changed."""
+    return get_style_manager(app).apply(theme, accent_color, high_contrast)
+
+
+def apply_saved_theme(app, settings):
+    """Apply the theme stored in settings (a SettingsStore or Database)"""
+    return get_style_manager(app).apply_settings(settings)
+
+
+def benchmark_theme_engine(rounds=20, widgets=300):
+    """
+    Time stylesheet compilation, theme switches, accent switches (palette
+    layer vs. re-setting a stylesheet with a literal colour) and dialog
+    opens (per-widget MAIN_STYLESHEET vs. the shared sheet).
+    """
+    from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QDialog,
+                                 QPushButton, QLineEdit, QLabel, QFormLayout)
+    from src.style import MAIN_STYLESHEET
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    manager = get_style_manager(app)
+
+    window = QWidget()
+    layout = QVBoxLayout(window)
+    for i in range(widgets // 3):
+        layout.addWidget(QLabel(f"Label {i}"))
+        layout.addWidget(QLineEdit())
+        layout.addWidget(QPushButton(f"Button {i}"))
+    window.show()
+    app.processEvents()
+
+    def timed(func, count):
+        start = time.perf_counter()
+        for i in range(count):
+            func(i)
+        return (time.perf_counter() - start) / count * 1000
+
+    compile_stylesheet.cache_clear()
+    cold_ms = timed(lambda i: compile_stylesheet(THEMES[i % 3], "#3B82F6", i % 2 == 0), 1)
+    compile_stylesheet.cache_clear()
+    for theme in THEMES:
+        compile_stylesheet(theme)
+    cached_ms = timed(lambda i: compile_stylesheet(THEMES[i % 3]), rounds)
+
+    def switch(i):
+        manager.apply(THEMES[i % 3])
+        app.processEvents()
+    switch_ms = timed(switch, rounds)
+
+    def reapply(i):
+        manager.apply(THEMES[0])
+        app.processEvents()
+    manager.apply(THEMES[0])
+    reapply_ms = timed(reapply, rounds)
+
+    accents = ("#22C55E", "#EAB308", "#3B82F6", "#EC4899")
+
+    def accent_palette(i):
+        manager.apply(THEMES[0], accents[i % len(accents)])
+        app.processEvents()
+    manager.apply(THEMES[0], accents[-1])
+    accent_ms = timed(accent_palette, rounds)
+
+    def accent_restyle(i):
+        app.setStyleSheet(compile_stylesheet(THEMES[0], accents[i % len(accents)]))
+        app.processEvents()
+    accent_restyle_ms = timed(accent_restyle, rounds)
+    app.setStyleSheet("")
+    manager.apply(THEMES[0])
+
+    def open_dialog(per_widget_sheet):
+        def run(i):
+            dialog = QDialog(window)
+            if per_widget_sheet:
+                dialog.setStyleSheet(MAIN_STYLESHEET)
+            form = QFormLayout(dialog)
+            for j in range(10):
+                form.addRow(f"Field {j}", QLineEdit())
+            dialog.show()
+            app.processEvents()
+            dialog.close()
+            dialog.deleteLater()
+        return run
+
+    old_dialog_ms = timed(open_dialog(True), rounds)
+    new_dialog_ms = timed(open_dialog(False), rounds)
+
+    window.close()
+    return {
+        "compile_cold_ms": cold_ms,
+        "compile_cached_ms": cached_ms,
+        "theme_switch_ms": switch_ms,
+        "same_theme_reapply_ms": reapply_ms,
+        "accent_switch_palette_ms": accent_ms,
+        "accent_switch_restyle_ms": accent_restyle_ms,
+        "dialog_open_per_widget_sheet_ms": old_dialog_ms,
+        "dialog_open_shared_sheet_ms": new_dialog_ms,
+        "sheet_bytes": {theme: len(compile_stylesheet(theme)) for theme in THEMES},
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        import os
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+        for name, value in benchmark_theme_engine(rounds).items():
+            if isinstance(value, float):
+                print(f"{name}: {value:.2f} ms")
+            else:
+                print(f"{name}: {value}")
+    else:
+        print("Usage: python src/theme_engine.py --benchmark [rounds]")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Cancelling a product import from the inventory tab and resuming it.
+
+Run with `python -m pytest tests` from the project root.
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from PyQt5.QtWidgets import QApplication, QFileDialog, QMessageBox
+
+from src.database import Database
+from src.bulk_importer import IMPORT_CHUNK_SIZE, StreamingImporter
+from src.inventory_tab import InventoryTab
+
+# Three chunks at the import's own chunk size
+ROWS = 2 * IMPORT_CHUNK_SIZE + 500
+
+
+@pytest.fixture
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def write_products_csv(path, rows=ROWS):
+    """A product list in the default column layout"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("Product_Name,Category,Purchase_Price,Selling_Price,Stock_Quantity,Min_Stock_Level\n")
+        for i in range(1, rows + 1):
+            f.write(f"Import Product {i},Imported,80,100,10,2\n")
+
+
+def wait_for(app, condition, timeout=10):
+    """Process events until condition() holds"""
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("timed out")
+        app.processEvents()
+        time.sleep(0.005)
+
+
+def count_imported(db):
+    return db.execute_query(
+        "SELECT COUNT(*) AS n FROM products WHERE category = 'Imported'", fetch="one"
+    )['n']
+
+
+def test_cancel_import_then_resume(app, tmp_path, monkeypatch):
+    # Checkpoints are kept under data/ relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    source = str(tmp_path / "products.csv")
+    write_products_csv(source)
+
+    db = Database(str(tmp_path / "pos.db"))
+    tab = InventoryTab(db, db.get_user_by_username("admin"))
+
+    monkeypatch.setattr(QFileDialog, "getOpenFileName", staticmethod(lambda *a, **k: (source, "")))
+    paused = []
+    monkeypatch.setattr(QMessageBox, "information", staticmethod(lambda *a, **k: paused.append(a[1])))
+
+    # Hold the worker in its second chunk until Cancel reaches it, in case it
+    # got there first. A cancel queued to the worker's thread never arrives
+    # while run() is busy, so the import would run to the end instead.
+    chunks = []
+    import_chunk = StreamingImporter.import_chunk
+
+    def held_import_chunk(importer, df):
+        chunks.append(len(df))
+        if len(chunks) == 2:
+            tab.import_worker._cancel_event.wait(5)
+        return import_chunk(importer, df)
+
+    monkeypatch.setattr(StreamingImporter, "import_chunk", held_import_chunk)
+
+    # Press Cancel once the first chunk has been committed
+    on_import_progress = tab.on_import_progress
+
+    def cancel_after_first_chunk(done, total):
+        on_import_progress(done, total)
+        if done and tab.import_progress is not None:
+            tab.import_progress.canceled.emit()
+
+    monkeypatch.setattr(tab, "on_import_progress", cancel_after_first_chunk)
+
+    tab.import_products()
+    wait_for(app, lambda: tab.import_thread is None)
+
+    assert paused == ["Import Paused"]
+    assert len(chunks) in (1, 2)
+    committed = len(chunks) * IMPORT_CHUNK_SIZE
+    assert count_imported(db) == committed
+    importer = StreamingImporter(db, source, "products")
+    assert importer.load_checkpoint()["rows_done"] == committed
+
+    # Importing the same file again picks up after the committed rows
+    monkeypatch.setattr(StreamingImporter, "import_chunk", import_chunk)
+    progress = []
+    counts, completed = importer.run(progress_callback=lambda done, total: progress.append(done))
+
+    assert completed
+    assert progress[0] == committed
+    assert counts["inserted"] == ROWS
+    assert count_imported(db) == ROWS
+    assert not os.path.exists(importer.checkpoint_path())
+    db.close()